@@ -13,6 +13,20 @@ Key Analysis Areas:
 - Position-specific analysis
 - Correlation analysis
 - Performance metrics analysis
+
+Figures are queued on a ReportRenderer and drawn at the end of main(), in
+parallel on the Agg backend; figures whose data did not change since the last
+run are skipped. Use --no-show for batch (nightly) runs:
+
+    python 01_EDA_Analysis.py --no-show [--jobs N] [--force] [--output-dir DIR]
+
+With --incremental, counts, missing values and per-position moments are
+merged from per-season aggregates kept in a state file, and only seasons
+whose rows changed since the last run are re-aggregated.
+
+With --trace FILE, every step's wall/CPU time, peak RSS increase and row
+count is recorded (see tracing.py); --profile adds a cProfile dump of the
+slowest step.
 """
 
 import pandas as pd
@@ -21,27 +35,41 @@ import matplotlib.pyplot as plt
 import seaborn as sns
 from scipy import stats
 import warnings
+import argparse
 import os
+import sys
 from pathlib import Path
 
+# Shared Python library (cached loaders, analysis helpers)
+sys.path.append(str(Path(__file__).resolve().parents[3] / 'Other material Folder'))
+from data_cache import DataCache
+from position_stats import PositionStatsEngine, correlation_pairs
+from report_renderer import ReportRenderer, render_figure
+from incremental_eda import IncrementalEDA
+from tracing import disable_tracing, enable_tracing, traced
+
+OUTPUT_DIR = '../outputs'
+
 # Set plotting style
 plt.style.use('default')
 sns.set_palette("husl")
 warnings.filterwarnings('ignore')
 
+@traced
 def load_data():
-    """Load the main datasets"""
+    """Load the main datasets (through the shared columnar cache)"""
     print("Loading datasets...")
+    cache = DataCache(verbose=False)
     
     # Load main dataset
     data_path = '../../../Data Folder/DataCombined/001_real_madrid_all_seasons_combined.csv'
-    df = pd.read_csv(data_path)
+    df = cache.load(data_path)
     print(f"Main dataset loaded: {df.shape}")
     
     # Load rebalanced dataset
     try:
         rebalanced_path = '../../../Data Folder/DataCombined/real_madrid_rebalanced_scores.csv'
-        rebalanced_df = pd.read_csv(rebalanced_path)
+        rebalanced_df = cache.load(rebalanced_path)
         print(f"Rebalanced dataset loaded: {rebalanced_df.shape}")
     except FileNotFoundError:
         print("Warning: Rebalanced dataset not found")
@@ -49,6 +77,14 @@ def load_data():
     
     return df, rebalanced_df
 
+def add_figure(renderer, name, kind, data, **options):
+    """Queue a figure on the renderer, or draw and show it right away without one"""
+    if renderer is None:
+        render_figure(OUTPUT_DIR, name, kind, data, **options)
+    else:
+        renderer.add(name, kind, data, **options)
+
+@traced
 def data_overview(df):
     """Provide comprehensive data overview"""
     print("\nDATA OVERVIEW")
@@ -64,8 +100,9 @@ def data_overview(df):
     
     return df
 
-def analyze_positions(df):
-    """Analyze position distribution and statistics"""
+@traced
+def analyze_positions(df, renderer=None, position_counts=None):
+    """Analyze position distribution and statistics (optionally from precomputed counts)"""
     print("\nPOSITION ANALYSIS")
     print("=" * 50)
     
@@ -74,25 +111,21 @@ def analyze_positions(df):
         return
     
     # Position distribution
-    position_counts = df['Pos'].value_counts()
+    if position_counts is None:
+        position_counts = df['Pos'].value_counts()
     print(f"Position distribution:")
     print(position_counts)
     
     # Visualize position distribution
-    plt.figure(figsize=(10, 6))
-    position_counts.plot(kind='bar', color='skyblue')
-    plt.title('Player Position Distribution')
-    plt.xlabel('Position')
-    plt.ylabel('Count')
-    plt.xticks(rotation=45)
-    plt.tight_layout()
-    plt.savefig('../outputs/position_distribution.png', dpi=300, bbox_inches='tight')
-    plt.show()
+    add_figure(renderer, 'position_distribution', 'bar', position_counts,
+               figsize=(10, 6), color='skyblue', title='Player Position Distribution',
+               xlabel='Position', ylabel='Count', rotation=45)
     
     return position_counts
 
-def analyze_seasons(df):
-    """Analyze season distribution"""
+@traced
+def analyze_seasons(df, renderer=None, season_counts=None):
+    """Analyze season distribution (optionally from precomputed counts)"""
     print("\nSEASON ANALYSIS")
     print("=" * 50)
     
@@ -100,30 +133,31 @@ def analyze_seasons(df):
         print("Error: No 'Date' column found in dataset")
         return
     
-    # Convert date and extract year
-    df['Date'] = pd.to_datetime(df['Date'], errors='coerce')
+    # Convert date (already parsed when loaded from the cache) and extract year
+    if not pd.api.types.is_datetime64_any_dtype(df['Date']):
+        df['Date'] = pd.to_datetime(df['Date'], errors='coerce')
     df['Season'] = df['Date'].dt.year
     
     # Season distribution
-    season_counts = df['Season'].value_counts().sort_index()
+    if season_counts is None:
+        season_counts = df['Season'].value_counts().sort_index()
     print(f"Seasons covered:")
     print(season_counts)
     
     # Visualize season distribution
-    plt.figure(figsize=(12, 6))
-    season_counts.plot(kind='bar', color='lightgreen')
-    plt.title('Matches by Season')
-    plt.xlabel('Season')
-    plt.ylabel('Number of Matches')
-    plt.xticks(rotation=45)
-    plt.tight_layout()
-    plt.savefig('../outputs/season_distribution.png', dpi=300, bbox_inches='tight')
-    plt.show()
+    add_figure(renderer, 'season_distribution', 'bar', season_counts,
+               figsize=(12, 6), color='lightgreen', title='Matches by Season',
+               xlabel='Season', ylabel='Number of Matches', rotation=45)
     
     return df
 
-def analyze_position_stats(df, position_col='Pos'):
-    """Analyze statistics for each position - matching original notebook exactly"""
+@traced
+def analyze_position_stats(df, position_col='Pos', engine=None):
+    """Analyze statistics for each position - matching original notebook exactly
+    
+    Positions are matched by group membership (e.g. "FW,RM" counts for both
+    Forward and Midfielder); pass a prebuilt PositionStatsEngine to reuse it.
+    """
     print("\n3.3 POSITION-SPECIFIC DISTRIBUTION ANALYSIS")
     print("=" * 50)
     
@@ -141,18 +175,22 @@ def analyze_position_stats(df, position_col='Pos'):
     numeric_cols = df.select_dtypes(include=[np.number]).columns.tolist()
     numeric_cols = [col for col in numeric_cols if col not in exclude_cols]
     
+    # All positions are summarised in one batched pass
+    if engine is None:
+        engine = PositionStatsEngine(df, numeric_cols, position_col)
+    position_means = engine.means()
+    
     for i, position in enumerate(positions_to_analyze):
         position_name = position_names[i]
         print(f"\n--- {position_name.upper()} DISTRIBUTION ANALYSIS ---")
         
-        # Filter data for this position (including combinations)
-        pos_data = df[df[position_col].str.contains(position, na=False)][numeric_cols]
+        sample_size = engine.sample_size(position)
         
-        if len(pos_data) > 0:
-            print(f"Sample size: {len(pos_data)}")
+        if sample_size > 0:
+            print(f"Sample size: {sample_size}")
             
             # Show top metrics by mean value (like original notebook)
-            means = pos_data.mean().sort_values(ascending=False)
+            means = position_means.loc[position, numeric_cols].sort_values(ascending=False)
             print(f"\nTop 5 metrics by mean value:")
             for i, (metric, mean_val) in enumerate(means.head().items(), 1):
                 print(f"{i}. {metric}: {mean_val:.3f}")
@@ -161,13 +199,15 @@ def analyze_position_stats(df, position_col='Pos'):
     
     print(f"\nAnalyzing positions: {positions_to_analyze}")
 
-def data_quality_assessment(df):
-    """Assess data quality and missing values"""
+@traced
+def data_quality_assessment(df, renderer=None, missing_data=None):
+    """Assess data quality and missing values (optionally from precomputed null counts)"""
     print("\nDATA QUALITY ASSESSMENT")
     print("=" * 50)
     
     # Missing values analysis
-    missing_data = df.isnull().sum()
+    if missing_data is None:
+        missing_data = df.isnull().sum()
     missing_percent = (missing_data / len(df)) * 100
     
     missing_summary = pd.DataFrame({
@@ -179,26 +219,21 @@ def data_quality_assessment(df):
     print(missing_summary.head(10))
     
     # Overall completeness
-    total_cells = len(df) * len(df.columns)
-    missing_cells = df.isnull().sum().sum()
+    total_cells = len(df) * len(missing_data)
+    missing_cells = missing_data.sum()
     completeness = ((total_cells - missing_cells) / total_cells) * 100
     
     print(f"\nOverall data completeness: {completeness:.1f}%")
     
     # Visualize missing values
-    plt.figure(figsize=(12, 8))
-    missing_percent.plot(kind='bar', figsize=(12, 6))
-    plt.title('Missing Values by Column (%)')
-    plt.xlabel('Columns')
-    plt.ylabel('Missing Percentage')
-    plt.xticks(rotation=90)
-    plt.tight_layout()
-    plt.savefig('../outputs/missing_values.png', dpi=300, bbox_inches='tight')
-    plt.show()
+    add_figure(renderer, 'missing_values', 'bar', missing_percent,
+               figsize=(12, 6), title='Missing Values by Column (%)',
+               xlabel='Columns', ylabel='Missing Percentage', rotation=90)
     
     return missing_summary
 
-def analyze_performance_scores(rebalanced_df):
+@traced
+def analyze_performance_scores(rebalanced_df, renderer=None):
     """Analyze performance scores from rebalanced dataset"""
     print("\nPERFORMANCE SCORE ANALYSIS")
     print("=" * 50)
@@ -217,30 +252,25 @@ def analyze_performance_scores(rebalanced_df):
     print(score_stats)
     
     # Distribution plot
-    plt.figure(figsize=(10, 6))
-    plt.hist(rebalanced_df['Rebalanced_Score'], bins=50, alpha=0.7, color='orange')
-    plt.title('Distribution of Rebalanced Performance Scores')
-    plt.xlabel('Performance Score')
-    plt.ylabel('Frequency')
-    plt.grid(True, alpha=0.3)
-    plt.savefig('../outputs/performance_score_distribution.png', dpi=300, bbox_inches='tight')
-    plt.show()
+    add_figure(renderer, 'performance_score_distribution', 'hist', rebalanced_df['Rebalanced_Score'],
+               figsize=(10, 6), bins=50, alpha=0.7, color='orange',
+               title='Distribution of Rebalanced Performance Scores',
+               xlabel='Performance Score', ylabel='Frequency', grid=True)
     
     # Position-based performance
     if 'Position_Group' in rebalanced_df.columns:
-        plt.figure(figsize=(12, 6))
-        rebalanced_df.boxplot(column='Rebalanced_Score', by='Position_Group', figsize=(12, 6))
-        plt.title('Performance Scores by Position Group')
-        plt.suptitle('')  # Remove default suptitle
-        plt.xlabel('Position Group')
-        plt.ylabel('Performance Score')
-        plt.xticks(rotation=45)
-        plt.tight_layout()
-        plt.savefig('../outputs/performance_by_position.png', dpi=300, bbox_inches='tight')
-        plt.show()
+        add_figure(renderer, 'performance_by_position', 'boxplot',
+                   rebalanced_df[['Position_Group', 'Rebalanced_Score']],
+                   column='Rebalanced_Score', by='Position_Group', figsize=(12, 6),
+                   title='Performance Scores by Position Group',
+                   xlabel='Position Group', ylabel='Performance Score', rotation=45)
 
-def correlation_analysis(df):
-    """Perform correlation analysis on key metrics - matching original notebook exactly"""
+@traced
+def correlation_analysis(df, engine=None, renderer=None):
+    """Perform correlation analysis on key metrics - matching original notebook exactly
+    
+    Pass a prebuilt PositionStatsEngine to reuse the batched per-position statistics.
+    """
     print("\n5. POSITION-SPECIFIC PLAYER PERFORMANCE SPIDER CHARTS")
     print("=" * 50)
     
@@ -256,6 +286,10 @@ def correlation_analysis(df):
         'GK': ['Saves', 'Save%', 'Clean', 'PostSh', 'Crosses Stopped']
     }
     
+    if engine is None:
+        all_metrics = sorted({col for metrics in position_metrics.values() for col in metrics if col in df.columns})
+        engine = PositionStatsEngine(df, all_metrics)
+    
     for i, position in enumerate(positions_to_analyze):
         position_name = position_names[i]
         print(f"\n{position_name.upper()} CORRELATION ANALYSIS")
@@ -269,33 +303,24 @@ def correlation_analysis(df):
             print(f"Insufficient metrics for {position_name} correlation analysis")
             continue
         
-        # Filter data for this position (including combinations)
-        pos_data = df[df['Pos'].str.contains(position, na=False)][available_metrics]
-        
-        if len(pos_data) > 0:
-            # Calculate correlation matrix
-            correlation_matrix = pos_data.corr()
+        if engine.sample_size(position) > 0:
+            # Correlation matrix for this position (including combinations)
+            correlation_matrix = engine.correlation(position, available_metrics)
             
             print(f"Correlation Matrix for {position}:")
             print(correlation_matrix.round(3))
             
             # Find highly correlated pairs
-            high_corr_pairs = []
-            for i in range(len(correlation_matrix.columns)):
-                for j in range(i+1, len(correlation_matrix.columns)):
-                    corr_val = correlation_matrix.iloc[i, j]
-                    if abs(corr_val) > 0.6:
-                        high_corr_pairs.append((correlation_matrix.columns[i], 
-                                               correlation_matrix.columns[j], corr_val))
+            high_corr_pairs = correlation_pairs(correlation_matrix, threshold=0.6)
             
-            if high_corr_pairs:
+            if not high_corr_pairs.empty:
                 print(f"\nHighly Correlated Pairs for {position} (|r| > 0.6):")
-                for i, pair in enumerate(high_corr_pairs, 1):
-                    print(f"{i}        {pair[0]}  {pair[1]}     {pair[2]:.6f}")
+                for i, pair in enumerate(high_corr_pairs.itertuples(index=False), 1):
+                    print(f"{i}        {pair.Metric_1}  {pair.Metric_2}     {pair.Correlation:.6f}")
             
             # Show statistical summary
             print(f"\nStatistical Summary for {position}:")
-            stats_summary = pos_data.describe()
+            stats_summary = engine.describe(position, available_metrics)
             print(stats_summary.round(3))
         else:
             print(f"No data available for {position}")
@@ -319,27 +344,16 @@ def correlation_analysis(df):
     print(correlation_matrix.round(3))
     
     # Visualize correlation heatmap
-    plt.figure(figsize=(10, 8))
-    sns.heatmap(correlation_matrix, annot=True, cmap='coolwarm', center=0, 
-                square=True, linewidths=0.5)
-    plt.title('Correlation Heatmap of Key Performance Metrics')
-    plt.tight_layout()
-    plt.savefig('../outputs/correlation_heatmap.png', dpi=300, bbox_inches='tight')
-    plt.show()
+    add_figure(renderer, 'correlation_heatmap', 'heatmap', correlation_matrix,
+               figsize=(10, 8), title='Correlation Heatmap of Key Performance Metrics')
     
     # Find highly correlated pairs
-    high_corr_pairs = []
-    for i in range(len(correlation_matrix.columns)):
-        for j in range(i+1, len(correlation_matrix.columns)):
-            corr_val = correlation_matrix.iloc[i, j]
-            if abs(corr_val) > 0.6:
-                high_corr_pairs.append((correlation_matrix.columns[i], 
-                                       correlation_matrix.columns[j], corr_val))
-    
-    if high_corr_pairs:
+    high_corr_pairs = correlation_pairs(correlation_matrix, threshold=0.6)
+    
+    if not high_corr_pairs.empty:
         print(f"\nHighly correlated metric pairs (|r| > 0.6):")
-        for pair in high_corr_pairs:
-            print(f"{pair[0]} ↔ {pair[1]}: r = {pair[2]:.3f}")
+        for pair in high_corr_pairs.itertuples(index=False):
+            print(f"{pair.Metric_1} ↔ {pair.Metric_2}: r = {pair.Correlation:.3f}")
     
     return correlation_matrix
 
@@ -355,7 +369,8 @@ def generate_summary(df, rebalanced_df):
         print(f"Positions analyzed: {df['Pos'].nunique()}")
     
     if 'Date' in df.columns:
-        df['Date'] = pd.to_datetime(df['Date'], errors='coerce')
+        if not pd.api.types.is_datetime64_any_dtype(df['Date']):
+            df['Date'] = pd.to_datetime(df['Date'], errors='coerce')
         print(f"Seasons covered: {df['Date'].dt.year.nunique()}")
     
     # Data quality
@@ -381,34 +396,84 @@ def generate_summary(df, rebalanced_df):
     print(f"  - Defender: [Player1, Player2]")
     print(f"  - Goalkeeper: [Player1, Player2]")
 
-def main():
+def parse_args(argv=None):
+    """Command line options for batch runs"""
+    parser = argparse.ArgumentParser(description="Real Madrid Soccer Performance EDA")
+    parser.add_argument('--no-show', action='store_true',
+                        help="Batch mode: render figures headless without displaying them")
+    parser.add_argument('--jobs', type=int, default=None,
+                        help="Figure rendering processes (default: available cores)")
+    parser.add_argument('--force', action='store_true',
+                        help="Redraw every figure even if its data is unchanged")
+    parser.add_argument('--output-dir', default=OUTPUT_DIR,
+                        help=f"Folder for figures (default: {OUTPUT_DIR})")
+    parser.add_argument('--incremental', action='store_true',
+                        help="Merge per-season aggregates, re-aggregating only changed seasons")
+    parser.add_argument('--state', default=None,
+                        help="State file for --incremental (default: Data Folder/DataCombined/.cache/eda_state)")
+    parser.add_argument('--trace', default=None,
+                        help="Record stage timings to this file (*.jsonl, or *.json for Chrome trace format)")
+    parser.add_argument('--profile', action='store_true',
+                        help="With --trace: dump a cProfile of the slowest stage next to the trace")
+    return parser.parse_args(argv)
+
+def main(argv=None):
     """Main analysis function"""
+    args = parse_args(argv)
+    if args.trace or args.profile:
+        enable_tracing(args.trace, profile=args.profile)
+    try:
+        run_analysis(args)
+    finally:
+        disable_tracing()
+
+def run_analysis(args):
+    """Run every EDA step with parsed command line options"""
     print("Starting Real Madrid Soccer Performance EDA")
     print("=" * 60)
     
     # Create outputs directory if it doesn't exist
-    os.makedirs('../outputs', exist_ok=True)
+    os.makedirs(args.output_dir, exist_ok=True)
+    
+    # Figures are queued by each step and drawn together at the end
+    renderer = ReportRenderer(args.output_dir, workers=args.jobs, show=not args.no_show)
     
     # Load data
     df, rebalanced_df = load_data()
     
+    # Incremental mode: aggregates of unchanged seasons come from the state file
+    # (updated before analyze_seasons replaces the Season labels with years)
+    state = None
+    if args.incremental:
+        state = IncrementalEDA(args.state)
+        state.update(df)
+    
     # Perform analysis
     df = data_overview(df)
-    position_counts = analyze_positions(df)
-    df = analyze_seasons(df)
-    analyze_position_stats(df)
-    missing_summary = data_quality_assessment(df)
+    position_counts = analyze_positions(df, renderer,
+                                        position_counts=state.position_counts() if state else None)
+    df = analyze_seasons(df, renderer, season_counts=state.season_counts() if state else None)
+    
+    # Per-position statistics are computed once and shared by both analyses
+    stats_engine = state.position_stats(df) if state else PositionStatsEngine(df)
+    analyze_position_stats(df, engine=stats_engine)
+    missing_summary = data_quality_assessment(df, renderer,
+                                              missing_data=state.missing_counts() if state else None)
     
     if rebalanced_df is not None:
-        analyze_performance_scores(rebalanced_df)
+        analyze_performance_scores(rebalanced_df, renderer)
     
-    correlation_matrix = correlation_analysis(df)
+    correlation_matrix = correlation_analysis(df, engine=stats_engine, renderer=renderer)
     
     # Generate summary
     generate_summary(df, rebalanced_df)
     
+    print("\nRENDERING FIGURES")
+    print("=" * 50)
+    renderer.render(force=args.force)
+    
     print("\nEDA Analysis Complete!")
-    print("Outputs saved to: ../outputs/")
+    print(f"Outputs saved to: {args.output_dir}/")
     print("Ready for next stage: Feature Engineering")
 
 if __name__ == "__main__":
@@ -0,0 +1,442 @@
+"""
+Backtesting Module for Real Madrid Soccer Analysis
+Contains a walk-forward validation engine for the position models
+
+The Modeling and Forecasting notebooks validate with a random
+train_test_split (and SoccerModeler with cross_val_score), which mixes
+future matches into the training folds. WalkForwardBacktester validates in
+time order instead:
+
+- each position's rows are sorted by date once, so every fold is a pair of
+  row slices (train, test) of the same matrix: expanding windows grow the
+  training slice, sliding windows move it, one or more matchweeks (or
+  seasons) are tested per fold;
+- fold-level standardization comes from prefix sums of X and X^2, so the
+  mean/scale of any training slice is two lookups instead of a refit;
+- with expanding windows RandomForest, GradientBoosting and XGBoost are
+  warm-started: each fold adds trees fitted on the grown window to the
+  previous fold's model instead of refitting from scratch;
+- (position x model) chains, or single folds when refitting, run in a
+  process pool, and finished chains are cached on disk by a hash of their
+  data and settings.
+"""
+
+import hashlib
+import json
+import pickle
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from data_cache import CACHE_DIR_NAME, DATA_FOLDER
+from model_training import (DEFAULT_PARAMS, PER90_METRICS, SCALED_MODELS, TARGET_COLUMN, _init_worker,
+                            _thread_limits, _write_pickle, _xgboost_available, available_cpus, build_estimator)
+from tracing import traced
+
+BACKTEST_VERSION = 1
+DEFAULT_BACKTEST_CACHE = DATA_FOLDER / "DataCombined" / CACHE_DIR_NAME / "backtests"
+
+# Tree ensembles that can grow from the previous fold's model
+WARM_START_MODELS = {'rf', 'gb', 'xgb'}
+TREES_PER_FOLD = 10
+MIN_TRAIN_ROWS = 20
+
+Fold = Tuple[int, int, int, int]
+PathLike = Union[str, Path]
+
+
+def time_units(df: pd.DataFrame, unit: str = 'week', date_col: str = 'Date', season_col: str = 'Season') -> np.ndarray:
+    """
+    Ordinal matchweek or season of every row
+
+    Weeks are calendar weeks (Monday to Sunday) counted over the whole frame,
+    so every position shares the same fold boundaries.
+    """
+    if unit == 'week':
+        periods = pd.to_datetime(df[date_col], errors='coerce').dt.to_period('W')
+        codes, _ = pd.factorize(periods, sort=True)
+    elif unit == 'season':
+        codes, _ = pd.factorize(df[season_col], sort=True)
+    else:
+        raise ValueError(f"Unknown unit '{unit}' (expected 'week' or 'season')")
+    return codes
+
+
+def walk_forward_folds(units: np.ndarray, min_train_units: int, test_units: int = 1,
+                       window: str = 'expanding', train_units: Optional[int] = None,
+                       min_train_rows: int = MIN_TRAIN_ROWS) -> List[Fold]:
+    """
+    Row bounds of walk-forward folds over date-sorted rows
+
+    Args:
+        units: Non-decreasing time unit of each row (time_units() of sorted rows)
+        min_train_units: Units before the first test block
+        test_units: Units per test block (and step between folds)
+        window: 'expanding' (train from the first unit) or 'sliding'
+        train_units: Units in a sliding training window (default: min_train_units)
+        min_train_rows: Skip folds with fewer training rows
+
+    Returns:
+        List of (train_start, train_stop, test_start, test_stop) row bounds
+    """
+    if window not in ('expanding', 'sliding'):
+        raise ValueError(f"Unknown window '{window}' (expected 'expanding' or 'sliding')")
+    if len(units) == 0:
+        return []
+    train_units = min_train_units if train_units is None else train_units
+    first, last = int(units[0]), int(units[-1])
+    folds = []
+    for test_start in range(first + min_train_units, last + 1, test_units):
+        lower = first if window == 'expanding' else max(first, test_start - train_units)
+        bounds = np.searchsorted(units, [lower, test_start, test_start + test_units], side='left')
+        train_start, train_stop, test_stop = (int(b) for b in bounds)
+        if train_stop - train_start >= min_train_rows and test_stop > train_stop:
+            folds.append((train_start, train_stop, train_stop, test_stop))
+    return folds
+
+
+def prefix_moments(X: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Prefix sums of X and X^2 (one leading zero row) for O(1) slice statistics."""
+    csum = np.zeros((len(X) + 1, X.shape[1]))
+    csq = np.zeros((len(X) + 1, X.shape[1]))
+    np.cumsum(X, axis=0, out=csum[1:])
+    np.cumsum(np.square(X, dtype=np.float64), axis=0, out=csq[1:])
+    return csum, csq
+
+
+def slice_scaler(csum: np.ndarray, csq: np.ndarray, start: int, stop: int) -> Tuple[np.ndarray, np.ndarray]:
+    """StandardScaler mean and scale of rows [start, stop) from prefix sums."""
+    n = stop - start
+    mean = (csum[stop] - csum[start]) / n
+    var = np.maximum((csq[stop] - csq[start]) / n - mean ** 2, 0.0)
+    scale = np.sqrt(var)
+    return mean, np.where(scale > 1e-12, scale, 1.0)
+
+
+def position_panels(df: pd.DataFrame, features: Optional[Dict[str, List[str]]] = None,
+                    target: str = TARGET_COLUMN, unit: str = 'week',
+                    date_col: str = 'Date', min_rows: int = 30) -> Dict[str, Dict]:
+    """
+    Date-sorted feature matrix, target and time units per position
+
+    Args:
+        df: Scored rows with Position_Group, Date, Season, target and feature columns
+        features: Mapping of position to feature columns (default: PER90_METRICS)
+        target: Target column
+        unit: Fold unit ('week' or 'season')
+        date_col: Match date column
+        min_rows: Minimum scored rows of a position
+
+    Returns:
+        Dictionary of position -> {'X', 'y', 'units', 'dates', 'index', 'features'}
+    """
+    features = PER90_METRICS if features is None else features
+    units = time_units(df, unit, date_col)
+    dates = pd.to_datetime(df[date_col], errors='coerce').to_numpy()
+    scored = df[target].notna().to_numpy()
+    groups = df['Position_Group'].to_numpy()
+
+    panels = {}
+    for position, metrics in features.items():
+        available = [m for m in metrics if m in df.columns]
+        rows = np.flatnonzero(scored & (groups == position))
+        if len(rows) < min_rows or len(available) < 3:
+            continue
+        rows = rows[np.lexsort((rows, dates[rows]))]
+        panels[position] = {
+            'X': np.ascontiguousarray(df[available].iloc[rows].fillna(0).to_numpy(dtype=np.float32)),
+            'y': df[target].iloc[rows].to_numpy(dtype=np.float64),
+            'units': units[rows],
+            'dates': dates[rows],
+            'index': df.index[rows],
+            'features': available,
+        }
+    return panels
+
+
+def _grow(estimator, model: str, params: Dict, trees: int, X: np.ndarray, y: np.ndarray, n_jobs: int):
+    """Add `trees` trees fitted on (X, y) to a fitted ensemble."""
+    if model == 'xgb':
+        booster = estimator.get_booster()
+        grown = build_estimator(model, {**params, 'n_estimators': trees}, n_jobs)
+        grown.fit(X, y, xgb_model=booster)
+        return grown
+    estimator.set_params(warm_start=True, n_estimators=estimator.n_estimators + trees)
+    estimator.fit(X, y)
+    return estimator
+
+
+def _run_folds(job: Dict) -> Dict:
+    """Fit and score one (position, model) chain of folds, warm-starting when asked."""
+    from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
+
+    start = time.perf_counter()
+    X, y = job['X'], job['y']
+    scaled = job['model'] in SCALED_MODELS
+    csum, csq = prefix_moments(X) if scaled else (None, None)
+    rows, predictions = [], []
+    estimator = None
+    try:
+        for fold_id, (a, b, c, d) in zip(job['fold_ids'], job['folds']):
+            fold_start = time.perf_counter()
+            X_train, X_test = X[a:b], X[c:d]
+            if scaled:
+                mean, scale = slice_scaler(csum, csq, a, b)
+                X_train, X_test = (X_train - mean) / scale, (X_test - mean) / scale
+            if estimator is not None and job['warm_start']:
+                estimator = _grow(estimator, job['model'], job['params'], job['trees_per_fold'],
+                                  X_train, y[a:b], job['n_jobs'])
+            else:
+                estimator = build_estimator(job['model'], job['params'], job['n_jobs'])
+                estimator.fit(X_train, y[a:b])
+            pred = estimator.predict(X_test)
+            y_test = y[c:d]
+            rows.append({
+                'fold': fold_id, 'n_train': b - a, 'n_test': d - c,
+                'r2': float(r2_score(y_test, pred)) if d - c > 1 else np.nan,
+                'mae': float(mean_absolute_error(y_test, pred)),
+                'rmse': float(np.sqrt(mean_squared_error(y_test, pred))),
+                'trees': int(getattr(estimator, 'n_estimators', 0) or 0) if job['model'] != 'xgb'
+                else int(estimator.get_booster().num_boosted_rounds()),
+                'seconds': time.perf_counter() - fold_start,
+            })
+            predictions.append(pred)
+        error = None
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+    result = {'key': job['key'], 'rows': rows,
+              'predictions': np.concatenate(predictions) if predictions else np.zeros(0),
+              'error': error, 'seconds': time.perf_counter() - start}
+    if error is None and job.get('cache_path'):
+        _write_pickle(Path(job['cache_path']), result)
+    return result
+
+
+class WalkForwardBacktester:
+    """Class for walk-forward backtests of the position models"""
+
+    def __init__(self, unit: str = 'week', window: str = 'expanding',
+                 min_train_units: int = 20, test_units: int = 1,
+                 train_units: Optional[int] = None,
+                 warm_start: bool = True, trees_per_fold: int = TREES_PER_FOLD,
+                 min_train_rows: int = MIN_TRAIN_ROWS,
+                 cache_dir: Optional[PathLike] = None,
+                 cpu_budget: Optional[int] = None,
+                 verbose: bool = True):
+        """
+        Args:
+            unit: Fold unit, 'week' (matchweeks) or 'season'
+            window: 'expanding' or 'sliding' training window
+            min_train_units: Units before the first test block
+            test_units: Units tested per fold (and the step between folds)
+            train_units: Units in a sliding window (default: min_train_units)
+            warm_start: Grow tree ensembles across expanding folds instead of refitting
+            trees_per_fold: Trees added per fold when warm-starting
+            min_train_rows: Skip folds with fewer training rows
+            cache_dir: Folder for finished chains (None: DataCombined/.cache/backtests;
+                False: no cache)
+            cpu_budget: Total CPUs shared by workers and their inner threads
+            verbose: Print progress and a summary
+        """
+        self.unit = unit
+        self.window = window
+        self.min_train_units = min_train_units
+        self.test_units = test_units
+        self.train_units = train_units
+        self.warm_start = warm_start
+        self.trees_per_fold = trees_per_fold
+        self.min_train_rows = min_train_rows
+        self.cache_dir = None if cache_dir is False else Path(cache_dir or DEFAULT_BACKTEST_CACHE)
+        self.cpu_budget = max(1, cpu_budget or available_cpus())
+        self.verbose = verbose
+        self.predictions = pd.DataFrame()
+
+    def _settings(self) -> Dict:
+        return {'version': BACKTEST_VERSION, 'unit': self.unit, 'window': self.window,
+                'min_train_units': self.min_train_units, 'test_units': self.test_units,
+                'train_units': self.train_units, 'trees_per_fold': self.trees_per_fold,
+                'min_train_rows': self.min_train_rows}
+
+    def folds(self, panel: Dict) -> List[Fold]:
+        """Walk-forward row bounds of a position panel."""
+        return walk_forward_folds(panel['units'], self.min_train_units, self.test_units, self.window,
+                                  self.train_units, self.min_train_rows)
+
+    def _chain_key(self, panel: Dict, model: str, params: Dict, folds: List[Fold], warm: bool) -> str:
+        digest = hashlib.sha1()
+        for array in (panel['X'], panel['y'], panel['units']):
+            digest.update(np.ascontiguousarray(array).tobytes())
+        digest.update(json.dumps([self._settings(), model, params, panel['features'], folds, warm],
+                                 sort_keys=True, default=str).encode())
+        return digest.hexdigest()
+
+    def _cache_path(self, key: str) -> Optional[Path]:
+        return None if self.cache_dir is None else self.cache_dir / key[:2] / f"{key}.pkl"
+
+    def _load_cached(self, key: str) -> Optional[Dict]:
+        path = self._cache_path(key)
+        if path is None:
+            return None
+        try:
+            with open(path, 'rb') as handle:
+                return pickle.load(handle)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            return None
+
+    def plan(self, panels: Dict[str, Dict], models: Sequence[str]) -> List[Dict]:
+        """
+        Jobs of a backtest (without data)
+
+        Warm-started models get one job per position holding every fold in
+        order; refitted models get one job per fold so folds run in parallel.
+        """
+        models = [m for m in models if m != 'xgb' or _xgboost_available()]
+        jobs = []
+        for position, panel in panels.items():
+            folds = self.folds(panel)
+            for model in models:
+                params = DEFAULT_PARAMS[model]
+                warm = self.warm_start and self.window == 'expanding' and model in WARM_START_MODELS
+                chains = [list(range(len(folds)))] if warm else [[i] for i in range(len(folds))]
+                for fold_ids in chains:
+                    chain = [folds[i] for i in fold_ids]
+                    if not chain:
+                        continue
+                    key = self._chain_key(panel, model, params, chain, warm)
+                    jobs.append({'key': key, 'position': position, 'model': model, 'params': params,
+                                 'fold_ids': fold_ids, 'folds': chain, 'warm_start': warm,
+                                 'trees_per_fold': self.trees_per_fold})
+        return jobs
+
+    @traced(name='WalkForwardBacktester.run')
+    def run(self, df: pd.DataFrame, models: Sequence[str] = ('rf', 'xgb'),
+            features: Optional[Dict[str, List[str]]] = None, force: bool = False) -> pd.DataFrame:
+        """
+        Walk-forward backtest of every position model
+
+        Args:
+            df: Scored rows with Position_Group, Date, Season, target and feature columns
+            models: Model names (keys of model_training.DEFAULT_PARAMS)
+            features: Mapping of position to feature columns (default: PER90_METRICS)
+            force: Recompute cached chains
+
+        Returns:
+            DataFrame with one row per (position, model, fold): fold dates,
+            train/test sizes, r2, mae, rmse, trees, seconds and cached flag.
+            Out-of-fold predictions are kept in self.predictions.
+        """
+        start = time.perf_counter()
+        panels = position_panels(df, features, unit=self.unit)
+        planned = self.plan(panels, models)
+
+        done, todo = {}, []
+        for job in planned:
+            cached = None if force else self._load_cached(job['key'])
+            if cached is not None:
+                done[job['key']] = dict(cached, cached=True)
+            else:
+                todo.append(job)
+
+        workers = max(1, min(self.cpu_budget, len(todo)))
+        threads = max(1, self.cpu_budget // workers)
+        payloads = []
+        for job in todo:
+            panel = panels[job['position']]
+            path = self._cache_path(job['key'])
+            payloads.append({**job, 'X': panel['X'], 'y': panel['y'], 'n_jobs': threads,
+                             'cache_path': str(path) if path else None})
+        if workers == 1 or len(payloads) <= 1:
+            with _thread_limits(threads):
+                fitted = [_run_folds(job) for job in payloads]
+        else:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(threads,)) as pool:
+                fitted = list(pool.map(_run_folds, payloads))
+        for result in fitted:
+            done[result['key']] = dict(result, cached=False)
+
+        rows, predictions = [], []
+        for job in planned:
+            result = done[job['key']]
+            if result['error'] is not None:
+                print(f"❌ {job['position']}/{job['model']}: {result['error']}")
+                continue
+            panel = panels[job['position']]
+            offset = 0
+            for row, (a, b, c, d) in zip(result['rows'], job['folds']):
+                rows.append({
+                    'position': job['position'], 'model': job['model'], **row,
+                    'train_start': panel['dates'][a], 'train_end': panel['dates'][b - 1],
+                    'test_start': panel['dates'][c], 'test_end': panel['dates'][d - 1],
+                    'warm_start': job['warm_start'], 'cached': result['cached'],
+                })
+                predictions.append(pd.DataFrame({
+                    'position': job['position'], 'model': job['model'], 'fold': row['fold'],
+                    'y_true': panel['y'][c:d], 'y_pred': result['predictions'][offset:offset + d - c],
+                }, index=panel['index'][c:d]))
+                offset += d - c
+
+        results = pd.DataFrame(rows)
+        if not results.empty:
+            results = results.sort_values(['position', 'model', 'fold'], kind='stable').reset_index(drop=True)
+        self.predictions = pd.concat(predictions) if predictions else pd.DataFrame()
+        if self.verbose:
+            print(f"✅ Backtest: {len(results)} folds ({len(todo)} job(s) run, {len(planned) - len(todo)} cached) "
+                  f"in {time.perf_counter() - start:.1f}s ({workers} worker(s) x {threads} thread(s))")
+        return results
+
+    def summary(self) -> pd.DataFrame:
+        """Pooled out-of-fold r2, MAE and RMSE per position and model."""
+        from sklearn.metrics import mean_absolute_error, r2_score
+
+        rows = []
+        for (position, model), group in self.predictions.groupby(['position', 'model'], sort=True):
+            rows.append({'position': position, 'model': model, 'folds': group['fold'].nunique(),
+                         'n': len(group),
+                         'oof_r2': r2_score(group['y_true'], group['y_pred']),
+                         'oof_mae': mean_absolute_error(group['y_true'], group['y_pred']),
+                         'oof_rmse': float(np.sqrt(np.mean((group['y_true'] - group['y_pred']) ** 2)))})
+        return pd.DataFrame(rows)
+
+
+def quick_backtest(df: Optional[pd.DataFrame] = None, models: Sequence[str] = ('rf', 'xgb'),
+                   **backtester_kwargs) -> pd.DataFrame:
+    """
+    Quick function to backtest the position models on the rebalanced scores
+
+    Args:
+        df: Scored rows (default: the feature store matrix of load_rebalanced_scores())
+        models: Model names
+        **backtester_kwargs: Options forwarded to WalkForwardBacktester
+
+    Returns:
+        Pooled out-of-fold metrics per position and model
+    """
+    if df is None:
+        from feature_store import load_features
+        df = load_features().frame(with_meta=True)
+    backtester = WalkForwardBacktester(**backtester_kwargs)
+    backtester.run(df, models)
+    return backtester.summary()
+
+
+def example_warm_start_timing(df: pd.DataFrame, models: Sequence[str] = ('rf',), **backtester_kwargs) -> Dict[str, float]:
+    """Example: warm-started against refitted expanding-window backtests"""
+    timings = {}
+    for warm in (False, True):
+        backtester = WalkForwardBacktester(warm_start=warm, cache_dir=False, verbose=False, **backtester_kwargs)
+        start = time.perf_counter()
+        results = backtester.run(df, models)
+        timings['warm' if warm else 'refit'] = time.perf_counter() - start
+        print(f"{'Warm start' if warm else 'Full refit'}: {len(results)} folds in "
+              f"{timings['warm' if warm else 'refit']:.1f}s, pooled r2 "
+              f"{backtester.summary()['oof_r2'].round(3).tolist()}")
+    return timings
+
+
+if __name__ == "__main__":
+    print("Testing Backtesting Module...")
+    print(quick_backtest())
@@ -0,0 +1,467 @@
+"""
+Benchmarks Module for Real Madrid Soccer Analysis
+Contains a stage-by-stage timing harness on synthetic league-scale data
+
+make_synthetic_matches() clones the combined match file
+(001_real_madrid_all_seasons_combined.csv) into `scale` club copies with
+prefixed player names and small stat perturbations, so a 10x or 100x dataset
+has exactly the real schema. run_benchmarks() writes it to CSV and times
+every pipeline stage on it:
+
+    load             pd.read_csv of the synthetic file
+    clean            load_and_clean_data() (streaming.clean_frame)
+    per90            create_per90_features() (streaming.add_per90_features)
+    score            Position_Group and Rebalanced_Score (streaming.score_chunk)
+    correlation_vif  per-position correlation matrices and VIF tables
+    train            position models (model_training.TrainingOrchestrator)
+    shap             SHAP values of the test rows (explanation_cache)
+    render           report figures (report_renderer.ReportRenderer)
+    align_faces      scripts/align_faces.py on synthetic headshots
+
+Stages that are not selected but needed by a selected one run untimed; a
+failing stage is recorded with its error and its dependents are skipped.
+Results are written as JSON under the cache folder, named by timestamp and
+git commit, and compare_benchmarks() lines up two runs stage by stage.
+"""
+
+import importlib.util
+import json
+import math
+import os
+import platform
+import shutil
+import subprocess
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence, Union
+
+import numpy as np
+import pandas as pd
+
+from data_cache import CACHE_DIR_NAME, COMBINED_DATA_PATH, DATA_FOLDER
+
+BENCHMARK_VERSION = 1
+DEFAULT_BENCHMARK_DIR = DATA_FOLDER / "DataCombined" / CACHE_DIR_NAME / "benchmarks"
+REPO_ROOT = Path(__file__).resolve().parent.parent.parent
+ALIGN_FACES_SCRIPT = REPO_ROOT / "scripts" / "align_faces.py"
+
+DEFAULT_SCALES = (1, 10, 100)
+STAGES = ['load', 'clean', 'per90', 'score', 'correlation_vif', 'train', 'shap', 'render', 'align_faces']
+STAGE_DEPENDENCIES = {
+    'clean': ['load'],
+    'per90': ['clean'],
+    'score': ['per90'],
+    'correlation_vif': ['score'],
+    'train': ['score'],
+    'shap': ['train'],
+    'render': ['correlation_vif', 'shap'],
+}
+
+# Modules imported before timing, so import cost is not charged to the first stage using them
+STAGE_IMPORTS = {
+    'clean': ['streaming'],
+    'correlation_vif': ['position_stats', 'model_training', 'multicollinearity'],
+    'train': ['model_training', 'sklearn.ensemble', 'sklearn.neural_network', 'xgboost'],
+    'shap': ['explanation_cache', 'shap'],
+    'render': ['report_renderer', 'matplotlib'],
+}
+
+# position_stats group keys -> model_training feature sets
+FEATURE_POSITIONS = {'FW': 'Forward', 'MF': 'Midfield', 'DF': 'Defense', 'GK': 'Goalkeeper'}
+
+# Synthetic headshots aligned per unit of scale
+IMAGES_PER_SCALE = 8
+# Slower than baseline by more than this fraction is reported as a regression
+REGRESSION_TOLERANCE = 0.20
+
+PathLike = Union[str, Path]
+
+
+def make_synthetic_matches(scale: float = 1, source: PathLike = COMBINED_DATA_PATH,
+                           seed: int = 0) -> pd.DataFrame:
+    """
+    Synthetic league with the combined match file's schema
+
+    Args:
+        scale: Size relative to the source file (fractions allowed)
+        source: Combined match CSV used as the template
+        seed: Noise seed
+
+    Returns:
+        DataFrame with round(scale * rows) rows and the source columns
+    """
+    rng = np.random.default_rng(seed)
+    base = pd.read_csv(source)
+    numeric = base.select_dtypes(include=[np.number]).columns.drop(['#', 'Season'], errors='ignore')
+    n_rows = max(1, int(round(scale * len(base))))
+    copies = []
+    for club in range(math.ceil(n_rows / len(base))):
+        df = base.copy()
+        if club:
+            df['Player'] = f"C{club:02d} " + df['Player'].astype(str)
+            noise = rng.integers(0, 2, size=(len(df), len(numeric)))
+            df[numeric] = df[numeric] + noise * (df[numeric] > 0)
+        copies.append(df)
+    return pd.concat(copies, ignore_index=True).iloc[:n_rows]
+
+
+def make_synthetic_headshots(folder: PathLike, count: int, size: int = 480, seed: int = 0) -> List[str]:
+    """Write simple face-like PNG portraits (skin ellipse, eyes, mouth) for the align stage."""
+    import cv2
+
+    rng = np.random.default_rng(seed)
+    folder = Path(folder)
+    folder.mkdir(parents=True, exist_ok=True)
+    paths = []
+    for i in range(count):
+        height, width = size, int(size * 0.8)
+        image = np.full((height, width, 3), rng.integers(150, 230, size=3), dtype=np.uint8)
+        cx = int(width * rng.uniform(0.4, 0.6))
+        cy = int(height * rng.uniform(0.35, 0.5))
+        face = int(width * 0.2)
+        cv2.ellipse(image, (cx, cy), (face, int(face * 1.3)), 0, 0, 360, (140, 170, 210), -1)
+        for dx in (-face // 2.5, face // 2.5):
+            cv2.circle(image, (int(cx + dx), cy - face // 4), face // 8, (40, 30, 30), -1)
+        cv2.ellipse(image, (cx, cy + face // 2), (face // 3, face // 8), 0, 0, 180, (60, 60, 150), -1)
+        path = folder / f"player_{i:04d}.png"
+        cv2.imwrite(str(path), image)
+        paths.append(str(path))
+    return paths
+
+
+def _load_align_faces():
+    spec = importlib.util.spec_from_file_location('align_faces', ALIGN_FACES_SCRIPT)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def _preload(stages: Sequence[str]) -> None:
+    for stage in stages:
+        for module in STAGE_IMPORTS.get(stage, []):
+            try:
+                importlib.import_module(module)
+            except ImportError:
+                pass
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        result = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_ROOT,
+                                capture_output=True, text=True, timeout=10)
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return result.stdout.strip() or None
+
+
+# ----------------------------------------------------------------------
+# Stages: each takes the shared context and returns its output
+# ----------------------------------------------------------------------
+def _stage_load(context: Dict):
+    return pd.read_csv(context['csv_path'])
+
+
+def _stage_clean(context: Dict):
+    from streaming import clean_frame
+    return clean_frame(context['load'], player_keys=['Player'])
+
+
+def _stage_per90(context: Dict):
+    from streaming import add_per90_features
+    return add_per90_features(context['clean'])
+
+
+def _stage_score(context: Dict):
+    from streaming import score_chunk
+    return score_chunk(context['per90'].copy())
+
+
+def _stage_correlation_vif(context: Dict):
+    from model_training import PER90_METRICS
+    from multicollinearity import vif_table
+    from position_stats import PositionStatsEngine
+
+    df = context['score']
+    metrics = sorted({m for group in PER90_METRICS.values() for m in group if m in df.columns})
+    engine = PositionStatsEngine(df, metrics=metrics)
+    output = {}
+    for position in engine.positions:
+        position_metrics = [m for m in PER90_METRICS[FEATURE_POSITIONS[position]] if m in engine.metrics]
+        rows = engine.values[engine.membership[position].to_numpy()][:, [engine.metrics.index(m) for m in position_metrics]]
+        rows = rows[~np.isnan(rows).any(axis=1)]
+        output[position] = {
+            'correlation': engine.correlation(position, position_metrics, complete_cases=True),
+            'vif': vif_table(rows, position_metrics) if len(rows) >= 10 else pd.DataFrame(),
+        }
+    return output
+
+
+def _stage_train(context: Dict):
+    from model_training import TrainingOrchestrator, build_position_datasets
+
+    datasets = build_position_datasets(context['score'], verbose=False)
+    orchestrator = TrainingOrchestrator(Path(context['workdir']) / f"models_{time.perf_counter_ns()}",
+                                        verbose=False)
+    results = orchestrator.run(datasets, context['models'])
+    fitted = {}
+    for row in orchestrator.best(results).itertuples(index=False):
+        if row.position not in fitted:
+            fitted[row.position] = orchestrator.load_model(row.key)
+    return {'datasets': datasets, 'fitted': fitted}
+
+
+def _stage_shap(context: Dict):
+    from explanation_cache import ExplanationCache
+
+    cache = ExplanationCache(Path(context['workdir']) / f"shap_{time.perf_counter_ns()}", verbose=False)
+    explanations = {}
+    for position, stored in context['train']['fitted'].items():
+        dataset = context['train']['datasets'][position]
+        explanations[position] = cache.explain(stored['model'], dataset['X_test'], stored['scaler'],
+                                               background=dataset['X_train'])
+    return explanations
+
+
+def _stage_render(context: Dict):
+    from explanation_cache import add_summary_figures
+    from model_training import PER90_METRICS
+    from report_renderer import ReportRenderer
+
+    renderer = ReportRenderer(Path(context['workdir']) / f"figures_{time.perf_counter_ns()}", verbose=False)
+    df = context['score']
+    renderer.add('score_distribution', 'hist', df['Rebalanced_Score'].dropna(), title='Rebalanced Score')
+    key_metrics = [m for m in PER90_METRICS['Forward'] if m in df.columns]
+    renderer.add('key_metrics_boxplot', 'boxplot', df[key_metrics], title='Key Metrics')
+    for position, output in context['correlation_vif'].items():
+        renderer.add(f"corr_{position}", 'heatmap', output['correlation'], title=f"{position} Correlation")
+    for position, explanation in context['shap'].items():
+        add_summary_figures(renderer, explanation, prefix=f"{position}_")
+    return renderer.render(force=True)
+
+
+def _stage_align_faces(context: Dict):
+    module = _load_align_faces()
+    return module.align_batch(context['headshots'], force=True, verbose=False)
+
+
+STAGE_FUNCTIONS: Dict[str, Callable] = {name: globals()[f"_stage_{name}"] for name in STAGES}
+
+
+def _stage_rows(name: str, output, context: Dict) -> int:
+    """Rows (images for align_faces, figures for render) processed by a stage."""
+    if name == 'align_faces':
+        return len(context['headshots'])
+    if name == 'render':
+        return len(output['rendered'])
+    if isinstance(output, pd.DataFrame):
+        return len(output)
+    if name == 'train':
+        return int(sum(len(d['X_train']) for d in output['datasets'].values()))
+    if name == 'shap':
+        return int(sum(len(e.values) for e in output.values()))
+    return len(context['score']) if 'score' in context else 0
+
+
+def _required_stages(stages: Sequence[str]) -> List[str]:
+    needed = set()
+
+    def visit(stage):
+        if stage not in needed:
+            needed.add(stage)
+            for dependency in STAGE_DEPENDENCIES.get(stage, []):
+                visit(dependency)
+
+    for stage in stages:
+        visit(stage)
+    return [stage for stage in STAGES if stage in needed]
+
+
+def run_benchmarks(scales: Sequence[float] = DEFAULT_SCALES,
+                   stages: Optional[Sequence[str]] = None,
+                   repeats: int = 1,
+                   models: Sequence[str] = ('rf',),
+                   output_dir: Optional[PathLike] = DEFAULT_BENCHMARK_DIR,
+                   workdir: Optional[PathLike] = None,
+                   verbose: bool = True) -> Dict:
+    """
+    Time every pipeline stage on synthetic data of each scale
+
+    Args:
+        scales: Dataset sizes relative to the combined match file
+        stages: Stages to time (default: all of STAGES)
+        repeats: Runs per stage; the best and median times are kept
+        models: Model names trained in the train stage
+        output_dir: Folder for the JSON result (None: do not write)
+        workdir: Scratch folder for CSVs, models and figures (default: temporary)
+        verbose: Print one line per stage
+
+    Returns:
+        Dictionary with run metadata and one result row per (scale, stage)
+    """
+    stages = list(STAGES) if stages is None else list(stages)
+    unknown = [stage for stage in stages if stage not in STAGE_FUNCTIONS]
+    if unknown:
+        raise ValueError(f"Unknown stage(s) {unknown} (expected some of {STAGES})")
+    if 'align_faces' in stages:
+        try:
+            import cv2  # noqa: F401
+        except ImportError:
+            print("⚠️ OpenCV not installed; skipping align_faces")
+            stages.remove('align_faces')
+    run_stages = _required_stages(stages)
+    _preload(run_stages)
+
+    cleanup = workdir is None
+    workdir = Path(tempfile.mkdtemp(prefix='benchmarks_')) if workdir is None else Path(workdir)
+    workdir.mkdir(parents=True, exist_ok=True)
+    results = []
+    try:
+        for scale in scales:
+            data = make_synthetic_matches(scale)
+            csv_path = workdir / f"matches_x{scale}.csv"
+            data.to_csv(csv_path, index=False)
+            context = {'csv_path': csv_path, 'workdir': workdir, 'models': list(models)}
+            del data
+            if 'align_faces' in run_stages:
+                count = max(2, int(round(IMAGES_PER_SCALE * scale)))
+                context['headshots'] = make_synthetic_headshots(workdir / f"headshots_x{scale}", count)
+
+            for stage in run_stages:
+                timed = stage in stages
+                failed = [dep for dep in STAGE_DEPENDENCIES.get(stage, []) if dep not in context]
+                seconds, error = [], None
+                if failed:
+                    error = f"skipped: {', '.join(failed)} failed"
+                else:
+                    try:
+                        for _ in range(repeats if timed else 1):
+                            start = time.perf_counter()
+                            output = STAGE_FUNCTIONS[stage](context)
+                            seconds.append(time.perf_counter() - start)
+                        context[stage] = output
+                    except Exception as e:
+                        error = f"{type(e).__name__}: {e}"
+                if not timed:
+                    continue
+                if error is not None:
+                    results.append({'scale': scale, 'stage': stage, 'rows': None, 'seconds': None,
+                                    'median_seconds': None, 'repeats': 0, 'rows_per_s': None,
+                                    'error': error})
+                    if verbose:
+                        print(f"❌ x{scale:<6} {stage:<16} {error}")
+                    continue
+                rows = _stage_rows(stage, output, context)
+                results.append({
+                    'scale': scale,
+                    'stage': stage,
+                    'rows': rows,
+                    'seconds': min(seconds),
+                    'median_seconds': float(np.median(seconds)),
+                    'repeats': len(seconds),
+                    'rows_per_s': rows / min(seconds) if min(seconds) > 0 else None,
+                    'error': None,
+                })
+                if verbose:
+                    print(f"✅ x{scale:<6} {stage:<16} {min(seconds):8.3f}s  ({rows:,} rows)")
+            csv_path.unlink()
+    finally:
+        if cleanup:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        'version': BENCHMARK_VERSION,
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'commit': _git_commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'packages': {'numpy': np.__version__, 'pandas': pd.__version__},
+        'scales': list(scales),
+        'repeats': repeats,
+        'models': list(models),
+        'results': results,
+    }
+    if output_dir is not None:
+        report['path'] = str(save_benchmark(report, output_dir))
+        if verbose:
+            print(f"✅ Benchmark saved to {report['path']}")
+    return report
+
+
+def save_benchmark(report: Dict, output_dir: PathLike = DEFAULT_BENCHMARK_DIR) -> Path:
+    """Write a benchmark report as <timestamp>_<commit>.json (atomically)."""
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    stamp = report['timestamp'].replace(':', '').replace('-', '')
+    path = output_dir / f"{stamp}_{report.get('commit') or 'nocommit'}.json"
+    tmp_path = path.with_suffix('.json.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as handle:
+        json.dump({key: value for key, value in report.items() if key != 'path'}, handle, indent=2)
+    os.replace(tmp_path, path)
+    return path
+
+
+def load_benchmark(path: PathLike) -> Dict:
+    """Read a benchmark report."""
+    with open(path, 'r', encoding='utf-8') as handle:
+        return json.load(handle)
+
+
+def compare_benchmarks(baseline: Union[Dict, PathLike], current: Union[Dict, PathLike],
+                       tolerance: float = REGRESSION_TOLERANCE, verbose: bool = True) -> pd.DataFrame:
+    """
+    Stage-by-stage comparison of two benchmark reports
+
+    Args:
+        baseline: Report (or its JSON path) of the reference commit
+        current: Report (or its JSON path) to check
+        tolerance: Slowdown fraction reported as a regression
+
+    Returns:
+        DataFrame with scale, stage, both times, ratio (current / baseline) and status
+    """
+    baseline = baseline if isinstance(baseline, dict) else load_benchmark(baseline)
+    current = current if isinstance(current, dict) else load_benchmark(current)
+    columns = ['scale', 'stage', 'seconds']
+    merged = pd.DataFrame(baseline['results'])[columns].dropna().merge(
+        pd.DataFrame(current['results'])[columns].dropna(), on=['scale', 'stage'],
+        suffixes=('_baseline', '_current'))
+    merged['ratio'] = merged['seconds_current'] / merged['seconds_baseline']
+    merged['status'] = np.where(merged['ratio'] > 1 + tolerance, 'REGRESSION',
+                                np.where(merged['ratio'] < 1 - tolerance, 'FASTER', 'OK'))
+    if verbose:
+        print(f"Baseline {baseline.get('commit')} -> current {current.get('commit')}")
+        for row in merged.itertuples(index=False):
+            icon = '⚠️' if row.status == 'REGRESSION' else '✅'
+            print(f"{icon} x{row.scale:<6} {row.stage:<16} {row.seconds_baseline:8.3f}s -> "
+                  f"{row.seconds_current:8.3f}s ({row.ratio:.2f}x) {row.status}")
+    return merged
+
+
+def latest_benchmarks(output_dir: PathLike = DEFAULT_BENCHMARK_DIR, count: int = 2) -> List[Path]:
+    """Most recent benchmark reports, oldest first."""
+    return sorted(Path(output_dir).glob('*.json'))[-count:]
+
+
+def quick_benchmark(scales: Sequence[float] = (1,), stages: Optional[Sequence[str]] = None) -> pd.DataFrame:
+    """
+    Quick function to benchmark the pipeline and compare with the previous run
+
+    Args:
+        scales: Dataset sizes relative to the combined match file
+        stages: Stages to time (default: all)
+
+    Returns:
+        Comparison with the previous report, or the new results when there is none
+    """
+    previous = latest_benchmarks(count=1)
+    report = run_benchmarks(scales, stages)
+    if previous:
+        return compare_benchmarks(previous[0], report)
+    return pd.DataFrame(report['results'])
+
+
+if __name__ == "__main__":
+    print("Testing Benchmarks Module...")
+    quick_benchmark()
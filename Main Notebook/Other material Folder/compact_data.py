@@ -0,0 +1,367 @@
+"""
+Compact Data Module for Real Madrid Soccer Analysis
+Contains a schema-aware compact representation of the match-level player table
+
+Most of the wide table's memory goes to repeated strings and to per-match
+counts stored as float64. The compact form dictionary-encodes string columns
+(category dtype), stores `Age` ("28-035": years-days) as integer days of age,
+downcasts numeric columns to the smallest integer (nullable when values are
+missing) or float32 type that holds them, and replaces the `Match URL` string
+by a small integer match id. The URLs live once in a match table keyed by
+that id, which can be joined to the schedule table on the match date.
+to_wide() rebuilds the original columns, dtypes and column order.
+"""
+
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+from data_cache import COMBINED_DATA_PATH, DATA_FOLDER, load_match_data
+
+SCHEDULE_DATA_PATH = DATA_FOLDER / "DataCombined" / "real_madrid_schedule_all_seasons_combined.csv"
+
+AGE_COLUMN = 'Age'
+DATE_COLUMN = 'Date'
+MATCH_URL_COLUMN = 'Match URL'
+MATCH_ID_COLUMN = 'match_id'
+AGE_DAYS_COLUMN = 'Age_Days'
+
+# FBref match id inside a match report URL (https://fbref.com/en/matches/<id>/...)
+MATCH_CODE_PATTERN = r'/matches/([0-9a-f]+)'
+
+PathLike = Union[str, Path]
+
+
+def _is_text(series: pd.Series) -> bool:
+    return pd.api.types.is_object_dtype(series.dtype) or pd.api.types.is_string_dtype(series.dtype)
+
+
+def _as_dates(values: pd.Series) -> pd.Series:
+    """Datetime view of a date column (parses strings once per distinct value)."""
+    if pd.api.types.is_datetime64_any_dtype(values.dtype):
+        return values
+    codes, uniques = pd.factorize(values)
+    parsed = pd.to_datetime(pd.Series(uniques, dtype=object), errors='coerce', format='mixed')
+    return pd.Series(parsed.to_numpy()[codes], index=values.index).where(codes >= 0)
+
+
+def smallest_int_dtype(values: np.ndarray, nullable: bool = False) -> str:
+    """
+    Smallest integer dtype name holding integer-valued data
+
+    Args:
+        values: Finite integer-valued numbers
+        nullable: Return the pandas nullable name (Int8) instead of int8
+
+    Returns:
+        Signed dtype name such as 'int8' or 'Int16'
+    """
+    low, high = (int(values.min()), int(values.max())) if len(values) else (0, 0)
+    for bits in (8, 16, 32, 64):
+        info = np.iinfo(f'int{bits}')
+        if info.min <= low and high <= info.max:
+            return f"{'Int' if nullable else 'int'}{bits}"
+    raise OverflowError(f"Values in [{low}, {high}] do not fit in int64")
+
+
+def downcast_numeric(series: pd.Series, float32: bool = True) -> pd.Series:
+    """
+    Store a numeric column in the smallest type that holds it
+
+    Integer-valued columns become int8/16/32 (Int8/16/32 when values are
+    missing); other float columns become float32 when float32 is True.
+    """
+    if pd.api.types.is_bool_dtype(series.dtype) or not pd.api.types.is_numeric_dtype(series.dtype):
+        return series
+    values = series.to_numpy(dtype=np.float64, na_value=np.nan)
+    finite = values[np.isfinite(values)]
+    missing = np.isnan(values)
+    if len(finite) == (~missing).sum() and np.array_equal(finite, np.round(finite)):
+        dtype = smallest_int_dtype(finite, nullable=bool(missing.any()))
+        return series.astype(dtype)
+    if float32 and series.dtype == np.float64:
+        return series.astype(np.float32)
+    return series
+
+
+def parse_age_days(age: pd.Series, dates: pd.Series) -> pd.Series:
+    """
+    Convert FBref ages ("years-days" on the match date) to integer days of age
+
+    The birth date is recovered from the match date, so the result is the
+    exact number of days lived. Rows without a parseable age or date are <NA>.
+    """
+    parts = age.astype(object).str.extract(r'^\s*(\d+)-(\d+)\s*$')
+    years = pd.to_numeric(parts[0], errors='coerce')
+    days = pd.to_numeric(parts[1], errors='coerce')
+    dates = _as_dates(dates)
+
+    birthday = dates - pd.to_timedelta(days, unit='D')
+    birth = pd.to_datetime(pd.DataFrame({
+        'year': birthday.dt.year - years,
+        'month': birthday.dt.month,
+        'day': birthday.dt.day,
+    }), errors='coerce')
+    total = (dates - birth).dt.days
+    return total.astype('Int32').astype(smallest_int_dtype(total.dropna().to_numpy(), nullable=True))
+
+
+def format_age(age_days: pd.Series, dates: pd.Series) -> pd.Series:
+    """Inverse of parse_age_days(): "years-days" strings (NaN where unknown)."""
+    dates = _as_dates(dates)
+    birth = dates - pd.to_timedelta(age_days.astype('Float64').to_numpy(dtype=np.float64, na_value=np.nan), unit='D')
+    before_birthday = (dates.dt.month < birth.dt.month) | (
+        (dates.dt.month == birth.dt.month) & (dates.dt.day < birth.dt.day))
+    years = dates.dt.year - birth.dt.year - before_birthday.astype(int)
+    last_birthday = pd.to_datetime(pd.DataFrame({
+        'year': birth.dt.year + years,
+        'month': birth.dt.month,
+        'day': birth.dt.day,
+    }), errors='coerce')
+    days = (dates - last_birthday).dt.days
+
+    valid = years.notna() & days.notna()
+    text = pd.Series(np.nan, index=age_days.index, dtype=object)
+    text[valid] = (years[valid].astype(int).astype(str) + '-'
+                   + days[valid].astype(int).astype(str).str.zfill(3))
+    return text
+
+
+def intern_match_urls(urls: pd.Series, dates: Optional[pd.Series] = None):
+    """
+    Replace match URLs by integer match ids
+
+    Args:
+        urls: Match URL column
+        dates: Optional date column stored once per match
+
+    Returns:
+        Tuple of (match id Series, match table indexed by match_id)
+    """
+    codes, uniques = pd.factorize(urls)
+    matches = pd.DataFrame({MATCH_URL_COLUMN: pd.Series(uniques, dtype=object)})
+    matches.index.name = MATCH_ID_COLUMN
+    matches['match_code'] = matches[MATCH_URL_COLUMN].str.extract(MATCH_CODE_PATTERN)[0]
+    if dates is not None:
+        first_rows = pd.Series(np.arange(len(codes))).groupby(codes).first()
+        first_rows = first_rows[first_rows.index >= 0]
+        matches[DATE_COLUMN] = _as_dates(dates).to_numpy()[first_rows.to_numpy()]
+
+    ids = pd.Series(codes, index=urls.index).where(codes >= 0)
+    ids = ids.astype(smallest_int_dtype(np.array([0, max(len(uniques) - 1, 0)]), nullable=True))
+    return ids, matches
+
+
+def join_schedule(matches: pd.DataFrame, schedule: pd.DataFrame, on: str = DATE_COLUMN) -> pd.DataFrame:
+    """
+    Attach schedule columns (Result, Venue, GF, GA, ...) to the match table
+
+    The schedule has no match URL, so matches are joined on the match date
+    (one fixture per day). Schedule columns that clash with match table
+    columns get a '_schedule' suffix.
+    """
+    schedule = schedule.copy()
+    schedule[on] = _as_dates(schedule[on])
+    schedule = schedule.dropna(subset=[on]).drop_duplicates(subset=[on])
+    joined = matches.reset_index().merge(schedule, on=on, how='left', suffixes=('', '_schedule'))
+    return joined.set_index(MATCH_ID_COLUMN)
+
+
+def memory_report(before: pd.DataFrame, after: pd.DataFrame,
+                  extra: Optional[pd.DataFrame] = None) -> pd.DataFrame:
+    """
+    Per-column memory of a wide frame and its compact form
+
+    Args:
+        before: Wide DataFrame
+        after: Compact DataFrame
+        extra: Side table counted once in the total (e.g. the match table)
+
+    Returns:
+        DataFrame with dtypes, bytes and ratio per column plus a TOTAL row
+    """
+    before_bytes = before.memory_usage(deep=True, index=False)
+    after_bytes = after.memory_usage(deep=True, index=False)
+    rows = []
+    for col in before.columns:
+        target = AGE_DAYS_COLUMN if col == AGE_COLUMN else MATCH_ID_COLUMN if col == MATCH_URL_COLUMN else col
+        rows.append({
+            'column': col,
+            'before_dtype': str(before[col].dtype),
+            'after_dtype': str(after[target].dtype) if target in after.columns else '',
+            'before_bytes': int(before_bytes[col]),
+            'after_bytes': int(after_bytes.get(target, 0)),
+        })
+    extra_bytes = int(extra.memory_usage(deep=True).sum()) if extra is not None else 0
+    if extra is not None:
+        rows.append({'column': 'match table', 'before_dtype': '', 'after_dtype': '',
+                     'before_bytes': 0, 'after_bytes': extra_bytes})
+    report = pd.DataFrame(rows)
+    report.loc[len(report)] = ['TOTAL', '', '', int(report['before_bytes'].sum()), int(report['after_bytes'].sum())]
+    report['ratio'] = report['before_bytes'] / report['after_bytes'].replace(0, np.nan)
+    return report.set_index('column')
+
+
+class CompactMatchTable:
+    """Class holding the compact player-match rows and the match table"""
+
+    def __init__(self, players: pd.DataFrame, matches: pd.DataFrame,
+                 wide_columns: List[str], wide_dtypes: Dict[str, object]):
+        """
+        Args:
+            players: Compact player-match rows
+            matches: Match table indexed by match_id
+            wide_columns: Column order of the wide frame
+            wide_dtypes: dtype of every wide column
+        """
+        self.players = players
+        self.matches = matches
+        self.wide_columns = wide_columns
+        self.wide_dtypes = wide_dtypes
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, schedule: Optional[pd.DataFrame] = None,
+                   float32: bool = True) -> 'CompactMatchTable':
+        """
+        Build the compact form of a wide player-match frame
+
+        Args:
+            df: Wide DataFrame (raw CSV or the DataCache typed frame)
+            schedule: Optional schedule table joined to the match table
+            float32: Store non-integer float columns as float32
+
+        Returns:
+            CompactMatchTable
+        """
+        columns = {}
+        matches = None
+        dates = df[DATE_COLUMN] if DATE_COLUMN in df.columns else None
+        for col in df.columns:
+            series = df[col]
+            if col == MATCH_URL_COLUMN:
+                columns[MATCH_ID_COLUMN], matches = intern_match_urls(series, dates)
+            elif col == AGE_COLUMN and dates is not None and _is_text(series):
+                columns[AGE_DAYS_COLUMN] = parse_age_days(series, dates)
+            elif _is_text(series):
+                columns[col] = series.astype('category')
+            else:
+                columns[col] = downcast_numeric(series, float32)
+
+        if matches is None:
+            matches = pd.DataFrame(index=pd.RangeIndex(0, name=MATCH_ID_COLUMN))
+        if schedule is not None:
+            matches = join_schedule(matches, schedule)
+        players = pd.DataFrame(columns, index=df.index)
+        return cls(players, matches, list(df.columns), dict(df.dtypes))
+
+    def match_columns(self, columns: List[str]) -> pd.DataFrame:
+        """Match table columns (e.g. Result, Venue) aligned to the player rows."""
+        ids = self.players[MATCH_ID_COLUMN]
+        valid = ids.notna().to_numpy()
+        out = pd.DataFrame(index=self.players.index)
+        for col in columns:
+            values = self.matches[col]
+            taken = values.iloc[ids[valid].to_numpy(dtype=np.int64)].to_numpy()
+            column = pd.Series(np.nan, index=self.players.index, dtype=object if _is_text(values) else np.float64)
+            if pd.api.types.is_datetime64_any_dtype(values.dtype):
+                column = pd.Series(pd.NaT, index=self.players.index, dtype=values.dtype)
+            column[valid] = taken
+            out[col] = column
+        return out
+
+    def to_wide(self, columns: Optional[List[str]] = None) -> pd.DataFrame:
+        """
+        Rebuild the wide frame (original columns, order and dtypes)
+
+        Args:
+            columns: Subset of wide columns to rebuild (default: all)
+
+        Returns:
+            Wide DataFrame
+        """
+        columns = self.wide_columns if columns is None else columns
+        wide = {}
+        for col in columns:
+            dtype = self.wide_dtypes[col]
+            if col == MATCH_URL_COLUMN:
+                values = self.match_columns([MATCH_URL_COLUMN])[MATCH_URL_COLUMN]
+            elif col == AGE_COLUMN and AGE_DAYS_COLUMN in self.players.columns:
+                values = format_age(self.players[AGE_DAYS_COLUMN], self.players[DATE_COLUMN])
+            else:
+                values = self.players[col]
+            wide[col] = pd.Series(values, index=self.players.index).astype(dtype)
+        return pd.DataFrame(wide, index=self.players.index)
+
+    def memory_usage(self) -> int:
+        """Bytes used by the player rows and the match table."""
+        return int(self.players.memory_usage(deep=True).sum() + self.matches.memory_usage(deep=True).sum())
+
+    def memory_report(self, wide: Optional[pd.DataFrame] = None) -> pd.DataFrame:
+        """memory_report() against a wide frame (default: to_wide())."""
+        wide = self.to_wide() if wide is None else wide
+        return memory_report(wide, self.players, self.matches)
+
+
+def print_memory_report(report: pd.DataFrame, top: int = 10) -> None:
+    """Print the largest columns and the before/after totals of a memory report."""
+    body = report.drop(index='TOTAL').sort_values('before_bytes', ascending=False).head(top)
+    print(f"{'Column':<22} {'Before':>22} {'After':>22} {'Ratio':>7}")
+    for col, row in body.iterrows():
+        print(f"{str(col)[:22]:<22} {row['before_bytes'] / 1024:>9.1f} KB {row['before_dtype'][:9]:>9} "
+              f"{row['after_bytes'] / 1024:>9.1f} KB {row['after_dtype'][:9]:>9} {row['ratio']:>6.1f}x")
+    total = report.loc['TOTAL']
+    print(f"Total: {total['before_bytes'] / 1e6:.2f} MB -> {total['after_bytes'] / 1e6:.2f} MB "
+          f"({total['ratio']:.1f}x smaller)")
+
+
+def load_compact_match_data(path: Optional[PathLike] = None,
+                            schedule_path: Optional[PathLike] = SCHEDULE_DATA_PATH,
+                            refresh: bool = False, float32: bool = True,
+                            verbose: bool = True, **cache_kwargs) -> CompactMatchTable:
+    """
+    Load the combined player-match dataset in compact form
+
+    Args:
+        path: Path to the combined CSV (default: DataCombined/001_real_madrid_all_seasons_combined.csv)
+        schedule_path: Schedule CSV joined to the match table (None: no join)
+        refresh: Force a cache rebuild
+        float32: Store non-integer float columns as float32
+        verbose: Print the before/after memory
+        **cache_kwargs: Options forwarded to DataCache
+
+    Returns:
+        CompactMatchTable
+    """
+    cache_kwargs.setdefault('verbose', verbose)
+    df = load_match_data(path or COMBINED_DATA_PATH, refresh=refresh, **cache_kwargs)
+    schedule = None
+    if schedule_path is not None and Path(schedule_path).exists():
+        schedule = pd.read_csv(schedule_path)
+    table = CompactMatchTable.from_frame(df, schedule, float32)
+    if verbose:
+        before = df.memory_usage(deep=True).sum()
+        after = table.memory_usage()
+        print(f"✅ Compact match data: {before / 1e6:.2f} MB -> {after / 1e6:.2f} MB "
+              f"({before / after:.1f}x smaller, {len(table.matches)} matches)")
+    return table
+
+
+def example_compact_memory(path: Optional[PathLike] = None) -> pd.DataFrame:
+    """Example: memory of the raw CSV frame against its compact form"""
+    source = Path(path or COMBINED_DATA_PATH)
+    wide = pd.read_csv(source)
+    start = time.perf_counter()
+    table = CompactMatchTable.from_frame(wide, pd.read_csv(SCHEDULE_DATA_PATH))
+    elapsed = time.perf_counter() - start
+    report = table.memory_report(wide)
+    print_memory_report(report)
+    print(f"Compacted {len(wide):,} rows in {elapsed * 1000:.1f} ms")
+    return report
+
+
+if __name__ == "__main__":
+    print("Testing Compact Data Module...")
+    example_compact_memory()
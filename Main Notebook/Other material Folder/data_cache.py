@@ -0,0 +1,385 @@
+"""
+Data Cache Module for Real Madrid Soccer Analysis
+Contains a shared, cached loader for the combined match datasets
+
+The first load of a CSV parses it, applies the project dtypes (parsed dates,
+categorical identifiers, float32 metrics) and stores the typed frame in an
+uncompressed Arrow IPC (Feather) file next to the source, which is read back
+memory-mapped. Later loads read the cache directly and only rebuild it when
+the source CSV changes.
+"""
+
+import hashlib
+import json
+import os
+import time
+import warnings
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from tracing import traced
+
+# Default locations inside the project tree
+DATA_FOLDER = Path(__file__).resolve().parent.parent / "Data Folder"
+COMBINED_DATA_PATH = DATA_FOLDER / "DataCombined" / "001_real_madrid_all_seasons_combined.csv"
+REBALANCED_SCORES_PATH = DATA_FOLDER / "DataCombined" / "real_madrid_rebalanced_scores.csv"
+
+CACHE_DIR_NAME = ".cache"
+CACHE_VERSION = 1
+
+# Columns typed on load
+DATE_COLUMNS = ['Date']
+CATEGORICAL_COLUMNS = ['Pos', 'Competition', 'Opponent', 'Player']
+
+PathLike = Union[str, Path]
+
+
+def _arrow_available() -> bool:
+    """Return True when pyarrow can be imported."""
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def file_fingerprint(path: PathLike, with_hash: bool = True) -> Dict:
+    """
+    Describe the current state of a source file
+
+    Args:
+        path: Path to the source file
+        with_hash: Also compute the SHA-1 of the file contents
+
+    Returns:
+        Dictionary with size, mtime_ns and (optionally) sha1
+    """
+    stat = os.stat(path)
+    fingerprint = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+    if with_hash:
+        digest = hashlib.sha1()
+        with open(path, 'rb') as handle:
+            for block in iter(lambda: handle.read(1 << 20), b''):
+                digest.update(block)
+        fingerprint['sha1'] = digest.hexdigest()
+    return fingerprint
+
+
+def apply_schema(df: pd.DataFrame,
+                 date_cols: Optional[List[str]] = None,
+                 categorical_cols: Optional[List[str]] = None,
+                 float32: bool = True) -> pd.DataFrame:
+    """
+    Apply the project dtypes to a freshly parsed frame
+
+    Args:
+        df: Raw DataFrame as returned by pd.read_csv
+        date_cols: Columns parsed with pd.to_datetime(errors='coerce')
+        categorical_cols: Columns converted to the category dtype
+        float32: Downcast float64 metric columns to float32
+
+    Returns:
+        The typed DataFrame (modified in place and returned)
+    """
+    date_cols = DATE_COLUMNS if date_cols is None else date_cols
+    categorical_cols = CATEGORICAL_COLUMNS if categorical_cols is None else categorical_cols
+
+    for col in date_cols:
+        if col in df.columns:
+            with warnings.catch_warnings():
+                warnings.simplefilter('ignore', UserWarning)
+                df[col] = pd.to_datetime(df[col], errors='coerce')
+
+    for col in categorical_cols:
+        if col in df.columns:
+            df[col] = df[col].astype('category')
+
+    if float32:
+        float_cols = df.select_dtypes(include=['float64']).columns
+        if len(float_cols) > 0:
+            df[float_cols] = df[float_cols].astype(np.float32)
+
+    return df
+
+
+class DataCache:
+    """Class for loading CSV datasets through a persistent columnar cache"""
+
+    def __init__(self, cache_dir: Optional[PathLike] = None,
+                 date_cols: Optional[List[str]] = None,
+                 categorical_cols: Optional[List[str]] = None,
+                 float32: bool = True,
+                 verbose: bool = True):
+        """
+        Args:
+            cache_dir: Folder for cache files (default: '.cache' next to each source)
+            date_cols: Columns parsed as dates
+            categorical_cols: Columns stored as categoricals
+            float32: Store float metrics as float32
+            verbose: Print load/rebuild messages
+        """
+        self.cache_dir = Path(cache_dir) if cache_dir is not None else None
+        self.date_cols = list(DATE_COLUMNS if date_cols is None else date_cols)
+        self.categorical_cols = list(CATEGORICAL_COLUMNS if categorical_cols is None else categorical_cols)
+        self.float32 = float32
+        self.verbose = verbose
+        self.format = 'arrow' if _arrow_available() else 'pickle'
+
+    def _options(self) -> Dict:
+        return {
+            'version': CACHE_VERSION,
+            'format': self.format,
+            'date_cols': self.date_cols,
+            'categorical_cols': self.categorical_cols,
+            'float32': self.float32,
+        }
+
+    def cache_paths(self, source: PathLike) -> Tuple[Path, Path]:
+        """
+        Locate the cache files for a source CSV
+
+        Args:
+            source: Path to the source CSV
+
+        Returns:
+            Tuple of (data_path, meta_path)
+        """
+        source = Path(source)
+        cache_dir = self.cache_dir if self.cache_dir is not None else source.parent / CACHE_DIR_NAME
+        options_key = hashlib.sha1(
+            json.dumps(self._options(), sort_keys=True).encode('utf-8')
+        ).hexdigest()[:8]
+        stem = f"{source.stem}.{options_key}"
+        extension = 'feather' if self.format == 'arrow' else 'pkl'
+        return cache_dir / f"{stem}.{extension}", cache_dir / f"{stem}.json"
+
+    def _read_meta(self, meta_path: Path) -> Optional[Dict]:
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as handle:
+                return json.load(handle)
+        except (OSError, ValueError):
+            return None
+
+    def is_fresh(self, source: PathLike) -> bool:
+        """
+        Check whether the cache for a source CSV is up to date
+
+        Size and mtime are compared first; if either changed, the content
+        hash decides, so touching a file without editing it keeps the cache.
+
+        Args:
+            source: Path to the source CSV
+
+        Returns:
+            True if the cached frame can be used as is
+        """
+        data_path, meta_path = self.cache_paths(source)
+        meta = self._read_meta(meta_path)
+        if meta is None or not data_path.exists() or meta.get('options') != self._options():
+            return False
+
+        cached = meta.get('source', {})
+        current = file_fingerprint(source, with_hash=False)
+        if cached.get('size') == current['size'] and cached.get('mtime_ns') == current['mtime_ns']:
+            return True
+
+        current = file_fingerprint(source)
+        if cached.get('sha1') != current['sha1']:
+            return False
+
+        # Same contents, new mtime: refresh the metadata so the next check is cheap
+        meta['source'] = current
+        self._write_meta(meta_path, meta)
+        return True
+
+    def _write_meta(self, meta_path: Path, meta: Dict) -> None:
+        tmp_path = meta_path.with_suffix('.json.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as handle:
+            json.dump(meta, handle, indent=2)
+        os.replace(tmp_path, meta_path)
+
+    def build(self, source: PathLike) -> pd.DataFrame:
+        """
+        Parse a source CSV, apply the schema and write the cache
+
+        Args:
+            source: Path to the source CSV
+
+        Returns:
+            Typed DataFrame
+        """
+        source = Path(source)
+        data_path, meta_path = self.cache_paths(source)
+        data_path.parent.mkdir(parents=True, exist_ok=True)
+
+        fingerprint = file_fingerprint(source)
+        df = apply_schema(pd.read_csv(source), self.date_cols, self.categorical_cols, self.float32)
+
+        tmp_path = data_path.with_name(data_path.name + '.tmp')
+        if self.format == 'arrow':
+            from pyarrow import feather
+            feather.write_feather(df, tmp_path, compression='uncompressed')
+        else:
+            df.to_pickle(tmp_path)
+        os.replace(tmp_path, data_path)
+
+        self._write_meta(meta_path, {
+            'source': fingerprint,
+            'source_path': str(source),
+            'options': self._options(),
+            'shape': list(df.shape),
+            'built_at': time.strftime('%Y-%m-%d %H:%M:%S'),
+        })
+        if self.verbose:
+            print(f"✅ Cache rebuilt for {source.name}: {df.shape}")
+        return df
+
+    @traced(name='DataCache.load')
+    def load(self, source: PathLike, refresh: bool = False) -> pd.DataFrame:
+        """
+        Load a CSV through the cache, rebuilding it if the source changed
+
+        Args:
+            source: Path to the source CSV
+            refresh: Force a rebuild even if the cache is fresh
+
+        Returns:
+            Typed DataFrame
+        """
+        source = Path(source)
+        if not source.exists():
+            raise FileNotFoundError(f"Source file not found: {source}")
+
+        if refresh or not self.is_fresh(source):
+            return self.build(source)
+
+        data_path, _ = self.cache_paths(source)
+        try:
+            if self.format == 'arrow':
+                from pyarrow import feather
+                df = feather.read_table(data_path, memory_map=True).to_pandas()
+            else:
+                df = pd.read_pickle(data_path)
+        except Exception as e:
+            print(f"⚠️ Could not read cache for {source.name} ({e}); rebuilding")
+            return self.build(source)
+
+        if self.verbose:
+            print(f"✅ Loaded {source.name} from cache: {df.shape}")
+        return df
+
+    def status(self, source: PathLike) -> Dict:
+        """
+        Describe the cache state of a source CSV without loading it
+
+        Args:
+            source: Path to the source CSV
+
+        Returns:
+            Dictionary with the cache path, freshness and cached shape
+        """
+        data_path, meta_path = self.cache_paths(source)
+        meta = self._read_meta(meta_path) or {}
+        return {
+            'source': str(source),
+            'cache_path': str(data_path),
+            'exists': data_path.exists(),
+            'fresh': Path(source).exists() and self.is_fresh(source),
+            'shape': meta.get('shape'),
+            'built_at': meta.get('built_at'),
+        }
+
+    def clear(self, source: PathLike) -> None:
+        """Remove the cache files of a source CSV."""
+        for path in self.cache_paths(source):
+            if path.exists():
+                path.unlink()
+
+
+def load_match_data(path: Optional[PathLike] = None, refresh: bool = False,
+                    compact: bool = False, **cache_kwargs):
+    """
+    Load the combined player-match dataset through the cache
+
+    Args:
+        path: Path to the combined CSV (default: DataCombined/001_real_madrid_all_seasons_combined.csv)
+        refresh: Force a cache rebuild
+        compact: Return a compact_data.CompactMatchTable (dictionary-encoded
+            strings, integer ages, downcast counts, interned match URLs)
+        **cache_kwargs: Options forwarded to DataCache
+
+    Returns:
+        Typed DataFrame, or CompactMatchTable when compact is True
+    """
+    if compact:
+        from compact_data import load_compact_match_data
+        return load_compact_match_data(path, refresh=refresh, **cache_kwargs)
+    return DataCache(**cache_kwargs).load(path or COMBINED_DATA_PATH, refresh=refresh)
+
+
+def load_rebalanced_scores(path: Optional[PathLike] = None, refresh: bool = False, **cache_kwargs) -> pd.DataFrame:
+    """
+    Load the rebalanced scores dataset through the cache
+
+    Args:
+        path: Path to the rebalanced scores CSV (default: DataCombined/real_madrid_rebalanced_scores.csv)
+        refresh: Force a cache rebuild
+        **cache_kwargs: Options forwarded to DataCache
+
+    Returns:
+        Typed DataFrame
+    """
+    return DataCache(**cache_kwargs).load(path or REBALANCED_SCORES_PATH, refresh=refresh)
+
+
+def quick_load(data_folder: Optional[PathLike] = None) -> Tuple[pd.DataFrame, Optional[pd.DataFrame]]:
+    """
+    Quick function to load the combined and rebalanced datasets
+
+    Args:
+        data_folder: Folder containing the CSVs (default: Data Folder/DataCombined)
+
+    Returns:
+        Tuple of (match_data, rebalanced_data); rebalanced_data is None if missing
+    """
+    folder = Path(data_folder) if data_folder is not None else COMBINED_DATA_PATH.parent
+    df = load_match_data(folder / COMBINED_DATA_PATH.name)
+    try:
+        rebalanced_df = load_rebalanced_scores(folder / REBALANCED_SCORES_PATH.name)
+    except FileNotFoundError:
+        print("⚠️ Rebalanced dataset not found")
+        rebalanced_df = None
+    return df, rebalanced_df
+
+
+def example_cache_timing(path: Optional[PathLike] = None, repeats: int = 5) -> Dict[str, float]:
+    """Example: compare plain CSV parsing with cold and warm cached loads"""
+    source = Path(path or COMBINED_DATA_PATH)
+    cache = DataCache(verbose=False)
+
+    start = time.perf_counter()
+    for _ in range(repeats):
+        apply_schema(pd.read_csv(source))
+    csv_time = (time.perf_counter() - start) / repeats
+
+    start = time.perf_counter()
+    cache.load(source, refresh=True)
+    cold_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(repeats):
+        cache.load(source)
+    warm_time = (time.perf_counter() - start) / repeats
+
+    print(f"CSV parse + typing: {csv_time * 1000:.1f} ms")
+    print(f"Cold cache build:   {cold_time * 1000:.1f} ms")
+    print(f"Warm cache load:    {warm_time * 1000:.1f} ms ({csv_time / warm_time:.1f}x faster)")
+    return {'csv': csv_time, 'cold': cold_time, 'warm': warm_time}
+
+
+if __name__ == "__main__":
+    print("Testing Data Cache Module...")
+    example_cache_timing()
@@ -0,0 +1,277 @@
+"""
+Explanation Cache Module for Real Madrid Soccer Analysis
+Contains a SHAP explanation layer that reuses explainers and SHAP values
+
+The SHAP_Analysis notebook builds a new shap.Explainer for every position
+model in each analysis cell and explains the full test set each time.
+ExplanationCache keeps one explainer per model hash in memory and stores
+SHAP value rows on disk per (model hash, feature set), keyed by a hash of
+each row, so explaining a grown test set only computes the new rows.
+
+- Tree models (RandomForest, GradientBoosting, XGBoost, ...) use
+  shap.TreeExplainer's exact path-dependent algorithm, no background needed.
+- A VotingRegressor of tree models averages its members' exact SHAP values
+  (the ensemble prediction is their mean, so the result is exact too).
+- Other models (MLP, mixed ensembles) use KernelExplainer with a k-means
+  summary of the background rows. The background and sampling seed are part
+  of their cache key, and each row is sampled with a seed derived from its
+  hash, so cached and freshly explained rows are comparable. Pass a fixed
+  background (e.g. the training rows) to reuse values as the test set grows;
+  the default background X changes with every new row.
+
+Summary plots are queued on a report_renderer.ReportRenderer from the cached
+matrices, so they are redrawn only when the values change.
+"""
+
+import hashlib
+import json
+import os
+import pickle
+from pathlib import Path
+from typing import Dict, List, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+from data_cache import CACHE_DIR_NAME, DATA_FOLDER
+from tracing import traced
+
+EXPLANATION_VERSION = 1
+DEFAULT_EXPLANATION_CACHE = DATA_FOLDER / "DataCombined" / CACHE_DIR_NAME / "shap"
+BACKGROUND_CLUSTERS = 20
+KERNEL_SAMPLES = 'auto'
+KERNEL_SEED = 0
+
+# Estimators explained with shap.TreeExplainer
+TREE_MODEL_NAMES = {
+    'RandomForestRegressor', 'ExtraTreesRegressor', 'GradientBoostingRegressor',
+    'DecisionTreeRegressor', 'XGBRegressor', 'LGBMRegressor', 'HistGradientBoostingRegressor',
+}
+
+PathLike = Union[str, Path]
+
+
+def model_hash(model, scaler=None) -> str:
+    """SHA-1 of a fitted model (and its input scaler)."""
+    return hashlib.sha1(pickle.dumps((model, scaler), protocol=4)).hexdigest()
+
+
+def background_hash(background) -> str:
+    """SHA-1 of background feature values (shape included, labels ignored)."""
+    values = np.ascontiguousarray(np.asarray(background, dtype=np.float64))
+    return hashlib.sha1(repr(values.shape).encode() + values.tobytes()).hexdigest()
+
+
+def row_hashes(X: pd.DataFrame) -> np.ndarray:
+    """One uint64 hash per row of feature values (row labels ignored)."""
+    return pd.util.hash_pandas_object(X, index=False).to_numpy(dtype=np.uint64)
+
+
+def is_tree_model(model) -> bool:
+    return type(model).__name__ in TREE_MODEL_NAMES
+
+
+def explanation_kind(model, scaler=None) -> str:
+    """'tree', 'tree_ensemble' or 'kernel'."""
+    if scaler is None and is_tree_model(model):
+        return 'tree'
+    members = getattr(model, 'estimators_', None)
+    if scaler is None and type(model).__name__ == 'VotingRegressor' and members \
+            and getattr(model, 'weights', None) is None and all(is_tree_model(m) for m in members):
+        return 'tree_ensemble'
+    return 'kernel'
+
+
+class _Explainer:
+    """Explainer wrapper returning (values, base_values) for a feature array"""
+
+    def __init__(self, model, scaler=None, background: Optional[np.ndarray] = None,
+                 clusters: int = BACKGROUND_CLUSTERS, nsamples=KERNEL_SAMPLES,
+                 seed: int = KERNEL_SEED):
+        import shap
+
+        self.kind = explanation_kind(model, scaler)
+        self.nsamples = nsamples
+        self.seed = seed
+        if self.kind == 'tree':
+            self.explainers = [shap.TreeExplainer(model)]
+        elif self.kind == 'tree_ensemble':
+            self.explainers = [shap.TreeExplainer(member) for member in model.estimators_]
+        else:
+            if background is None:
+                raise ValueError("Background rows are required to explain non-tree models")
+            background = np.asarray(background, dtype=np.float64)
+            if len(background) > clusters:
+                background = shap.kmeans(background, clusters)
+
+            def predict(X):
+                return model.predict(scaler.transform(X) if scaler is not None else X)
+
+            self.explainers = [shap.KernelExplainer(predict, background)]
+
+    def explain(self, X: np.ndarray, row_seeds: Optional[np.ndarray] = None):
+        if self.kind == 'kernel':
+            # KernelExplainer samples coalitions from the global RNG: seed it per row so a
+            # row's values do not depend on which other rows are explained with it
+            explainer = self.explainers[0]
+            if row_seeds is None:
+                row_seeds = row_hashes(pd.DataFrame(X))
+            state = np.random.get_state()
+            try:
+                values = []
+                for row, row_seed in zip(X, row_seeds):
+                    np.random.seed(int((int(row_seed) ^ self.seed) % 2 ** 32))
+                    values.append(explainer.shap_values(row[None, :], nsamples=self.nsamples, silent=True)[0])
+            finally:
+                np.random.set_state(state)
+            base = np.full(len(X), float(np.ravel(explainer.expected_value)[0]))
+            return np.asarray(values, dtype=np.float64).reshape(len(X), -1), base
+
+        values, base = 0.0, 0.0
+        for explainer in self.explainers:
+            values = values + np.asarray(explainer.shap_values(X, check_additivity=False), dtype=np.float64)
+            base = base + float(np.ravel(explainer.expected_value)[0])
+        count = len(self.explainers)
+        return values / count, np.full(len(X), base / count)
+
+
+class ExplanationCache:
+    """Class for computing SHAP values once per model and row"""
+
+    def __init__(self, cache_dir: Optional[PathLike] = None,
+                 clusters: int = BACKGROUND_CLUSTERS,
+                 nsamples=KERNEL_SAMPLES,
+                 seed: int = KERNEL_SEED,
+                 verbose: bool = True):
+        """
+        Args:
+            cache_dir: Folder for the cached SHAP value files
+            clusters: k-means clusters summarising the background of non-tree models
+            nsamples: KernelExplainer samples per row
+            seed: Base seed of KernelExplainer's sampling (combined with each row's hash)
+            verbose: Print how many rows were explained or reused
+        """
+        self.cache_dir = Path(cache_dir) if cache_dir is not None else DEFAULT_EXPLANATION_CACHE
+        self.clusters = clusters
+        self.nsamples = nsamples
+        self.seed = seed
+        self.verbose = verbose
+        self._explainers: Dict[str, _Explainer] = {}
+
+    def cache_path(self, key: str, columns: List[str]) -> Path:
+        spec = json.dumps([EXPLANATION_VERSION, key, list(columns), self.clusters, str(self.nsamples)])
+        return self.cache_dir / f"{hashlib.sha1(spec.encode()).hexdigest()[:20]}.npz"
+
+    def explainer_key(self, model, scaler=None, background: Optional[pd.DataFrame] = None) -> str:
+        """Model hash, plus the background hash and seed for KernelExplainer models."""
+        key = model_hash(model, scaler)
+        if background is not None and explanation_kind(model, scaler) == 'kernel':
+            key = f"{key}-{background_hash(background)}-{self.seed}"
+        return key
+
+    def explainer(self, model, scaler=None, background: Optional[pd.DataFrame] = None,
+                  key: Optional[str] = None) -> _Explainer:
+        """Explainer of a model, built once per explainer key."""
+        key = key or self.explainer_key(model, scaler, background)
+        if key not in self._explainers:
+            values = None if background is None else np.asarray(background, dtype=np.float64)
+            self._explainers[key] = _Explainer(model, scaler, values, self.clusters, self.nsamples, self.seed)
+        return self._explainers[key]
+
+    def _read(self, path: Path) -> Dict[str, np.ndarray]:
+        try:
+            with np.load(path) as stored:
+                return {name: stored[name] for name in ['row_hash', 'values', 'base_values']}
+        except (OSError, ValueError, KeyError):
+            return {'row_hash': np.empty(0, dtype=np.uint64), 'values': None, 'base_values': np.empty(0)}
+
+    def _write(self, path: Path, stored: Dict[str, np.ndarray]) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(path.name + '.tmp.npz')
+        np.savez(tmp_path, **stored)
+        os.replace(tmp_path, path)
+
+    @traced(name='ExplanationCache.explain', rows=lambda explanation: len(explanation.values))
+    def explain(self, model, X: pd.DataFrame, scaler=None,
+                background: Optional[pd.DataFrame] = None):
+        """
+        SHAP values of X's rows, computing only rows not cached yet
+
+        Args:
+            model: Fitted model
+            X: Feature rows to explain (unscaled)
+            scaler: Optional fitted scaler applied before model.predict
+            background: Background rows for non-tree models (default: X); part of
+                their cache key, so pass fixed rows to reuse values as X grows
+
+        Returns:
+            shap.Explanation with values, base_values, data and feature_names
+        """
+        import shap
+
+        background = X if background is None else background
+        key = self.explainer_key(model, scaler, background)
+        columns = [str(col) for col in X.columns]
+        path = self.cache_path(key, columns)
+        stored = self._read(path)
+
+        hashes = row_hashes(X)
+        known = pd.Index(stored['row_hash'])
+        positions = known.get_indexer(hashes)
+        missing = positions < 0
+        new_hashes, first = np.unique(hashes[missing], return_index=True)
+
+        if len(new_hashes):
+            new_rows = X.to_numpy(dtype=np.float64)[np.flatnonzero(missing)[first]]
+            explainer = self.explainer(model, scaler, background, key)
+            values, base = explainer.explain(new_rows, new_hashes)
+            old_values = stored['values'] if stored['values'] is not None else np.empty((0, len(columns)))
+            stored = {
+                'row_hash': np.concatenate([stored['row_hash'], new_hashes]),
+                'values': np.vstack([old_values, values]),
+                'base_values': np.concatenate([stored['base_values'], base]),
+            }
+            self._write(path, stored)
+            positions = pd.Index(stored['row_hash']).get_indexer(hashes)
+
+        if self.verbose:
+            print(f"✅ SHAP: {int(missing.sum())} row(s) explained, {int((~missing).sum())} reused "
+                  f"({type(model).__name__})")
+        return shap.Explanation(values=stored['values'][positions],
+                                base_values=stored['base_values'][positions],
+                                data=X.to_numpy(dtype=np.float64),
+                                feature_names=columns)
+
+
+def feature_importance(explanation) -> pd.DataFrame:
+    """Mean absolute SHAP value per feature (the notebook's Avg_Abs_SHAP table)."""
+    return pd.DataFrame({
+        'Metric': explanation.feature_names,
+        'Avg_Abs_SHAP': np.mean(np.abs(explanation.values), axis=0),
+    }).sort_values('Avg_Abs_SHAP', ascending=False).reset_index(drop=True)
+
+
+def add_summary_figures(renderer, explanation, prefix: str = '', title: Optional[str] = None) -> List[str]:
+    """
+    Queue the SHAP summary plots of an explanation on a ReportRenderer
+
+    Adds <prefix>shap_summary_dot and <prefix>shap_summary_bar; the renderer
+    skips them when the SHAP values did not change.
+
+    Returns:
+        Names of the queued figures
+    """
+    data = {
+        'values': np.asarray(explanation.values),
+        'data': np.asarray(explanation.data),
+        'feature_names': list(explanation.feature_names),
+    }
+    names = []
+    for plot_type in ['dot', 'bar']:
+        name = f"{prefix}shap_summary_{plot_type}"
+        options = {'plot_type': plot_type}
+        if title:
+            options['title'] = title
+        renderer.add(name, 'shap_summary', data, **options)
+        names.append(name)
+    return names
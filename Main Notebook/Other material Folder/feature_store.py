@@ -0,0 +1,397 @@
+"""
+Feature Store Module for Real Madrid Soccer Analysis
+Contains a versioned, position-sliced per-90 and rolling feature matrix
+
+Per-90 rates, position masks and feature selection used to be rebuilt in
+every Feature Engineering, SHAP and Forecasting cell. FeatureStore computes
+them once per data version into one contiguous float32 matrix:
+
+- rows are ordered by Position_Group, so every position is a contiguous
+  row slice;
+- columns are ordered so each position's feature set (PER90_METRICS) is a
+  contiguous column block, followed by the remaining per-90 rates and the
+  trailing rolling means;
+- the matrix is saved as .npy next to a JSON column index and read back
+  memory-mapped, so FeatureMatrix.view()/matrix() hand out zero-copy views.
+
+The store file name contains a hash of the input columns and the feature
+spec, so a new data version builds a new matrix and an unchanged one is
+loaded as is.
+"""
+
+import hashlib
+import json
+import os
+import time
+import warnings
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Union
+
+import numpy as np
+import pandas as pd
+
+from data_cache import CACHE_DIR_NAME, DATA_FOLDER
+from model_training import PER90_METRICS, TARGET_COLUMN
+from streaming import PER90_STATS, PLAYER_KEYS, _minutes_col, match_columns, per90_name
+from tracing import traced
+
+FEATURE_STORE_VERSION = 2
+DEFAULT_STORE_DIR = DATA_FOLDER / "DataCombined" / CACHE_DIR_NAME / "features"
+ROLLING_WINDOWS = (3, 5)
+POSITION_COLUMN = 'Position_Group'
+
+# Row metadata kept next to the matrix (not part of the features)
+META_COLUMNS = ['Player', 'Club', 'Date', 'Week', 'Season', POSITION_COLUMN, TARGET_COLUMN]
+
+PathLike = Union[str, Path]
+
+
+def rolling_name(column: str, window: int) -> str:
+    """Rolling-mean column name (e.g. 'Gls_Per90' -> 'Gls_Per90_Roll5')."""
+    return f"{column}_Roll{window}"
+
+
+def trailing_means(values: np.ndarray, group_starts: np.ndarray, window: int) -> np.ndarray:
+    """
+    Mean of each row's previous `window` rows within its group
+
+    Args:
+        values: (rows x features) array sorted by group and time
+        group_starts: Index of the first row of each row's group
+        window: Number of previous rows averaged (the row itself is excluded)
+
+    Returns:
+        Array like values; rows without history are 0
+    """
+    csum = np.zeros((len(values) + 1, values.shape[1]), dtype=np.float64)
+    np.cumsum(values, axis=0, out=csum[1:])
+    rows = np.arange(len(values))
+    lower = np.maximum(group_starts, rows - window)
+    counts = (rows - lower)[:, None]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        means = (csum[rows] - csum[lower]) / counts
+    return np.where(counts > 0, means, 0.0)
+
+
+class FeatureMatrix:
+    """Class holding the feature matrix, its column index and position slices"""
+
+    def __init__(self, values: np.ndarray, columns: List[str], meta: pd.DataFrame,
+                 positions: Dict[str, List[int]], version: str):
+        """
+        Args:
+            values: (rows x features) float32 matrix, rows grouped by position
+            columns: Feature names in matrix column order
+            meta: Row metadata aligned with the matrix rows (index: source row labels)
+            positions: Mapping of position to [start, stop) row bounds
+            version: Data/spec hash the matrix was built from
+        """
+        self.values = values
+        self.columns = list(columns)
+        self.column_index = {col: i for i, col in enumerate(self.columns)}
+        self.meta = meta
+        self.positions = positions
+        self.version = version
+
+    @property
+    def shape(self):
+        return self.values.shape
+
+    def rows(self, position: Optional[str] = None) -> slice:
+        """Row slice of a position (all rows when position is None)."""
+        if position is None:
+            return slice(0, len(self.values))
+        if position not in self.positions:
+            raise KeyError(f"Position '{position}' not in the feature store")
+        start, stop = self.positions[position]
+        return slice(start, stop)
+
+    def view(self, position: Optional[str] = None) -> np.ndarray:
+        """Zero-copy view of a position's rows (all columns)."""
+        return self.values[self.rows(position)]
+
+    def column_slice(self, columns: Sequence[str]) -> Optional[slice]:
+        """Column slice when columns are a contiguous run of the store, else None."""
+        idx = [self.column_index[col] for col in columns]
+        if idx and idx == list(range(idx[0], idx[0] + len(idx))):
+            return slice(idx[0], idx[-1] + 1)
+        return None
+
+    def matrix(self, position: Optional[str] = None, columns: Optional[Sequence[str]] = None) -> np.ndarray:
+        """
+        Feature matrix of a position
+
+        A view when columns are contiguous in the store (every PER90_METRICS
+        set is); otherwise the columns are gathered into a new array.
+        """
+        rows = self.rows(position)
+        if columns is None:
+            return self.values[rows]
+        block = self.column_slice(columns)
+        if block is not None:
+            return self.values[rows, block]
+        return self.values[rows][:, [self.column_index[col] for col in columns]]
+
+    def frame(self, position: Optional[str] = None, columns: Optional[Sequence[str]] = None,
+              with_meta: bool = False) -> pd.DataFrame:
+        """DataFrame over matrix() (indexed by the source row labels)."""
+        columns = self.columns if columns is None else list(columns)
+        rows = self.rows(position)
+        frame = pd.DataFrame(self.matrix(position, columns), index=self.meta.index[rows], columns=columns,
+                             copy=False)
+        if with_meta:
+            frame = pd.concat([self.meta.iloc[rows], frame], axis=1)
+        return frame
+
+    def target(self, position: Optional[str] = None) -> pd.Series:
+        """Target values aligned with a position's rows."""
+        return self.meta[TARGET_COLUMN].iloc[self.rows(position)]
+
+    def position_features(self, position: str, features: Optional[Dict[str, List[str]]] = None) -> List[str]:
+        """Features of a position that the store holds."""
+        features = PER90_METRICS if features is None else features
+        return [col for col in features.get(position, []) if col in self.column_index]
+
+
+class FeatureStore:
+    """Class for building, persisting and loading versioned feature matrices"""
+
+    def __init__(self, store_dir: Optional[PathLike] = None,
+                 stats: Sequence[str] = PER90_STATS,
+                 position_features: Optional[Dict[str, List[str]]] = None,
+                 windows: Sequence[int] = ROLLING_WINDOWS,
+                 minutes_floor: Optional[float] = None,
+                 verbose: bool = True):
+        """
+        Args:
+            store_dir: Folder for the .npy matrices and their JSON index
+            stats: Volume stats turned into per-90 rates
+            position_features: Mapping of position to feature columns (default: PER90_METRICS)
+            windows: Rolling windows (previous matches per player) of the per-90 rates
+            minutes_floor: Minutes lower bound of the rates (None: 0 -> 1 like Min_Safe;
+                10 matches Min_adj in the Feature Engineering notebook)
+            verbose: Print build/load messages
+        """
+        self.store_dir = Path(store_dir) if store_dir is not None else DEFAULT_STORE_DIR
+        self.stats = list(stats)
+        self.position_features = PER90_METRICS if position_features is None else position_features
+        self.windows = [int(w) for w in windows]
+        self.minutes_floor = minutes_floor
+        self.verbose = verbose
+
+    def _spec(self) -> Dict:
+        return {
+            'version': FEATURE_STORE_VERSION,
+            'stats': self.stats,
+            'position_features': self.position_features,
+            'windows': self.windows,
+            'minutes_floor': self.minutes_floor,
+        }
+
+    def _input_columns(self, df: pd.DataFrame) -> List[str]:
+        configured = list(self.stats) + [col for cols in self.position_features.values() for col in cols]
+        wanted = set(match_columns(configured, df.columns).values())
+        wanted |= set(META_COLUMNS) | {_minutes_col(df.columns) or 'Min', 'Pos'}
+        return [col for col in df.columns if col in wanted]
+
+    def data_version(self, df: pd.DataFrame) -> str:
+        """Hash of the input columns and the feature spec."""
+        used = self._input_columns(df)
+        digest = hashlib.sha1(pd.util.hash_pandas_object(df[used], index=True).values.tobytes())
+        digest.update(json.dumps([used, self._spec()], sort_keys=True).encode())
+        return digest.hexdigest()[:16]
+
+    def paths(self, version: str):
+        return (self.store_dir / f"features.{version}.npy",
+                self.store_dir / f"features.{version}.json",
+                self.store_dir / f"features.{version}.meta.pkl")
+
+    # ------------------------------------------------------------------
+    # Building
+    # ------------------------------------------------------------------
+    def compute(self, df: pd.DataFrame, version: str = '') -> FeatureMatrix:
+        """
+        Compute the feature matrix of a DataFrame (without persisting it)
+
+        Args:
+            df: Match rows with minutes, stat columns and Position_Group
+            version: Version string stored on the result
+
+        Returns:
+            FeatureMatrix
+        """
+        minute_col = _minutes_col(df.columns)
+        if minute_col is None:
+            raise KeyError("No minutes column ('Minutes' or 'Min') found")
+        minutes = pd.to_numeric(df[minute_col], errors='coerce').to_numpy(dtype=np.float64)
+        if self.minutes_floor is None:
+            minutes_adj = np.where(minutes == 0, 1.0, minutes)
+        else:
+            minutes_adj = np.maximum(minutes, self.minutes_floor)
+
+        # Per-90 rates of the volume stats, then raw columns named in the position sets
+        # (data columns matched ignoring surrounding whitespace)
+        sources = match_columns(self.stats, df.columns)
+        stats = [stat for stat in self.stats if stat in sources]
+        rate_names = [per90_name(stat) for stat in stats]
+        raw = df[[sources[stat] for stat in stats]].apply(pd.to_numeric, errors='coerce').to_numpy(dtype=np.float64)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            rates = raw / minutes_adj[:, None] * 90
+        rates = np.nan_to_num(rates, nan=0.0, posinf=0.0, neginf=0.0)
+        available = dict(zip(rate_names, rates.T))
+        sources = match_columns([col for cols in self.position_features.values() for col in cols], df.columns)
+        missing = []
+        for position, cols in self.position_features.items():
+            for col in cols:
+                if col in available:
+                    continue
+                if col in sources:
+                    available[col] = pd.to_numeric(df[sources[col]], errors='coerce').fillna(0).to_numpy(dtype=np.float64)
+                else:
+                    missing.append(f"{position}: {col.strip()}")
+        if missing:
+            warnings.warn(f"Features missing from the data (left out of the matrix): {', '.join(missing)}")
+
+        # Column order: each position's set as one block, then the other columns
+        columns = []
+        for cols in self.position_features.values():
+            columns += [col for col in cols if col in available and col not in columns]
+        columns += [col for col in available if col not in columns]
+
+        # Rolling means of the per-90 rates over each player's previous matches
+        rolling_cols, rolling_blocks = [], []
+        keys = [key for key in PLAYER_KEYS if key in df.columns]
+        if self.windows and keys and 'Date' in df.columns:
+            dates = pd.to_datetime(df['Date'], errors='coerce').to_numpy()
+            player_codes = df.groupby(keys, sort=False, observed=True).ngroup().to_numpy()
+            order = np.lexsort((np.arange(len(df)), dates, player_codes))
+            sorted_codes = player_codes[order]
+            starts = np.r_[0, np.flatnonzero(sorted_codes[1:] != sorted_codes[:-1]) + 1]
+            group_starts = np.repeat(starts, np.diff(np.r_[starts, len(order)]))
+            sorted_rates = rates[order]
+            for window in self.windows:
+                block = np.empty_like(sorted_rates)
+                block[order] = trailing_means(sorted_rates, group_starts, window)
+                rolling_blocks.append(block)
+                rolling_cols += [rolling_name(col, window) for col in rate_names]
+
+        # Rows grouped by position (stable, so time order is kept inside each group)
+        if POSITION_COLUMN in df.columns:
+            groups = df[POSITION_COLUMN].astype(object).fillna('').to_numpy()
+        else:
+            groups = np.full(len(df), '', dtype=object)
+        order_names = list(self.position_features) + sorted(set(groups) - set(self.position_features))
+        rank = pd.Series(range(len(order_names)), index=order_names)
+        row_order = np.argsort(rank.reindex(groups).to_numpy(), kind='stable')
+
+        values = np.empty((len(df), len(columns) + len(rolling_cols)), dtype=np.float32)
+        for j, col in enumerate(columns):
+            values[:, j] = available[col][row_order]
+        if rolling_blocks:
+            values[:, len(columns):] = np.hstack(rolling_blocks)[row_order]
+
+        sorted_groups = groups[row_order]
+        positions = {}
+        for name in order_names:
+            hits = np.flatnonzero(sorted_groups == name)
+            if len(hits) and name:
+                positions[name] = [int(hits[0]), int(hits[-1]) + 1]
+
+        meta = df[[col for col in META_COLUMNS if col in df.columns]].iloc[row_order]
+        return FeatureMatrix(values, columns + rolling_cols, meta, positions, version)
+
+    def save(self, features: FeatureMatrix) -> None:
+        """Write a matrix atomically (.npy values, .json index, pickled metadata)."""
+        npy_path, json_path, meta_path = self.paths(features.version)
+        self.store_dir.mkdir(parents=True, exist_ok=True)
+
+        tmp_npy = npy_path.with_name(npy_path.name + '.tmp.npy')
+        np.save(tmp_npy, np.ascontiguousarray(features.values))
+        os.replace(tmp_npy, npy_path)
+
+        tmp_meta = meta_path.with_name(meta_path.name + '.tmp')
+        features.meta.to_pickle(tmp_meta)
+        os.replace(tmp_meta, meta_path)
+
+        tmp_json = json_path.with_name(json_path.name + '.tmp')
+        with open(tmp_json, 'w', encoding='utf-8') as handle:
+            json.dump({
+                'spec': self._spec(),
+                'columns': features.columns,
+                'positions': features.positions,
+                'shape': list(features.shape),
+                'built_at': time.strftime('%Y-%m-%d %H:%M:%S'),
+            }, handle, indent=2)
+        os.replace(tmp_json, json_path)
+
+    def load_version(self, version: str) -> Optional[FeatureMatrix]:
+        """Memory-mapped matrix of a stored version (None if missing)."""
+        npy_path, json_path, meta_path = self.paths(version)
+        try:
+            with open(json_path, 'r', encoding='utf-8') as handle:
+                index = json.load(handle)
+            values = np.load(npy_path, mmap_mode='r')
+            meta = pd.read_pickle(meta_path)
+        except (OSError, ValueError):
+            return None
+        if index.get('spec') != self._spec() or list(values.shape) != index['shape']:
+            return None
+        return FeatureMatrix(values, index['columns'], meta, index['positions'], version)
+
+    @traced(name='FeatureStore.get')
+    def get(self, df: pd.DataFrame, refresh: bool = False) -> FeatureMatrix:
+        """
+        Feature matrix of a DataFrame, built once per data version
+
+        Args:
+            df: Match rows with minutes, stat columns and Position_Group
+            refresh: Rebuild even if the version is stored
+
+        Returns:
+            FeatureMatrix (memory-mapped when loaded from the store)
+        """
+        version = self.data_version(df)
+        if not refresh:
+            features = self.load_version(version)
+            if features is not None:
+                if self.verbose:
+                    print(f"✅ Loaded features {version}: {features.shape}")
+                return features
+
+        start = time.perf_counter()
+        self.save(self.compute(df, version))
+        features = self.load_version(version)
+        if self.verbose:
+            print(f"✅ Built features {version}: {features.shape} in {time.perf_counter() - start:.2f}s")
+        return features
+
+    def clear(self, keep: Optional[str] = None) -> int:
+        """Remove stored versions except `keep`; returns the number removed."""
+        removed = 0
+        for path in self.store_dir.glob('features.*.json'):
+            version = path.name.split('.')[1]
+            if version == keep:
+                continue
+            for file in self.paths(version):
+                if file.exists():
+                    file.unlink()
+            removed += 1
+        return removed
+
+
+def load_features(df: Optional[pd.DataFrame] = None, refresh: bool = False, **store_kwargs) -> FeatureMatrix:
+    """
+    Quick function to get the feature matrix of the rebalanced scores
+
+    Args:
+        df: Match rows (default: load_rebalanced_scores())
+        refresh: Rebuild even if the version is stored
+        **store_kwargs: Options forwarded to FeatureStore
+
+    Returns:
+        FeatureMatrix
+    """
+    if df is None:
+        from data_cache import load_rebalanced_scores
+        df = load_rebalanced_scores(verbose=store_kwargs.get('verbose', True))
+    return FeatureStore(**store_kwargs).get(df, refresh=refresh)
@@ -0,0 +1,346 @@
+"""
+Incremental EDA Module for Real Madrid Soccer Analysis
+Contains per-season partial aggregates that are merged on demand
+
+The EDA summaries (position counts, matches per year, missing values and the
+per-position means/standard deviations/correlations) are all sums over rows,
+so they can be kept per season and added up. IncrementalEDA stores each
+season's partial aggregates in a state file together with a hash of the
+season's rows; update() re-aggregates only seasons whose rows changed (e.g.
+the current season after a new matchday) and drops seasons that disappeared.
+Merged results equal a full recompute.
+"""
+
+import hashlib
+import json
+import os
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+from data_cache import CACHE_DIR_NAME, DATA_FOLDER
+from position_stats import EXCLUDE_COLUMNS, POSITION_GROUPS, PositionStatsEngine, masked_moments, position_membership
+
+STATE_VERSION = 2
+DEFAULT_STATE_PATH = DATA_FOLDER / "DataCombined" / CACHE_DIR_NAME / "eda_state"
+SEASON_COLUMN = 'Season'
+ALL_ROWS = 'ALL'
+
+# Array aggregates summed across seasons
+MOMENT_KEYS = ['n', 'sx', 'sxx', 'sxy']
+
+PathLike = Union[str, Path]
+
+
+def partition_hash(part: pd.DataFrame) -> str:
+    """SHA-1 of a partition's values and column names (row labels ignored)."""
+    digest = hashlib.sha1(pd.util.hash_pandas_object(part, index=False).values.tobytes())
+    digest.update(repr(list(part.columns)).encode())
+    return digest.hexdigest()
+
+
+def _counts_dict(values: pd.Series) -> Dict[str, int]:
+    counts = values.value_counts(dropna=True)
+    return {str(key): int(count) for key, count in counts.items() if count > 0}
+
+
+def season_aggregates(part: pd.DataFrame, metrics: List[str], position_col: str = 'Pos',
+                      groups: Optional[Dict[str, List[str]]] = None) -> Dict:
+    """
+    Partial aggregates of one season
+
+    Args:
+        part: Rows of one season
+        metrics: Metric columns for the moment sums
+        position_col: Column holding the position strings
+        groups: Mapping of group key to member abbreviations
+
+    Returns:
+        Dictionary with row/null/position/year counts and masked moment sums for
+        every position group plus an ALL group covering every row
+    """
+    groups = POSITION_GROUPS if groups is None else groups
+    if position_col in part.columns:
+        membership = position_membership(part[position_col], groups).to_numpy()
+    else:
+        membership = np.zeros((len(part), len(groups)), dtype=bool)
+    membership = np.column_stack([membership, np.ones(len(part), dtype=bool)])
+
+    moments = masked_moments(membership, part[metrics].to_numpy(dtype=np.float64))
+
+    years, undated = {}, 0
+    if 'Date' in part.columns:
+        dates = part['Date']
+        if not pd.api.types.is_datetime64_any_dtype(dates):
+            dates = pd.to_datetime(dates, errors='coerce')
+        years = _counts_dict(dates.dt.year.astype('Int64'))
+        undated = int(dates.isna().sum())
+
+    return {
+        'rows': len(part),
+        'null_counts': part.isnull().sum().to_numpy(dtype=np.int64),
+        'sample_sizes': membership.sum(axis=0).astype(np.int64),
+        'position_counts': _counts_dict(part[position_col]) if position_col in part.columns else {},
+        'year_counts': years,
+        'undated_rows': undated,
+        **moments
+    }
+
+
+class IncrementalEDA:
+    """Class for keeping per-season EDA aggregates and merging them on demand"""
+
+    def __init__(self, state_path: Optional[PathLike] = None,
+                 season_col: str = SEASON_COLUMN,
+                 metrics: Optional[List[str]] = None,
+                 position_col: str = 'Pos',
+                 groups: Optional[Dict[str, List[str]]] = None,
+                 verbose: bool = True):
+        """
+        Args:
+            state_path: State file path without extension (writes .json and .npz)
+            season_col: Column used to partition the rows
+            metrics: Metric columns (default: numeric non-identifier columns)
+            position_col: Column holding the position strings
+            groups: Mapping of group key to member abbreviations
+            verbose: Print which seasons were re-aggregated
+        """
+        self.state_path = Path(state_path) if state_path is not None else DEFAULT_STATE_PATH
+        self.season_col = season_col
+        self.requested_metrics = metrics
+        self.position_col = position_col
+        self.groups = POSITION_GROUPS if groups is None else groups
+        self.positions = list(self.groups)
+        self.verbose = verbose
+        self.meta: Dict = {}
+        self.seasons: Dict[str, Dict] = {}
+
+    # ------------------------------------------------------------------
+    # State file
+    # ------------------------------------------------------------------
+    @property
+    def json_path(self) -> Path:
+        return self.state_path.with_suffix('.json')
+
+    @property
+    def npz_path(self) -> Path:
+        return self.state_path.with_suffix('.npz')
+
+    def _options(self, df: pd.DataFrame, metrics: List[str]) -> Dict:
+        return {
+            'version': STATE_VERSION,
+            'season_col': self.season_col,
+            'position_col': self.position_col,
+            'groups': self.groups,
+            'metrics': metrics,
+            'columns': [str(col) for col in df.columns],
+        }
+
+    def load_state(self) -> bool:
+        """Read the state file; returns False when there is none."""
+        try:
+            with open(self.json_path, 'r', encoding='utf-8') as handle:
+                meta = json.load(handle)
+            arrays = np.load(self.npz_path)
+        except (FileNotFoundError, json.JSONDecodeError, OSError, ValueError):
+            return False
+
+        seasons = {}
+        with arrays:
+            try:
+                for season, info in meta.get('seasons', {}).items():
+                    entry = dict(info)
+                    for key in MOMENT_KEYS + ['null_counts', 'sample_sizes']:
+                        entry[key] = arrays[f"{info['slot']}/{key}"]
+                    seasons[season] = entry
+            except KeyError:
+                return False
+        self.meta, self.seasons = meta, seasons
+        return True
+
+    def save_state(self) -> None:
+        """Write the state atomically (.npz arrays, .json metadata)."""
+        self.state_path.parent.mkdir(parents=True, exist_ok=True)
+        arrays, seasons = {}, {}
+        for slot, (season, entry) in enumerate(sorted(self.seasons.items())):
+            info = {key: value for key, value in entry.items() if not isinstance(value, np.ndarray)}
+            info['slot'] = slot
+            seasons[season] = info
+            for key, value in entry.items():
+                if isinstance(value, np.ndarray):
+                    arrays[f"{slot}/{key}"] = value
+
+        tmp_npz = self.npz_path.with_name(self.npz_path.name + '.tmp.npz')
+        np.savez(tmp_npz, **arrays)
+        os.replace(tmp_npz, self.npz_path)
+
+        meta = dict(self.meta, seasons=seasons, updated_at=time.strftime('%Y-%m-%d %H:%M:%S'))
+        tmp_json = self.json_path.with_name(self.json_path.name + '.tmp')
+        with open(tmp_json, 'w', encoding='utf-8') as handle:
+            json.dump(meta, handle, indent=2)
+        os.replace(tmp_json, self.json_path)
+
+    # ------------------------------------------------------------------
+    # Updating
+    # ------------------------------------------------------------------
+    def update(self, df: pd.DataFrame) -> Dict[str, List[str]]:
+        """
+        Bring the state in line with a DataFrame, re-aggregating changed seasons
+
+        Args:
+            df: Full match-level DataFrame (must contain season_col)
+
+        Returns:
+            Dictionary with 'recomputed', 'unchanged' and 'removed' season lists
+        """
+        if self.season_col not in df.columns:
+            raise KeyError(f"Season column '{self.season_col}' not found")
+
+        metrics = self.requested_metrics
+        if metrics is None:
+            metrics = df.select_dtypes(include=[np.number]).columns.tolist()
+            metrics = [col for col in metrics if col not in EXCLUDE_COLUMNS and col != self.season_col]
+        metrics = [col for col in metrics if col in df.columns]
+
+        options = self._options(df, metrics)
+        if not self.load_state() or self.meta.get('options') != options:
+            # Schema or settings changed: every season is rebuilt
+            self.seasons = {}
+        self.meta = {'options': options}
+
+        seasons = df[self.season_col].astype(str)
+        result = {'recomputed': [], 'unchanged': [], 'removed': []}
+        for season, part in df.groupby(seasons, sort=True, observed=True):
+            digest = partition_hash(part)
+            if season in self.seasons and self.seasons[season]['hash'] == digest:
+                result['unchanged'].append(season)
+                continue
+            entry = season_aggregates(part, metrics, self.position_col, self.groups)
+            entry['hash'] = digest
+            self.seasons[season] = entry
+            result['recomputed'].append(season)
+
+        present = set(seasons.unique())
+        for season in [s for s in self.seasons if s not in present]:
+            del self.seasons[season]
+            result['removed'].append(season)
+
+        if result['recomputed'] or result['removed'] or not self.json_path.exists():
+            self.save_state()
+        if self.verbose:
+            print(f"✅ EDA state: {len(result['recomputed'])} season(s) re-aggregated "
+                  f"{result['recomputed']}, {len(result['unchanged'])} unchanged, "
+                  f"{len(result['removed'])} removed")
+        return result
+
+    # ------------------------------------------------------------------
+    # Merged results
+    # ------------------------------------------------------------------
+    @property
+    def metrics(self) -> List[str]:
+        return self.meta['options']['metrics']
+
+    @property
+    def columns(self) -> List[str]:
+        return self.meta['options']['columns']
+
+    def _sum(self, key: str):
+        entries = [self.seasons[season][key] for season in sorted(self.seasons)]
+        return np.sum(entries, axis=0) if entries else None
+
+    def _merge_counts(self, key: str) -> Dict[str, int]:
+        merged: Dict[str, int] = {}
+        for season in sorted(self.seasons):
+            for label, count in self.seasons[season][key].items():
+                merged[label] = merged.get(label, 0) + count
+        return merged
+
+    def total_rows(self) -> int:
+        return int(sum(entry['rows'] for entry in self.seasons.values()))
+
+    def position_counts(self) -> pd.Series:
+        """Rows per `Pos` string, largest first (like value_counts())."""
+        counts = pd.Series(self._merge_counts('position_counts'), dtype=np.int64, name='count')
+        counts.index.name = self.position_col
+        return counts.sort_values(ascending=False, kind='stable')
+
+    def season_counts(self) -> pd.Series:
+        """
+        Rows per calendar year of `Date` (the EDA's season distribution)
+
+        Same as df['Date'].dt.year.value_counts().sort_index(), including the
+        index dtype: float years when any date is missing (NaT), integers
+        otherwise, so figure hashes agree with a full run.
+        """
+        merged = self._merge_counts('year_counts')
+        years = sorted(int(year) for year in merged)
+        undated = sum(entry.get('undated_rows', 0) for entry in self.seasons.values())
+        year_dtype = np.float64 if undated else pd.Series(pd.DatetimeIndex([])).dt.year.dtype
+        return pd.Series([merged[str(year)] for year in years], dtype=np.int64, name='count',
+                         index=pd.Index(years, dtype=year_dtype, name='Season'))
+
+    def missing_counts(self) -> pd.Series:
+        """Missing values per column."""
+        return pd.Series(self._sum('null_counts'), index=self.columns, dtype=np.int64)
+
+    def moments(self, include_all: bool = False) -> Dict[str, np.ndarray]:
+        """
+        Merged masked moment sums (see position_stats.masked_moments)
+
+        Args:
+            include_all: Keep the trailing ALL group (every row)
+
+        Returns:
+            Dictionary of (groups x metrics x metrics) arrays
+        """
+        merged = {key: self._sum(key) for key in MOMENT_KEYS}
+        if not include_all:
+            merged = {key: value[:-1] for key, value in merged.items()}
+        return merged
+
+    def sample_sizes(self) -> pd.Series:
+        """Rows per position group (plus ALL)."""
+        return pd.Series(self._sum('sample_sizes'), index=self.positions + [ALL_ROWS], dtype=np.int64)
+
+    def position_stats(self, df: pd.DataFrame) -> PositionStatsEngine:
+        """
+        PositionStatsEngine over df that reuses the merged moments
+
+        Means, standard deviations and correlations come from the state;
+        quantiles (describe()) are still computed from df's rows.
+        """
+        return PositionStatsEngine(df, self.metrics, self.position_col, self.groups, moments=self.moments())
+
+    def correlation(self, metrics: Optional[List[str]] = None) -> pd.DataFrame:
+        """Pairwise-complete correlation over all rows (df[metrics].corr())."""
+        m = self.moments(include_all=True)
+        g = len(self.positions)
+        idx = list(range(len(self.metrics))) if metrics is None else [self.metrics.index(col) for col in metrics]
+        n, sx, sxx, sxy = (m[key][g][np.ix_(idx, idx)] for key in MOMENT_KEYS)
+        sy, syy = sx.T, sxx.T
+        with np.errstate(invalid='ignore', divide='ignore'):
+            var_x = sxx - sx * sx / n
+            var_y = syy - sy * sy / n
+            corr = (sxy - sx * sy / n) / np.sqrt(var_x * var_y)
+        corr = np.clip(np.where((n > 1) & (var_x > 0) & (var_y > 0), corr, np.nan), -1.0, 1.0)
+        names = [self.metrics[i] for i in idx]
+        return pd.DataFrame(corr, index=names, columns=names)
+
+
+def quick_incremental_eda(df: pd.DataFrame, state_path: Optional[PathLike] = None) -> IncrementalEDA:
+    """
+    Quick function to update the EDA state for a DataFrame
+
+    Args:
+        df: Full match-level DataFrame
+        state_path: State file path without extension
+
+    Returns:
+        Updated IncrementalEDA
+    """
+    state = IncrementalEDA(state_path)
+    state.update(df)
+    return state
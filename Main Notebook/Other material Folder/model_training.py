@@ -0,0 +1,504 @@
+"""
+Model Training Module for Real Madrid Soccer Analysis
+Contains a parallel, cached orchestrator for the position-specific models
+
+The Modeling_Benchmarks and Forecasting notebooks fit RandomForest, XGBoost,
+MLP and Voting models one position at a time. TrainingOrchestrator expands
+(position x model x hyperparameter config) into independent jobs and runs
+them in a process pool under one CPU budget: the pool gets as many workers
+as there are jobs (up to the budget) and every job's own n_jobs/BLAS threads
+get the remaining share, so nested parallelism never oversubscribes.
+
+Every fitted model is stored on disk under a key made of the position's
+feature set, a hash of its train/test data and the model params, and fitted
+scalers are stored per feature set and training data. Jobs whose key is
+already cached are skipped, so re-running after a data change only retrains
+the positions whose rows changed.
+"""
+
+import contextlib
+import hashlib
+import json
+import os
+import pickle
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Union
+
+import numpy as np
+import pandas as pd
+
+from data_cache import CACHE_DIR_NAME, DATA_FOLDER
+from tracing import traced
+
+TRAINING_VERSION = 1
+DEFAULT_MODEL_CACHE = DATA_FOLDER / "DataCombined" / CACHE_DIR_NAME / "models"
+TARGET_COLUMN = 'Rebalanced_Score'
+
+# Position-specific features (per90_metrics in the Forecasting notebook)
+PER90_METRICS = {
+    'Forward': ['Gls_Per90', 'Ast_Per90', 'SoT_Per90', 'ExpectedxG_Per90', 'ExpectedxAG_Per90', 'TakeOnsSucc_Per90'],
+    'Midfield': ['Passes Cmp%', 'KP_Per90', 'Tkl_Per90', 'CarriesPrgC_Per90', 'PassesPrgP_Per90', 'Touches_Per90'],
+    'Defense': ['Int_Per90', 'Blocks_Per90', 'Clr_Per90', 'TacklesTklW_Per90', 'TacklesDef3rd_Per90', 'TacklesMid3rd_Per90'],
+    'Goalkeeper': ['Total Cmp%', ' Err', 'TotalPrgDist_Per90', 'Short Cmp%', 'Medium Cmp%', 'TotalCmp_Per90']
+}
+
+# Notebook settings of each model
+DEFAULT_PARAMS = {
+    'rf': {'n_estimators': 100, 'max_depth': 10, 'min_samples_split': 5, 'min_samples_leaf': 2,
+           'random_state': 42},
+    'xgb': {'n_estimators': 100, 'max_depth': 6, 'learning_rate': 0.1, 'subsample': 0.8,
+            'random_state': 42, 'verbosity': 0},
+    'gb': {'n_estimators': 100, 'learning_rate': 0.1, 'max_depth': 6, 'min_samples_split': 5,
+           'min_samples_leaf': 2, 'subsample': 0.8, 'random_state': 42},
+    'mlp': {'hidden_layer_sizes': (100, 50, 25), 'activation': 'relu', 'solver': 'adam', 'alpha': 0.001,
+            'learning_rate': 'adaptive', 'learning_rate_init': 0.001, 'max_iter': 1000, 'random_state': 42,
+            'early_stopping': True, 'validation_fraction': 0.1, 'n_iter_no_change': 20},
+    'voting': {'members': ['rf', 'gb', 'xgb']},
+}
+
+# Random-search spaces (lists or scipy distributions), sampled with ParameterSampler
+SEARCH_SPACES = {
+    'mlp': {  # tune_neural_network_fast()
+        'hidden_layer_sizes': [(100, 50), (150, 75, 35), (100, 50, 25)],
+        'activation': ['relu', 'tanh'],
+        'alpha': ('uniform', 0.0001, 0.01),
+        'learning_rate_init': ('uniform', 0.001, 0.01),
+        'max_iter': [300, 500],
+        'validation_fraction': [0.15],
+        'n_iter_no_change': [15],
+        'batch_size': ['auto', 64, 128],
+    },
+    'rf': {
+        'n_estimators': [100, 200, 300],
+        'max_depth': [6, 10, 15, None],
+        'min_samples_split': [2, 5, 10],
+        'min_samples_leaf': [1, 2, 4],
+    },
+    'xgb': {
+        'n_estimators': [100, 200, 300],
+        'max_depth': [3, 4, 6, 8],
+        'learning_rate': ('uniform', 0.02, 0.2),
+        'subsample': [0.7, 0.8, 1.0],
+    },
+}
+
+# Models fitted on standardized features
+SCALED_MODELS = {'mlp'}
+
+PathLike = Union[str, Path]
+
+
+def _xgboost_available() -> bool:
+    """Return True when xgboost can be imported."""
+    try:
+        import xgboost  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def available_cpus() -> int:
+    """CPUs this process may run on."""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def _jsonable(value):
+    if isinstance(value, dict):
+        return {str(k): _jsonable(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_jsonable(v) for v in value]
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+def _estimator_params(params: Dict) -> Dict:
+    """JSON params back to estimator arguments (lists -> tuples for layer sizes)."""
+    out = dict(params)
+    if isinstance(out.get('hidden_layer_sizes'), list):
+        out['hidden_layer_sizes'] = tuple(out['hidden_layer_sizes'])
+    return out
+
+
+def frame_hash(*parts) -> str:
+    """SHA-1 of pandas objects' values, index and column names."""
+    digest = hashlib.sha1()
+    for part in parts:
+        digest.update(pd.util.hash_pandas_object(part, index=True).values.tobytes())
+        labels = list(part.columns) if isinstance(part, pd.DataFrame) else [part.name]
+        digest.update(repr(labels).encode())
+    return digest.hexdigest()
+
+
+def build_position_datasets(df: pd.DataFrame,
+                            features: Optional[Dict[str, List[str]]] = None,
+                            target: str = TARGET_COLUMN,
+                            test_weeks: int = 4,
+                            min_rows: int = 30,
+                            verbose: bool = True) -> Dict[str, Dict]:
+    """
+    Train/test datasets per position (create_position_datasets() in Forecasting)
+
+    Args:
+        df: Scored rows with Position_Group, target and per-90 columns
+        features: Mapping of position to feature columns
+        target: Target column
+        test_weeks: Latest weeks held out for testing
+        min_rows: Minimum scored rows of a position
+
+    Returns:
+        Dictionary of position -> {'X_train', 'y_train', 'X_test', 'y_test', 'metrics'}
+    """
+    features = PER90_METRICS if features is None else features
+    if 'Week' not in df.columns:
+        df = df.assign(Week=pd.to_datetime(df['Date']).dt.isocalendar().week)
+
+    datasets = {}
+    for position, metrics in features.items():
+        pos_data = df[(df['Position_Group'] == position) & df[target].notna()]
+        available = [m for m in metrics if m in pos_data.columns]
+        if verbose and len(available) < len(metrics):
+            print(f"⚠️ {position}: features not in the data: {[m for m in metrics if m not in available]}")
+        if len(pos_data) < min_rows or len(available) < 3:
+            if verbose:
+                print(f"⚠️ Skip {position}: {len(pos_data)} rows, {len(available)} features")
+            continue
+
+        test_start_week = pos_data['Week'].max() - test_weeks + 1
+        train_data = pos_data[pos_data['Week'] < test_start_week]
+        test_data = pos_data[pos_data['Week'] >= test_start_week]
+        if len(train_data) < 20 or len(test_data) < 5:
+            if verbose:
+                print(f"⚠️ Skip {position}: insufficient split")
+            continue
+
+        datasets[position] = {
+            'X_train': train_data[available].fillna(0),
+            'y_train': train_data[target],
+            'X_test': test_data[available].fillna(0),
+            'y_test': test_data[target],
+            'metrics': available,
+        }
+    return datasets
+
+
+def expand_configs(model: str, n_iter: Optional[int] = None, random_state: int = 42) -> List[Dict]:
+    """
+    Hyperparameter configs of a model
+
+    Args:
+        model: Model name (key of DEFAULT_PARAMS)
+        n_iter: Random-search size (None: only the notebook defaults)
+        random_state: Sampler seed
+
+    Returns:
+        List of JSON-ready parameter dictionaries
+    """
+    if model not in DEFAULT_PARAMS:
+        raise ValueError(f"Unknown model '{model}' (expected one of {sorted(DEFAULT_PARAMS)})")
+    if not n_iter or model not in SEARCH_SPACES:
+        return [_jsonable(DEFAULT_PARAMS[model])]
+
+    from scipy.stats import uniform
+    from sklearn.model_selection import ParameterSampler
+
+    space = {}
+    for name, values in SEARCH_SPACES[model].items():
+        if isinstance(values, tuple) and values and values[0] == 'uniform':
+            space[name] = uniform(values[1], values[2])
+        else:
+            space[name] = values
+    sampled = ParameterSampler(space, n_iter=n_iter, random_state=random_state)
+    return [_jsonable({**DEFAULT_PARAMS[model], **params}) for params in sampled]
+
+
+def build_estimator(model: str, params: Dict, n_jobs: int = 1):
+    """Unfitted estimator for a model name and JSON params."""
+    params = _estimator_params(params)
+    if model == 'rf':
+        from sklearn.ensemble import RandomForestRegressor
+        return RandomForestRegressor(n_jobs=n_jobs, **params)
+    if model == 'gb':
+        from sklearn.ensemble import GradientBoostingRegressor
+        return GradientBoostingRegressor(**params)
+    if model == 'xgb':
+        import xgboost as xgb
+        return xgb.XGBRegressor(n_jobs=n_jobs, **params)
+    if model == 'mlp':
+        from sklearn.neural_network import MLPRegressor
+        return MLPRegressor(**params)
+    if model == 'voting':
+        from sklearn.ensemble import VotingRegressor
+        members = [m for m in params['members'] if m != 'xgb' or _xgboost_available()]
+        return VotingRegressor([(m, build_estimator(m, DEFAULT_PARAMS[m], n_jobs)) for m in members])
+    raise ValueError(f"Unknown model '{model}'")
+
+
+def _thread_limits(threads: int):
+    """Context limiting BLAS/OpenMP threads in the current process (no-op without threadpoolctl)."""
+    try:
+        from threadpoolctl import threadpool_limits
+    except ImportError:
+        return contextlib.nullcontext()
+    return threadpool_limits(limits=threads)
+
+
+def _init_worker(threads: int) -> None:
+    """Pool initializer: pin each worker process to `threads` BLAS/OpenMP threads."""
+    for var in ['OMP_NUM_THREADS', 'OPENBLAS_NUM_THREADS', 'MKL_NUM_THREADS']:
+        os.environ[var] = str(threads)
+    try:
+        from threadpoolctl import threadpool_limits
+        threadpool_limits(threads)
+    except ImportError:
+        pass
+
+
+def _write_pickle(path: Path, obj) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(path.name + '.tmp')
+    with open(tmp_path, 'wb') as handle:
+        pickle.dump(obj, handle, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, path)
+
+
+def _fit_job(job: Dict) -> Dict:
+    from sklearn.metrics import mean_absolute_error, r2_score
+    from sklearn.model_selection import KFold, cross_val_score
+
+    start = time.perf_counter()
+    result = {key: job[key] for key in ['key', 'position', 'model', 'params']}
+    try:
+        X_train, X_test = job['X_train'], job['X_test']
+        if job['scaler'] is not None:
+            X_train = job['scaler'].transform(X_train)
+            X_test = job['scaler'].transform(X_test)
+        else:
+            X_train, X_test = X_train.to_numpy(), X_test.to_numpy()
+        y_train, y_test = job['y_train'].to_numpy(), job['y_test'].to_numpy()
+
+        estimator = build_estimator(job['model'], job['params'], job['n_jobs'])
+        cv_r2 = np.nan
+        if job['cv'] and job['cv'] > 1:
+            cv_r2 = float(np.mean(cross_val_score(estimator, X_train, y_train, scoring='r2',
+                                                  cv=KFold(job['cv']), n_jobs=1)))
+        estimator.fit(X_train, y_train)
+        train_pred = estimator.predict(X_train)
+        test_pred = estimator.predict(X_test)
+        result.update({
+            'cv_r2': cv_r2,
+            'train_r2': float(r2_score(y_train, train_pred)),
+            'test_r2': float(r2_score(y_test, test_pred)),
+            'train_mae': float(mean_absolute_error(y_train, train_pred)),
+            'test_mae': float(mean_absolute_error(y_test, test_pred)),
+            'seconds': time.perf_counter() - start,
+            'error': None,
+        })
+        _write_pickle(Path(job['model_path']), {'model': estimator, 'scaler': job['scaler'], 'result': result})
+        with open(job['result_path'], 'w', encoding='utf-8') as handle:
+            json.dump(result, handle, indent=2)
+    except Exception as e:
+        result.update({'error': f"{type(e).__name__}: {e}", 'seconds': time.perf_counter() - start})
+    return result
+
+
+class TrainingOrchestrator:
+    """Class for training position-specific models in parallel with a disk cache"""
+
+    def __init__(self, cache_dir: Optional[PathLike] = None,
+                 cpu_budget: Optional[int] = None,
+                 cv: int = 2,
+                 random_state: int = 42,
+                 verbose: bool = True):
+        """
+        Args:
+            cache_dir: Folder for fitted models, scalers and results
+            cpu_budget: Total CPUs shared by workers and their inner threads
+                (default: available cores)
+            cv: Folds of the cross-validated R² used to rank configs (0/1: none)
+            random_state: Seed of the random search
+            verbose: Print progress and a summary
+        """
+        self.cache_dir = Path(cache_dir) if cache_dir is not None else DEFAULT_MODEL_CACHE
+        self.cpu_budget = max(1, cpu_budget or available_cpus())
+        self.cv = cv
+        self.random_state = random_state
+        self.verbose = verbose
+
+    # ------------------------------------------------------------------
+    # Keys and cache files
+    # ------------------------------------------------------------------
+    def job_key(self, model: str, params: Dict, features: List[str], data_key: str) -> str:
+        """Cache key of a fitted model."""
+        spec = json.dumps([TRAINING_VERSION, model, params, features, data_key, self.cv], sort_keys=True)
+        return hashlib.sha1(spec.encode()).hexdigest()
+
+    def _paths(self, key: str):
+        folder = self.cache_dir / key[:2]
+        return folder / f"{key}.pkl", folder / f"{key}.json"
+
+    def is_cached(self, key: str) -> bool:
+        model_path, result_path = self._paths(key)
+        return model_path.exists() and result_path.exists()
+
+    def load_result(self, key: str) -> Optional[Dict]:
+        try:
+            with open(self._paths(key)[1], 'r', encoding='utf-8') as handle:
+                return json.load(handle)
+        except (OSError, ValueError):
+            return None
+
+    def load_model(self, key: str) -> Dict:
+        """Fitted model, its scaler (or None) and its result."""
+        with open(self._paths(key)[0], 'rb') as handle:
+            return pickle.load(handle)
+
+    def scaler(self, dataset: Dict):
+        """StandardScaler fitted on a dataset's training features (memoized on disk)."""
+        key = hashlib.sha1(json.dumps(['standard', list(dataset['X_train'].columns),
+                                       frame_hash(dataset['X_train'])]).encode()).hexdigest()
+        path = self.cache_dir / 'preprocessing' / f"{key}.pkl"
+        try:
+            with open(path, 'rb') as handle:
+                return pickle.load(handle)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            pass
+        from sklearn.preprocessing import StandardScaler
+        fitted = StandardScaler().fit(dataset['X_train'])
+        _write_pickle(path, fitted)
+        return fitted
+
+    # ------------------------------------------------------------------
+    # Planning and running
+    # ------------------------------------------------------------------
+    def plan(self, datasets: Dict[str, Dict],
+             models: Union[Sequence[str], Dict[str, Optional[int]]] = ('rf', 'xgb', 'mlp', 'voting')) -> List[Dict]:
+        """
+        Expand datasets and models into job descriptions (without data)
+
+        Args:
+            datasets: Output of build_position_datasets()
+            models: Model names, or a mapping of model name to random-search size
+
+        Returns:
+            List of dictionaries with key, position, model, params and cached flag
+        """
+        if not isinstance(models, dict):
+            models = {model: None for model in models}
+        if 'xgb' in models and not _xgboost_available():
+            print("⚠️ xgboost not installed; skipping XGBoost jobs")
+            models = {model: n for model, n in models.items() if model != 'xgb'}
+
+        jobs = []
+        for position, dataset in datasets.items():
+            data_key = frame_hash(dataset['X_train'], dataset['y_train'], dataset['X_test'], dataset['y_test'])
+            for model, n_iter in models.items():
+                for params in expand_configs(model, n_iter, self.random_state):
+                    key = self.job_key(model, params, list(dataset['X_train'].columns), data_key)
+                    jobs.append({'key': key, 'position': position, 'model': model, 'params': params,
+                                 'cached': self.is_cached(key)})
+        return jobs
+
+    @traced(name='TrainingOrchestrator.run')
+    def run(self, datasets: Dict[str, Dict],
+            models: Union[Sequence[str], Dict[str, Optional[int]]] = ('rf', 'xgb', 'mlp', 'voting'),
+            force: bool = False) -> pd.DataFrame:
+        """
+        Train every (position x model x config) job that is not cached yet
+
+        Args:
+            datasets: Output of build_position_datasets()
+            models: Model names, or a mapping of model name to random-search size
+            force: Retrain cached jobs too
+
+        Returns:
+            DataFrame with one row per job (metrics, seconds, cached flag, key)
+        """
+        start = time.perf_counter()
+        planned = self.plan(datasets, models)
+        todo = [job for job in planned if force or not job['cached']]
+
+        workers = max(1, min(self.cpu_budget, len(todo)))
+        threads = max(1, self.cpu_budget // workers)
+        scalers = {}
+        jobs = []
+        for job in todo:
+            dataset = datasets[job['position']]
+            if job['model'] in SCALED_MODELS and job['position'] not in scalers:
+                scalers[job['position']] = self.scaler(dataset)
+            model_path, result_path = self._paths(job['key'])
+            jobs.append({
+                **job, 'X_train': dataset['X_train'], 'y_train': dataset['y_train'],
+                'X_test': dataset['X_test'], 'y_test': dataset['y_test'],
+                'scaler': scalers.get(job['position']) if job['model'] in SCALED_MODELS else None,
+                'n_jobs': threads, 'cv': self.cv,
+                'model_path': str(model_path), 'result_path': str(result_path),
+            })
+
+        if workers == 1 or len(jobs) <= 1:
+            # Serial fits limit threads only for their duration, not for the caller's session
+            with _thread_limits(threads):
+                fitted = [_fit_job(job) for job in jobs]
+        else:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(threads,)) as pool:
+                fitted = list(pool.map(_fit_job, jobs))
+        fitted = {result['key']: result for result in fitted}
+
+        rows = []
+        for job in planned:
+            if job['key'] in fitted:
+                row = dict(fitted[job['key']], cached=False)
+            else:
+                row = dict(self.load_result(job['key']) or {}, cached=True)
+            rows.append({**row, 'key': job['key'], 'position': job['position'], 'model': job['model'],
+                         'params': json.dumps(job['params'], sort_keys=True)})
+        results = pd.DataFrame(rows)
+
+        if self.verbose:
+            failed = [r for r in fitted.values() if r['error'] is not None]
+            for result in failed:
+                print(f"❌ {result['position']}/{result['model']}: {result['error']}")
+            print(f"✅ Training: {len(fitted) - len(failed)} fitted, {len(planned) - len(todo)} cached, "
+                  f"{len(failed)} failed in {time.perf_counter() - start:.1f}s "
+                  f"({workers} worker(s) x {threads} thread(s))")
+        return results
+
+    @staticmethod
+    def best(results: pd.DataFrame, metric: str = 'cv_r2') -> pd.DataFrame:
+        """Best config per position and model (by cv_r2, falling back to test_r2)."""
+        ok = results[results['error'].isna()] if 'error' in results.columns else results
+        score = ok[metric].fillna(ok['test_r2']) if metric in ok.columns else ok['test_r2']
+        order = ok.assign(_score=score).sort_values('_score', ascending=False)
+        return order.drop_duplicates(['position', 'model']).drop(columns='_score').reset_index(drop=True)
+
+
+def quick_train(df: Optional[pd.DataFrame] = None,
+                models: Union[Sequence[str], Dict[str, Optional[int]]] = ('rf', 'xgb', 'mlp', 'voting'),
+                cpu_budget: Optional[int] = None) -> pd.DataFrame:
+    """
+    Quick function to train the position models on the rebalanced scores
+
+    Args:
+        df: Scored rows (default: the feature store matrix of load_rebalanced_scores())
+        models: Model names, or a mapping of model name to random-search size
+        cpu_budget: Total CPUs for the run
+
+    Returns:
+        Best config per position and model
+    """
+    if df is None:
+        from feature_store import load_features
+        df = load_features().frame(with_meta=True)
+    datasets = build_position_datasets(df)
+    orchestrator = TrainingOrchestrator(cpu_budget=cpu_budget)
+    return orchestrator.best(orchestrator.run(datasets, models))
+
+
+if __name__ == "__main__":
+    print("Testing Model Training Module...")
+    print(quick_train(models={'rf': None, 'mlp': 4})[['position', 'model', 'cv_r2', 'test_r2', 'test_mae']])
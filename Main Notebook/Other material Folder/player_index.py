@@ -0,0 +1,469 @@
+"""
+Player Index Module for Real Madrid Soccer Analysis
+Contains an in-memory index over the match table for interactive player lookups
+
+The EDA radar charts and the per-player forecasting plots find rows with
+full-frame scans such as df[df['Player'] == player] and str.contains on
+`Pos`. PlayerIndex sorts the rows once by (player, date) and keeps:
+
+- player -> [start, stop) row range (dates inside it searchable with searchsorted);
+- (season, position group) -> row positions, with multi-valued `Pos`
+  strings counted for every group they name;
+- match id -> row positions (CSR offsets over the rows sorted by match);
+- per player-season aggregates (matches, minutes, per-match means, per-90
+  rates), plus an 'All' pseudo-season with career totals;
+- percentile ranks of the per-90 rates within each (season, position group),
+  precomputed for every player-season.
+
+Lookups are dictionary hits or array slices, so a pairwise radar comparison
+does not touch the full table.
+"""
+
+import time
+import unicodedata
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from position_stats import EXCLUDE_COLUMNS, POSITION_GROUPS, POSITION_NAMES, position_membership
+from streaming import _minutes_col
+from tracing import traced
+
+ALL_SEASONS = 'All'
+MATCH_URL_COLUMN = 'Match URL'
+# Player-seasons below this many minutes get no percentile and are left out of the populations
+MIN_PERCENTILE_MINUTES = 90.0
+
+# Radar pairs of Images/01_EDA
+RADAR_PAIRS = {
+    'GK': ('Courtois', 'Lunin'),
+    'DF': ('Rüdiger', 'Militão'),
+    'MF': ('Modrić', 'Bellingham'),
+    'FW': ('Vinícius', 'Mbappé'),
+}
+
+PlayerKey = Union[str, Tuple]
+
+
+def normalize_name(name) -> str:
+    """Case- and accent-insensitive form of a player name ('Modrić' -> 'modric')."""
+    text = unicodedata.normalize('NFKD', str(name))
+    return ''.join(ch for ch in text if not unicodedata.combining(ch)).casefold().strip()
+
+
+def is_rate_metric(metric: str) -> bool:
+    """Percentage columns (e.g. 'Passes Cmp%') are averaged, not turned into per-90 rates."""
+    return metric.strip().endswith('%')
+
+
+def csr_groups(codes: np.ndarray, n_groups: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Row positions grouped by code
+
+    Args:
+        codes: Group code per row (negative: no group)
+        n_groups: Number of groups
+
+    Returns:
+        Tuple of (row positions ordered by code, offsets of length n_groups + 1)
+    """
+    valid = np.flatnonzero(codes >= 0)
+    order = valid[np.argsort(codes[valid], kind='stable')]
+    offsets = np.zeros(n_groups + 1, dtype=np.int64)
+    np.cumsum(np.bincount(codes[valid], minlength=n_groups), out=offsets[1:])
+    return order, offsets
+
+
+def grouped_sums(codes: np.ndarray):
+    """
+    Sorted distinct codes and a function summing arrays over them
+
+    Rows are ordered by code once; each call is then a single np.add.reduceat.
+
+    Returns:
+        Tuple of (distinct codes, function mapping a (rows, ...) array to (groups, ...) sums)
+    """
+    order = np.argsort(codes, kind='stable')
+    ordered = codes[order]
+    starts = np.r_[0, np.flatnonzero(ordered[1:] != ordered[:-1]) + 1] if len(codes) else np.zeros(0, dtype=np.int64)
+
+    def sums(values: np.ndarray) -> np.ndarray:
+        return np.add.reduceat(values[order], starts, axis=0)
+
+    return ordered[starts], sums
+
+
+def percentile_ranks(values: np.ndarray) -> np.ndarray:
+    """
+    Percent of the non-missing values at or below each value, per column
+
+    Args:
+        values: (rows x metrics) array, NaN where missing
+
+    Returns:
+        Array like values with percentiles in [0, 100] (NaN where missing)
+    """
+    ranks = np.full(values.shape, np.nan)
+    for j in range(values.shape[1]):
+        column = values[:, j]
+        present = ~np.isnan(column)
+        if not present.any():
+            continue
+        ordered = np.sort(column[present])
+        ranks[present, j] = np.searchsorted(ordered, column[present], side='right') * 100.0 / len(ordered)
+    return ranks
+
+
+class PlayerIndex:
+    """Class for indexed player, season/position and match lookups over the match table"""
+
+    @traced(name='PlayerIndex.build')
+    def __init__(self, df: pd.DataFrame, metrics: Optional[Sequence[str]] = None,
+                 player_keys: Optional[Sequence[str]] = None,
+                 date_col: str = 'Date', season_col: str = 'Season', position_col: str = 'Pos',
+                 groups: Optional[Dict[str, List[str]]] = None,
+                 min_minutes: float = MIN_PERCENTILE_MINUTES):
+        """
+        Args:
+            df: Match-level rows (one row per player and match)
+            metrics: Metric columns to aggregate (default: all numeric non-identifier columns)
+            player_keys: Columns identifying a player (default: Club and Player when present)
+            date_col: Match date column
+            season_col: Season column
+            position_col: Column holding the position strings
+            groups: Mapping of group key to member abbreviations
+            min_minutes: Minutes a player-season needs to enter the percentile populations
+        """
+        if player_keys is None:
+            player_keys = [key for key in ['Club', 'Player'] if key in df.columns]
+        self.player_keys = list(player_keys)
+        self.date_col = date_col
+        self.season_col = season_col
+        self.minutes_col = _minutes_col(df.columns)
+        self.groups = POSITION_GROUPS if groups is None else groups
+        self.positions = list(self.groups)
+        self.min_minutes = min_minutes
+
+        if metrics is None:
+            metrics = df.select_dtypes(include=[np.number]).columns.tolist()
+            metrics = [col for col in metrics if col not in EXCLUDE_COLUMNS and col != self.minutes_col]
+        self.metrics = [col for col in metrics if col in df.columns]
+        self._metric_index = {metric: i for i, metric in enumerate(self.metrics)}
+
+        self._build_rows(df, position_col)
+        self._build_aggregates()
+        self._build_percentiles()
+
+    # ------------------------------------------------------------------
+    # Index construction
+    # ------------------------------------------------------------------
+    def _build_rows(self, df: pd.DataFrame, position_col: str) -> None:
+        df = df[df[self.player_keys].notna().all(axis=1).to_numpy()]
+        dates = df[self.date_col]
+        if not pd.api.types.is_datetime64_any_dtype(dates.dtype):
+            dates = pd.to_datetime(dates, errors='coerce')
+        player_codes, players = pd.factorize(pd.MultiIndex.from_frame(df[self.player_keys].astype(object)))
+        order = np.lexsort((np.arange(len(df)), dates.to_numpy(), player_codes))
+
+        self.rows = df.iloc[order]
+        self.dates = dates.to_numpy()[order]
+        self.player_codes = player_codes[order]
+        self.players = pd.DataFrame(list(players), columns=self.player_keys)
+        self._player_offsets = np.searchsorted(self.player_codes, np.arange(len(self.players) + 1))
+        self._player_lookup = {key if len(key) > 1 else key[0]: code for code, key in enumerate(players)}
+        self._name_lookup = {}
+        for code, name in enumerate(self.players[self.player_keys[-1]]):
+            self._name_lookup.setdefault(normalize_name(name), []).append(code)
+
+        minutes = self.rows[self.minutes_col] if self.minutes_col else pd.Series(90.0, index=self.rows.index)
+        self.minutes = pd.to_numeric(minutes, errors='coerce').fillna(0).to_numpy(dtype=np.float64)
+        self.values = self.rows[self.metrics].apply(pd.to_numeric, errors='coerce').to_numpy(dtype=np.float64)
+
+        season_codes, self.seasons = pd.factorize(self.rows[self.season_col], sort=True)
+        self.season_codes = season_codes
+        self._season_lookup = {season: code for code, season in enumerate(self.seasons)}
+
+        if position_col in self.rows.columns:
+            self.membership = position_membership(self.rows[position_col], self.groups).to_numpy()
+        else:
+            self.membership = np.zeros((len(self.rows), len(self.positions)), dtype=bool)
+        self._season_position = {}
+        for g, position in enumerate(self.positions):
+            in_group = np.where(self.membership[:, g], season_codes, -1)
+            order, offsets = csr_groups(in_group, len(self.seasons))
+            for s, season in enumerate(self.seasons):
+                self._season_position[(season, position)] = np.sort(order[offsets[s]:offsets[s + 1]])
+            self._season_position[(ALL_SEASONS, position)] = np.flatnonzero(self.membership[:, g])
+
+        if MATCH_URL_COLUMN in self.rows.columns:
+            match_codes, urls = pd.factorize(self.rows[MATCH_URL_COLUMN])
+        else:
+            match_codes, urls = np.full(len(self.rows), -1, dtype=np.int64), pd.Index([])
+        self.match_ids = match_codes
+        self._match_lookup = {url: code for code, url in enumerate(urls)}
+        self._match_order, self._match_offsets = csr_groups(match_codes, len(urls))
+
+    def _build_aggregates(self) -> None:
+        n_seasons = len(self.seasons)
+        # Season slots 0..n-1, career slot n, slot n+1 for rows without a season (career only)
+        width = n_seasons + 2
+        slots = np.where(self.season_codes >= 0, self.season_codes, n_seasons + 1)
+        group_codes, group_sums = grouped_sums(self.player_codes * width + slots)
+        career_codes, career_sums = grouped_sums(group_codes // width * width + n_seasons)
+        seasonal = group_codes % width < n_seasons
+        codes = np.r_[group_codes[seasonal], career_codes]
+        order = np.argsort(codes, kind='stable')
+        codes = codes[order]
+
+        def totals(values: np.ndarray) -> np.ndarray:
+            per_group = group_sums(values)
+            return np.concatenate([per_group[seasonal], career_sums(per_group)])[order]
+
+        self._agg_player = codes // width
+        self._agg_season = codes % width
+        self._agg_lookup = {(p, s): i for i, (p, s) in enumerate(zip(self._agg_player, self._agg_season))}
+        present = ~np.isnan(self.values)
+        self.agg_matches = totals(np.ones(len(self.values), dtype=np.int64))
+        self.agg_minutes = totals(self.minutes)
+        sum_values = totals(np.where(present, self.values, 0.0))
+        counts = totals(present.astype(np.int64))
+        played = totals(present * self.minutes[:, None])
+        with np.errstate(invalid='ignore', divide='ignore'):
+            self.agg_mean = np.where(counts > 0, sum_values / counts, np.nan)
+            per90 = np.where(played > 0, sum_values / played * 90.0, np.nan)
+        rates = np.array([is_rate_metric(metric) for metric in self.metrics], dtype=bool)
+        self.agg_per90 = np.where(rates, self.agg_mean, per90)
+
+        # Season-group membership: any row of the player-season in the group
+        self.agg_membership = totals(self.membership.astype(np.int64)) > 0
+
+        self.column_min = np.nanmin(np.where(present, self.values, np.inf), axis=0, initial=np.inf)
+        self.column_max = np.nanmax(np.where(present, self.values, -np.inf), axis=0, initial=-np.inf)
+
+    def _build_percentiles(self) -> None:
+        self.agg_percentile = np.full((len(self.agg_per90), len(self.positions), len(self.metrics)), np.nan,
+                                      dtype=np.float32)
+        eligible = self.agg_minutes >= self.min_minutes
+        for s in range(len(self.seasons) + 1):
+            in_season = eligible & (self._agg_season == s)
+            for g in range(len(self.positions)):
+                block = np.flatnonzero(in_season & self.agg_membership[:, g])
+                if len(block):
+                    self.agg_percentile[block, g] = percentile_ranks(self.agg_per90[block])
+
+    # ------------------------------------------------------------------
+    # Key resolution
+    # ------------------------------------------------------------------
+    def resolve(self, player: PlayerKey) -> int:
+        """
+        Player code of a key value, tuple of key values or (partial) name
+
+        Exact keys are a dictionary hit. Otherwise the name is matched
+        case- and accent-insensitively, first exactly and then as a
+        substring of the distinct player names.
+
+        Raises:
+            KeyError: No player or several players match
+        """
+        if player in self._player_lookup:
+            return self._player_lookup[player]
+        query = normalize_name(player[-1] if isinstance(player, tuple) else player)
+        codes = self._name_lookup.get(query)
+        if codes is None:
+            codes = [code for name, found in self._name_lookup.items() if query in name for code in found]
+            if codes:
+                self._name_lookup[query] = codes
+        if not codes:
+            raise KeyError(f"Player '{player}' not in the index")
+        if len(codes) > 1:
+            names = self.players.iloc[codes][self.player_keys[-1]].tolist()
+            raise KeyError(f"Player '{player}' is ambiguous: {names}")
+        return codes[0]
+
+    def find(self, query: str) -> pd.DataFrame:
+        """Players whose name contains the query (case- and accent-insensitive)."""
+        query = normalize_name(query)
+        codes = sorted(code for name, found in self._name_lookup.items() if query in name for code in found)
+        return self.players.iloc[codes]
+
+    def _position(self, position: str) -> int:
+        if position in self.groups:
+            return self.positions.index(position)
+        for key, name in POSITION_NAMES.items():
+            if name == position and key in self.groups:
+                return self.positions.index(key)
+        raise KeyError(f"Position '{position}' not in {self.positions}")
+
+    def _season(self, season) -> int:
+        if season is None or season == ALL_SEASONS:
+            return len(self.seasons)
+        if season not in self._season_lookup:
+            raise KeyError(f"Season '{season}' not in the index")
+        return self._season_lookup[season]
+
+    def _aggregate_row(self, player: PlayerKey, season=None) -> int:
+        key = (self.resolve(player), self._season(season))
+        if key not in self._agg_lookup:
+            raise KeyError(f"No rows for player '{player}' in season '{season}'")
+        return self._agg_lookup[key]
+
+    # ------------------------------------------------------------------
+    # Row lookups
+    # ------------------------------------------------------------------
+    def player_range(self, player: PlayerKey, start=None, end=None) -> slice:
+        """Row slice of a player's matches, optionally limited to [start, end] dates."""
+        code = self.resolve(player)
+        lower, upper = self._player_offsets[code], self._player_offsets[code + 1]
+        dates = self.dates[lower:upper]
+        if start is not None:
+            lower += np.searchsorted(dates, np.datetime64(pd.Timestamp(start)), side='left')
+        if end is not None:
+            upper = self._player_offsets[code] + np.searchsorted(dates, np.datetime64(pd.Timestamp(end)), side='right')
+        return slice(int(lower), int(max(lower, upper)))
+
+    def player_rows(self, player: PlayerKey, start=None, end=None) -> pd.DataFrame:
+        """A player's match rows sorted by date (df[df['Player'] == player] without the scan)."""
+        return self.rows.iloc[self.player_range(player, start, end)]
+
+    def season_position_rows(self, season, position: str) -> pd.DataFrame:
+        """Rows of a season (or 'All') whose `Pos` includes the position group."""
+        season = ALL_SEASONS if season is None else season
+        key = (season, self.positions[self._position(position)])
+        if key not in self._season_position:
+            raise KeyError(f"Season '{season}' not in the index")
+        return self.rows.iloc[self._season_position[key]]
+
+    def match_rows(self, match: Union[int, str]) -> pd.DataFrame:
+        """Rows of a match by match id or Match URL."""
+        code = self._match_lookup[match] if isinstance(match, str) else int(match)
+        return self.rows.iloc[self._match_order[self._match_offsets[code]:self._match_offsets[code + 1]]]
+
+    # ------------------------------------------------------------------
+    # Aggregate lookups
+    # ------------------------------------------------------------------
+    def season_aggregates(self, player: PlayerKey, season=None) -> pd.Series:
+        """Matches, minutes and per-match means of a player-season (season None: career)."""
+        i = self._aggregate_row(player, season)
+        head = pd.Series({'Matches': self.agg_matches[i], 'Minutes': self.agg_minutes[i]}, dtype=np.float64)
+        return pd.concat([head, pd.Series(self.agg_mean[i], index=self.metrics)])
+
+    def player_seasons(self, player: PlayerKey) -> pd.DataFrame:
+        """Matches and minutes of every season of a player."""
+        code = self.resolve(player)
+        seasons = [(s, self._agg_lookup[(code, s)]) for s in range(len(self.seasons))
+                   if (code, s) in self._agg_lookup]
+        rows = [i for _, i in seasons]
+        return pd.DataFrame({'Season': [self.seasons[s] for s, _ in seasons],
+                             'Matches': self.agg_matches[rows], 'Minutes': self.agg_minutes[rows]})
+
+    def per90_profile(self, player: PlayerKey, season=None, metrics: Optional[Sequence[str]] = None) -> pd.Series:
+        """Per-90 rates of a player-season (percentage metrics: per-match mean)."""
+        columns = self._columns(metrics)
+        return pd.Series(self.agg_per90[self._aggregate_row(player, season), columns],
+                         index=[self.metrics[j] for j in columns])
+
+    def percentiles(self, player: PlayerKey, position: str, season=None,
+                    metrics: Optional[Sequence[str]] = None) -> pd.Series:
+        """Percentile ranks (0-100) of a player-season's per-90 rates within a position group."""
+        columns = self._columns(metrics)
+        ranks = self.agg_percentile[self._aggregate_row(player, season), self._position(position), columns]
+        return pd.Series(ranks.astype(np.float64), index=[self.metrics[j] for j in columns])
+
+    def _columns(self, metrics: Optional[Sequence[str]]) -> List[int]:
+        if metrics is None:
+            return list(range(len(self.metrics)))
+        return [self._metric_index[metric] for metric in metrics if metric in self._metric_index]
+
+    def compare(self, players: Sequence[PlayerKey], position: str, season=None,
+                metrics: Optional[Sequence[str]] = None) -> pd.DataFrame:
+        """
+        Radar comparison of several players
+
+        Args:
+            players: Player keys or names
+            position: Position group for the percentile ranks ('GK' or 'Goalkeeper')
+            season: Season to compare (None: careers)
+            metrics: Radar metrics (default: all indexed metrics)
+
+        Returns:
+            DataFrame indexed by metric with (statistic, player) columns:
+            Mean (per match), Per90, Percentile (within position) and
+            Normalized (the notebook's 0-100 scale over the column min/max)
+        """
+        columns = self._columns(metrics)
+        g = self._position(position)
+        names, rows = [], []
+        for player in players:
+            rows.append(self._aggregate_row(player, season))
+            names.append(self.players.iloc[self.resolve(player)][self.player_keys[-1]])
+        rows = np.asarray(rows)
+
+        means = self.agg_mean[np.ix_(rows, columns)]
+        low, high = self.column_min[columns], self.column_max[columns]
+        span = np.where(high > low, high - low, np.nan)
+        normalized = np.where(high > low, np.clip((means - low) / span * 100.0, 0.0, 100.0), 50.0)
+        stats = {
+            'Mean': means,
+            'Per90': self.agg_per90[np.ix_(rows, columns)],
+            'Percentile': self.agg_percentile[rows, g][:, columns].astype(np.float64),
+            'Normalized': normalized,
+        }
+        frame = pd.concat({stat: pd.DataFrame(values.T, columns=names) for stat, values in stats.items()}, axis=1)
+        frame.index = [self.metrics[j] for j in columns]
+        return frame
+
+
+def quick_player_index(df: Optional[pd.DataFrame] = None) -> PlayerIndex:
+    """
+    Quick function to index the combined match data
+
+    Args:
+        df: Match rows (default: the combined match data through the cache)
+
+    Returns:
+        PlayerIndex
+    """
+    if df is None:
+        from data_cache import load_match_data
+        df = load_match_data(verbose=False)
+    return PlayerIndex(df)
+
+
+def example_radar_timing(df: pd.DataFrame, pairs: Optional[Dict[str, Tuple[str, str]]] = None,
+                         metrics: Optional[Sequence[str]] = None, repeats: int = 20) -> Dict[str, float]:
+    """Example: indexed radar comparisons against the notebook's full-frame scans"""
+    pairs = RADAR_PAIRS if pairs is None else pairs
+
+    start = time.perf_counter()
+    index = PlayerIndex(df, metrics=metrics)
+    build = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(repeats):
+        for position, pair in pairs.items():
+            index.compare(pair, position)
+    indexed = (time.perf_counter() - start) / (repeats * len(pairs))
+
+    metrics = index.metrics
+    start = time.perf_counter()
+    for position, pair in pairs.items():
+        for name in pair:
+            name = index.players.iloc[index.resolve(name)]['Player']
+            player = df[df['Player'].str.contains(name, case=False, na=False, regex=False)]['Player'].iloc[0]
+            player_data = df[df['Player'] == player]
+            player_data[metrics].mean()
+            df[metrics].max() - df[metrics].min()
+    scan = (time.perf_counter() - start) / len(pairs)
+
+    print(f"Index build:              {build * 1000:.1f} ms")
+    print(f"Notebook scans per pair:  {scan * 1000:.2f} ms")
+    print(f"Indexed compare per pair: {indexed * 1000:.2f} ms")
+    return {'build': build, 'scan': scan, 'indexed': indexed}
+
+
+if __name__ == "__main__":
+    print("Testing Player Index Module...")
+    index = quick_player_index()
+    for position, pair in RADAR_PAIRS.items():
+        print(index.compare(pair, position).head())
@@ -0,0 +1,360 @@
+"""
+Position Statistics Module for Real Madrid Soccer Analysis
+Contains a vectorized engine for per-position summaries and correlations
+
+The multi-valued `Pos` strings (e.g. "FW,RM") are parsed once into a boolean
+membership matrix, so a row counts towards every position group it belongs
+to. Means, standard deviations and pairwise-complete correlation matrices for
+all groups are then computed together from masked cross-product sums.
+"""
+
+import warnings
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+# Position groups keyed by the abbreviations used in the EDA report
+POSITION_GROUPS = {
+    'FW': ['FW', 'LW', 'RW', 'CF', 'ST'],
+    'MF': ['MF', 'CM', 'DM', 'AM', 'LM', 'RM'],
+    'DF': ['DF', 'CB', 'LB', 'RB', 'WB', 'LWB', 'RWB', 'SW'],
+    'GK': ['GK']
+}
+
+POSITION_NAMES = {'FW': 'Forward', 'MF': 'Midfielder', 'DF': 'Defender', 'GK': 'Goalkeeper'}
+
+# Identifier-like columns never treated as metrics
+EXCLUDE_COLUMNS = ['Date', 'Competition', 'Opponent', 'Player', '#', 'Nation', 'Pos', 'Age', 'Season']
+
+DESCRIBE_INDEX = ['count', 'mean', 'std', 'min', '25%', '50%', '75%', 'max']
+QUANTILES = [0.0, 0.25, 0.5, 0.75, 1.0]
+
+
+def position_membership(pos: pd.Series, groups: Optional[Dict[str, List[str]]] = None) -> pd.DataFrame:
+    """
+    Parse multi-valued position strings into a boolean membership matrix
+
+    Each distinct string is split only once; rows are then mapped through
+    their category codes.
+
+    Args:
+        pos: Series of position strings such as "FW,RM"
+        groups: Mapping of group key to member abbreviations
+
+    Returns:
+        Boolean DataFrame (rows x groups) aligned with `pos`
+    """
+    groups = POSITION_GROUPS if groups is None else groups
+    codes, uniques = pd.factorize(pos)
+
+    lookup = np.zeros((len(uniques) + 1, len(groups)), dtype=bool)
+    for u, value in enumerate(uniques):
+        tokens = {token.strip().upper() for token in str(value).split(',')}
+        for g, members in enumerate(groups.values()):
+            lookup[u, g] = not tokens.isdisjoint(members)
+
+    # Missing positions (code -1) map to the all-False last row
+    membership = lookup[codes]
+    return pd.DataFrame(membership, index=pos.index, columns=list(groups))
+
+
+def correlation_pairs(corr: pd.DataFrame, threshold: float = 0.6) -> pd.DataFrame:
+    """
+    Extract metric pairs whose absolute correlation exceeds a threshold
+
+    Args:
+        corr: Square correlation matrix
+        threshold: Pairs with |r| > threshold are returned
+
+    Returns:
+        DataFrame with Metric_1, Metric_2 and Correlation, in matrix order
+    """
+    values = corr.to_numpy()
+    rows, cols = np.triu_indices(len(corr.columns), k=1)
+    r = values[rows, cols]
+    keep = np.abs(r) > threshold
+    return pd.DataFrame({
+        'Metric_1': corr.columns[rows[keep]],
+        'Metric_2': corr.columns[cols[keep]],
+        'Correlation': r[keep]
+    })
+
+
+class PositionStatsEngine:
+    """Class for computing every position's statistics in one batched pass"""
+
+    def __init__(self, df: pd.DataFrame, metrics: Optional[List[str]] = None,
+                 position_col: str = 'Pos', groups: Optional[Dict[str, List[str]]] = None,
+                 chunk_rows: int = 65536, moments: Optional[Dict[str, np.ndarray]] = None):
+        """
+        Args:
+            df: Match-level DataFrame
+            metrics: Metric columns to summarise (default: all numeric non-identifier columns)
+            position_col: Column holding the position strings
+            groups: Mapping of group key to member abbreviations
+            chunk_rows: Rows per block when accumulating cross-products
+            moments: Precomputed masked_moments() sums for these groups and metrics
+                (e.g. merged per-season aggregates); skips the accumulation pass
+        """
+        self.groups = POSITION_GROUPS if groups is None else groups
+        self.positions = list(self.groups)
+
+        if metrics is None:
+            metrics = df.select_dtypes(include=[np.number]).columns.tolist()
+            metrics = [col for col in metrics if col not in EXCLUDE_COLUMNS]
+        self.metrics = [col for col in metrics if col in df.columns]
+        self._metric_index = {metric: i for i, metric in enumerate(self.metrics)}
+
+        if position_col in df.columns:
+            self.membership = position_membership(df[position_col], self.groups)
+        else:
+            self.membership = pd.DataFrame(False, index=df.index, columns=self.positions)
+
+        self.values = df[self.metrics].to_numpy(dtype=np.float64)
+        self.chunk_rows = chunk_rows
+        if moments is not None:
+            expected = (len(self.positions), len(self.metrics), len(self.metrics))
+            if any(moments[key].shape != expected for key in ('n', 'sx', 'sxx', 'sxy')):
+                raise ValueError(f"Precomputed moments must have shape {expected}")
+        self._moments = moments
+        self._quantiles = None
+
+    # ------------------------------------------------------------------
+    # Batched sufficient statistics
+    # ------------------------------------------------------------------
+    def moments(self) -> Dict[str, np.ndarray]:
+        """
+        Masked cross-product sums for every (position, metric, metric) triple
+
+        For rows where both metric i and metric j are present:
+        n = count, sx = sum of x_i, sxx = sum of x_i^2, sxy = sum of x_i * x_j.
+
+        Returns:
+            Dictionary of (groups x metrics x metrics) arrays
+        """
+        if self._moments is None:
+            self._moments = masked_moments(self.membership.to_numpy(), self.values, self.chunk_rows)
+        return self._moments
+
+    def counts(self) -> pd.DataFrame:
+        """Non-null observation counts (positions x metrics)."""
+        n = np.diagonal(self.moments()['n'], axis1=1, axis2=2)
+        return pd.DataFrame(n, index=self.positions, columns=self.metrics)
+
+    def means(self) -> pd.DataFrame:
+        """NaN-skipping means (positions x metrics)."""
+        m = self.moments()
+        n = np.diagonal(m['n'], axis1=1, axis2=2)
+        sx = np.diagonal(m['sx'], axis1=1, axis2=2)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            means = np.where(n > 0, sx / n, np.nan)
+        return pd.DataFrame(means, index=self.positions, columns=self.metrics)
+
+    def stds(self) -> pd.DataFrame:
+        """Sample standard deviations, ddof=1 (positions x metrics)."""
+        m = self.moments()
+        n = np.diagonal(m['n'], axis1=1, axis2=2)
+        sx = np.diagonal(m['sx'], axis1=1, axis2=2)
+        sxx = np.diagonal(m['sxx'], axis1=1, axis2=2)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            var = (sxx - sx * sx / n) / (n - 1)
+        var = np.where(n > 1, np.clip(var, 0.0, None), np.nan)
+        return pd.DataFrame(np.sqrt(var), index=self.positions, columns=self.metrics)
+
+    def correlation_matrices(self) -> np.ndarray:
+        """
+        Pairwise-complete Pearson correlations for every position
+
+        Returns:
+            Array of shape (positions, metrics, metrics); NaN where undefined
+        """
+        m = self.moments()
+        n, sx, sxx, sxy = m['n'], m['sx'], m['sxx'], m['sxy']
+        sy = np.swapaxes(sx, 1, 2)
+        syy = np.swapaxes(sxx, 1, 2)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            cov = sxy - sx * sy / n
+            var_x = sxx - sx * sx / n
+            var_y = syy - sy * sy / n
+            corr = cov / np.sqrt(var_x * var_y)
+        corr = np.where((n > 1) & (var_x > 0) & (var_y > 0), corr, np.nan)
+        return np.clip(corr, -1.0, 1.0)
+
+    def quantiles(self) -> np.ndarray:
+        """
+        Min, quartiles and max for every position
+
+        Returns:
+            Array of shape (positions, 5, metrics) for QUANTILES
+        """
+        if self._quantiles is None:
+            membership = self.membership.to_numpy()
+            result = np.full((len(self.positions), len(QUANTILES), len(self.metrics)), np.nan)
+            with warnings.catch_warnings():
+                warnings.simplefilter('ignore', RuntimeWarning)
+                for g in range(len(self.positions)):
+                    rows = self.values[membership[:, g]]
+                    if len(rows) > 0:
+                        result[g] = np.nanquantile(rows, QUANTILES, axis=0)
+            self._quantiles = result
+        return self._quantiles
+
+    # ------------------------------------------------------------------
+    # Tidy accessors
+    # ------------------------------------------------------------------
+    def _metric_positions(self, metrics: Optional[List[str]]) -> List[int]:
+        if metrics is None:
+            return list(range(len(self.metrics)))
+        return [self._metric_index[metric] for metric in metrics if metric in self._metric_index]
+
+    def sample_size(self, position: str) -> int:
+        """Number of rows belonging to a position group."""
+        return int(self.membership[position].sum())
+
+    def correlation(self, position: str, metrics: Optional[List[str]] = None,
+                    complete_cases: bool = False) -> pd.DataFrame:
+        """
+        Correlation matrix for one position
+
+        Args:
+            position: Group key (e.g. 'FW')
+            metrics: Subset of metrics (default: all)
+            complete_cases: Use only rows where every selected metric is present
+                (the row set used by the VIF step) instead of pairwise-complete rows
+
+        Returns:
+            Square correlation DataFrame
+        """
+        idx = self._metric_positions(metrics)
+        names = [self.metrics[i] for i in idx]
+        if complete_cases:
+            rows = self.values[self.membership[position].to_numpy()][:, idx]
+            rows = rows[~np.isnan(rows).any(axis=1)]
+            if len(rows) < 2:
+                return pd.DataFrame(np.nan, index=names, columns=names)
+            with np.errstate(invalid='ignore', divide='ignore'):
+                corr = np.corrcoef(rows, rowvar=False)
+            return pd.DataFrame(np.atleast_2d(corr), index=names, columns=names)
+
+        g = self.positions.index(position)
+        corr = self.correlation_matrices()[g][np.ix_(idx, idx)]
+        return pd.DataFrame(corr, index=names, columns=names)
+
+    def describe(self, position: str, metrics: Optional[List[str]] = None) -> pd.DataFrame:
+        """
+        Equivalent of DataFrame.describe() for one position
+
+        Args:
+            position: Group key (e.g. 'FW')
+            metrics: Subset of metrics (default: all)
+
+        Returns:
+            DataFrame indexed by count/mean/std/min/25%/50%/75%/max
+        """
+        idx = self._metric_positions(metrics)
+        g = self.positions.index(position)
+        q = self.quantiles()[g][:, idx]
+        table = np.vstack([
+            self.counts().to_numpy()[g, idx],
+            self.means().to_numpy()[g, idx],
+            self.stds().to_numpy()[g, idx],
+            q
+        ])
+        return pd.DataFrame(table, index=DESCRIBE_INDEX, columns=[self.metrics[i] for i in idx])
+
+    def summary(self) -> pd.DataFrame:
+        """
+        Long-form summary of every position and metric
+
+        Returns:
+            DataFrame with Position, Position_Name, Metric and the describe() statistics
+        """
+        counts, means, stds = self.counts(), self.means(), self.stds()
+        q = self.quantiles()
+        n_pos, n_met = len(self.positions), len(self.metrics)
+        summary = pd.DataFrame({
+            'Position': np.repeat(self.positions, n_met),
+            'Position_Name': np.repeat([POSITION_NAMES.get(p, p) for p in self.positions], n_met),
+            'Metric': np.tile(self.metrics, n_pos),
+            'count': counts.to_numpy().ravel(),
+            'mean': means.to_numpy().ravel(),
+            'std': stds.to_numpy().ravel(),
+        })
+        for k, label in enumerate(DESCRIBE_INDEX[3:]):
+            summary[label] = q[:, k, :].ravel()
+        return summary
+
+    def high_correlation_pairs(self, threshold: float = 0.6,
+                               metrics_by_position: Optional[Dict[str, List[str]]] = None) -> pd.DataFrame:
+        """
+        Highly correlated metric pairs for every position
+
+        Args:
+            threshold: Pairs with |r| > threshold are returned
+            metrics_by_position: Optional metric subset per position
+
+        Returns:
+            DataFrame with Position, Metric_1, Metric_2 and Correlation
+        """
+        frames = []
+        for position in self.positions:
+            metrics = None if metrics_by_position is None else metrics_by_position.get(position, [])
+            pairs = correlation_pairs(self.correlation(position, metrics), threshold)
+            pairs.insert(0, 'Position', position)
+            frames.append(pairs)
+        return pd.concat(frames, ignore_index=True)
+
+
+def masked_moments(membership: np.ndarray, values: np.ndarray, chunk_rows: int = 65536) -> Dict[str, np.ndarray]:
+    """
+    Accumulate masked cross-product sums over row blocks
+
+    Args:
+        membership: Boolean array (rows x groups)
+        values: Float array (rows x metrics) with NaN for missing values
+        chunk_rows: Rows per block
+
+    Returns:
+        Dictionary with n, sx, sxx and sxy arrays of shape (groups x metrics x metrics)
+    """
+    n_groups, n_metrics = membership.shape[1], values.shape[1]
+    shape = (n_groups, n_metrics, n_metrics)
+    totals = {key: np.zeros(shape) for key in ('n', 'sx', 'sxx', 'sxy')}
+
+    def cross(mask, a, b):
+        # sum_r mask[r, g] * a[r, i] * b[r, j] as one (groups*metrics x rows) @ (rows x metrics) product
+        rows = len(a)
+        stacked = (mask[:, :, None] * a[:, None, :]).reshape(rows, n_groups * n_metrics)
+        return (stacked.T @ b).reshape(shape)
+
+    for start in range(0, len(values), chunk_rows):
+        mask = membership[start:start + chunk_rows].astype(np.float64)
+        block = values[start:start + chunk_rows]
+        valid = ~np.isnan(block)
+        z = np.where(valid, block, 0.0)
+        v = valid.astype(np.float64)
+        totals['n'] += cross(mask, v, v)
+        totals['sx'] += cross(mask, z, v)
+        totals['sxx'] += cross(mask, z * z, v)
+        totals['sxy'] += cross(mask, z, z)
+
+    return totals
+
+
+def quick_position_stats(df: pd.DataFrame, metrics: Optional[List[str]] = None) -> Dict[str, pd.DataFrame]:
+    """
+    Quick function to compute the per-position statistics
+
+    Args:
+        df: Match-level DataFrame
+        metrics: Metric columns to summarise
+
+    Returns:
+        Dictionary with 'summary' and 'high_correlation_pairs' DataFrames
+    """
+    engine = PositionStatsEngine(df, metrics)
+    return {
+        'summary': engine.summary(),
+        'high_correlation_pairs': engine.high_correlation_pairs()
+    }
@@ -0,0 +1,408 @@
+"""
+Prediction Service Module for Real Madrid Soccer Analysis
+Contains a low-latency scorer for the trained position models and a local HTTP endpoint
+
+The Forecasting notebook reloads the data and refits its models before every
+forecast, and scoring goes through DataFrames and sklearn's input validation
+on each call. PredictionService loads a fitted model and its scaler once
+(from the TrainingOrchestrator cache) and scores NumPy rows through
+preallocated buffers:
+
+- Input rows are copied into a fixed float64 buffer and standardized in
+  place with the scaler's mean_/scale_ (no DataFrame, no per-call allocation
+  of the feature matrix).
+- Random forests, single trees and gradient boosting are scored tree by
+  tree on a float32 copy of the buffer, XGBoost with
+  Booster.inplace_predict, and a VotingRegressor as the mean of its
+  members' scores; other models go through model.predict on the buffer.
+- Every call's latency is recorded in a fixed-size ring, and stats() reports
+  p50/p99 per call and per row plus rows/s.
+
+serve() exposes one service per position over http.server (stdlib only):
+POST /predict/<position> with {"rows": [[...], ...]} or a list of
+{feature: value} objects, GET /stats and GET /health.
+"""
+
+import json
+import pickle
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, Mapping, Optional, Sequence, Union
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_MAX_BATCH = 1024
+LATENCY_WINDOW = 10000
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+
+# Estimators averaged tree by tree (sklearn trees predict on float32 input)
+FOREST_MODEL_NAMES = {'RandomForestRegressor', 'ExtraTreesRegressor'}
+TREE_MODEL_NAMES = {'DecisionTreeRegressor', 'ExtraTreeRegressor'}
+
+PathLike = Union[str, Path]
+
+
+def _scorer(model):
+    """Fast scoring function of a fitted model: float64 C-contiguous rows -> predictions."""
+    name = type(model).__name__
+    if name in FOREST_MODEL_NAMES:
+        trees = [estimator.tree_ for estimator in model.estimators_]
+
+        def score(X):
+            X32 = X.astype(np.float32)
+            total = np.zeros(len(X))
+            for tree in trees:
+                total += tree.predict(X32)[:, 0]
+            return total / len(trees)
+        return score
+    if name in TREE_MODEL_NAMES:
+        tree = model.tree_
+        return lambda X: tree.predict(X.astype(np.float32))[:, 0]
+    if name == 'GradientBoostingRegressor' and type(model.init_).__name__ == 'DummyRegressor':
+        trees = [estimator.tree_ for estimator in model.estimators_[:, 0]]
+        baseline = float(np.ravel(model.init_.constant_)[0])
+        rate = model.learning_rate
+
+        def score(X):
+            X32 = X.astype(np.float32)
+            total = np.full(len(X), baseline)
+            for tree in trees:
+                total += rate * tree.predict(X32)[:, 0]
+            return total
+        return score
+    if name == 'XGBRegressor':
+        booster = model.get_booster()
+        return lambda X: np.asarray(booster.inplace_predict(X), dtype=np.float64)
+    if name == 'VotingRegressor' and getattr(model, 'weights', None) is None:
+        members = [_scorer(member) for member in model.estimators_]
+        return lambda X: sum(member(X) for member in members) / len(members)
+    return lambda X: np.asarray(model.predict(X), dtype=np.float64).ravel()
+
+
+class PredictionService:
+    """Class for scoring player rows with a persisted position model"""
+
+    def __init__(self, model, features: Sequence[str], scaler=None,
+                 position: Optional[str] = None,
+                 max_batch: int = DEFAULT_MAX_BATCH,
+                 latency_window: int = LATENCY_WINDOW):
+        """
+        Args:
+            model: Fitted model
+            features: Feature names in model input order
+            scaler: Fitted StandardScaler applied before the model (or None)
+            position: Position the model was trained for
+            max_batch: Rows scored per internal chunk (size of the buffers)
+            latency_window: Number of recent calls kept for the latency stats
+        """
+        self.model = model
+        self.features = [str(feature) for feature in features]
+        self.position = position
+        self.max_batch = int(max_batch)
+        self._feature_index = {feature: i for i, feature in enumerate(self.features)}
+        self._score = _scorer(model)
+        self._lock = threading.Lock()
+
+        if scaler is not None:
+            self._mean = np.asarray(scaler.mean_, dtype=np.float64)
+            self._scale = np.asarray(scaler.scale_, dtype=np.float64)
+        else:
+            self._mean = self._scale = None
+        self._buffer = np.zeros((self.max_batch, len(self.features)), dtype=np.float64)
+        self._output = np.zeros(self.max_batch, dtype=np.float64)
+
+        self._seconds = np.zeros(latency_window, dtype=np.float64)
+        self._rows = np.zeros(latency_window, dtype=np.int64)
+        self._calls = 0
+
+    @classmethod
+    def from_orchestrator(cls, key: str, features: Sequence[str], orchestrator=None,
+                          **kwargs) -> 'PredictionService':
+        """
+        Service of a model cached by a TrainingOrchestrator
+
+        Args:
+            key: Job key (the 'key' column of the training results)
+            features: Feature names the model was trained on
+            orchestrator: TrainingOrchestrator (default: one on the default cache)
+
+        Returns:
+            PredictionService
+        """
+        if orchestrator is None:
+            from model_training import TrainingOrchestrator
+            orchestrator = TrainingOrchestrator(verbose=False)
+        stored = orchestrator.load_model(key)
+        position = stored.get('result', {}).get('position')
+        return cls(stored['model'], features, stored.get('scaler'), position=position, **kwargs)
+
+    @classmethod
+    def from_file(cls, path: PathLike, features: Sequence[str], **kwargs) -> 'PredictionService':
+        """Service of a pickled {'model', 'scaler'} dictionary (the orchestrator's model files)."""
+        with open(path, 'rb') as handle:
+            stored = pickle.load(handle)
+        position = stored.get('result', {}).get('position')
+        return cls(stored['model'], features, stored.get('scaler'), position=position, **kwargs)
+
+    # ------------------------------------------------------------------
+    # Scoring
+    # ------------------------------------------------------------------
+    def rows_from_records(self, records: Sequence[Mapping[str, float]]) -> np.ndarray:
+        """Feature matrix of {feature: value} records (missing features are 0, as in training)."""
+        X = np.zeros((len(records), len(self.features)), dtype=np.float64)
+        for i, record in enumerate(records):
+            for feature, value in record.items():
+                column = self._feature_index.get(feature)
+                if column is not None and value is not None:
+                    X[i, column] = value
+        return X
+
+    def predict(self, X) -> np.ndarray:
+        """
+        Predict scores of one row or a batch of rows
+
+        Args:
+            X: 1-D array (one row) or 2-D array of shape (n_rows, n_features),
+               columns in self.features order; NaN is scored as 0
+
+        Returns:
+            1-D array of predictions
+        """
+        X = np.asarray(X, dtype=np.float64)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        if X.ndim != 2 or X.shape[1] != len(self.features):
+            raise ValueError(f"Expected rows with {len(self.features)} features, got shape {X.shape}")
+
+        start = time.perf_counter()
+        result = np.empty(len(X), dtype=np.float64)
+        with self._lock:
+            for offset in range(0, len(X), self.max_batch):
+                n = min(self.max_batch, len(X) - offset)
+                buffer = self._buffer[:n]
+                np.copyto(buffer, X[offset:offset + n])
+                np.nan_to_num(buffer, copy=False, nan=0.0)
+                if self._mean is not None:
+                    buffer -= self._mean
+                    buffer /= self._scale
+                self._output[:n] = self._score(buffer)
+                result[offset:offset + n] = self._output[:n]
+            self._record(time.perf_counter() - start, len(X))
+        return result
+
+    def predict_one(self, row) -> float:
+        """Prediction of a single row (array or {feature: value} mapping)."""
+        if isinstance(row, Mapping):
+            row = self.rows_from_records([row])
+        return float(self.predict(row)[0])
+
+    # ------------------------------------------------------------------
+    # Latency statistics
+    # ------------------------------------------------------------------
+    def _record(self, seconds: float, rows: int) -> None:
+        slot = self._calls % len(self._seconds)
+        self._seconds[slot] = seconds
+        self._rows[slot] = rows
+        self._calls += 1
+
+    def reset_stats(self) -> None:
+        with self._lock:
+            self._calls = 0
+
+    def stats(self) -> Dict[str, float]:
+        """
+        Latency of the recent calls
+
+        Returns:
+            Dictionary with calls, rows, p50_ms/p99_ms per call,
+            p50_row_ms/p99_row_ms per row and rows_per_s
+        """
+        n = min(self._calls, len(self._seconds))
+        if n == 0:
+            return {'calls': 0, 'rows': 0, 'p50_ms': np.nan, 'p99_ms': np.nan,
+                    'p50_row_ms': np.nan, 'p99_row_ms': np.nan, 'rows_per_s': np.nan}
+        seconds, rows = self._seconds[:n], self._rows[:n]
+        per_row = seconds / np.maximum(rows, 1)
+        return {
+            'calls': int(self._calls),
+            'rows': int(rows.sum()),
+            'p50_ms': float(np.percentile(seconds, 50) * 1000),
+            'p99_ms': float(np.percentile(seconds, 99) * 1000),
+            'p50_row_ms': float(np.percentile(per_row, 50) * 1000),
+            'p99_row_ms': float(np.percentile(per_row, 99) * 1000),
+            'rows_per_s': float(rows.sum() / seconds.sum()) if seconds.sum() > 0 else np.nan,
+        }
+
+
+def load_services(results: pd.DataFrame, datasets: Dict[str, Dict], orchestrator=None,
+                  model: Optional[str] = None, **kwargs) -> Dict[str, PredictionService]:
+    """
+    One service per position from training results
+
+    Args:
+        results: TrainingOrchestrator.run() or best() results
+        datasets: Output of build_position_datasets() (feature names per position)
+        orchestrator: TrainingOrchestrator holding the models (default cache)
+        model: Only use this model name (default: best row per position)
+
+    Returns:
+        Dictionary of position -> PredictionService
+    """
+    if orchestrator is None:
+        from model_training import TrainingOrchestrator
+        orchestrator = TrainingOrchestrator(verbose=False)
+    ok = results[results['error'].isna()] if 'error' in results.columns else results
+    if model is not None:
+        ok = ok[ok['model'] == model]
+    best = orchestrator.best(ok)
+
+    services = {}
+    for row in best.itertuples(index=False):
+        if row.position in services or row.position not in datasets:
+            continue
+        features = datasets[row.position]['metrics']
+        services[row.position] = PredictionService.from_orchestrator(row.key, features, orchestrator, **kwargs)
+    return services
+
+
+def benchmark_service(service: PredictionService, X: np.ndarray,
+                      batch_sizes: Sequence[int] = (1, 64),
+                      repeats: int = 200, verbose: bool = True) -> pd.DataFrame:
+    """
+    Latency and throughput of a service at several batch sizes
+
+    Args:
+        service: PredictionService
+        X: Rows to score (cycled through)
+        batch_sizes: Rows per call
+        repeats: Calls per batch size
+
+    Returns:
+        DataFrame with one row of stats() per batch size
+    """
+    X = np.asarray(X, dtype=np.float64)
+    rows = []
+    for batch in batch_sizes:
+        service.reset_stats()
+        for i in range(repeats):
+            offset = (i * batch) % max(1, len(X) - batch + 1)
+            service.predict(X[offset:offset + batch])
+        rows.append({'batch_size': batch, **service.stats()})
+    report = pd.DataFrame(rows)
+    service.reset_stats()
+    if verbose:
+        name = type(service.model).__name__
+        for row in rows:
+            print(f"✅ {service.position or name} ({name}) batch {row['batch_size']}: "
+                  f"p50 {row['p50_ms']:.3f} ms, p99 {row['p99_ms']:.3f} ms, "
+                  f"{row['p50_row_ms']:.4f} ms/row, {row['rows_per_s']:,.0f} rows/s")
+    return report
+
+
+# ----------------------------------------------------------------------
+# Local HTTP endpoint
+# ----------------------------------------------------------------------
+def _handler(services: Dict[str, PredictionService]):
+    class PredictionHandler(BaseHTTPRequestHandler):
+        def _send(self, status: int, payload: Dict) -> None:
+            body = json.dumps(payload).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path == '/health':
+                self._send(200, {'status': 'ok', 'positions': sorted(services)})
+            elif self.path == '/stats':
+                self._send(200, {position: service.stats() for position, service in services.items()})
+            else:
+                self._send(404, {'error': f"Unknown path {self.path}"})
+
+        def do_POST(self):
+            parts = self.path.strip('/').split('/')
+            if len(parts) != 2 or parts[0] != 'predict' or parts[1] not in services:
+                self._send(404, {'error': f"Unknown path {self.path} (expected /predict/<position>)"})
+                return
+            service = services[parts[1]]
+            try:
+                length = int(self.headers.get('Content-Length', 0))
+                rows = json.loads(self.rfile.read(length) or b'{}').get('rows', [])
+                if rows and isinstance(rows[0], Mapping):
+                    X = service.rows_from_records(rows)
+                else:
+                    X = np.asarray(rows, dtype=np.float64).reshape(-1, len(service.features))
+                predictions = service.predict(X)
+            except (ValueError, TypeError, AttributeError) as e:
+                self._send(400, {'error': f"{type(e).__name__}: {e}"})
+                return
+            self._send(200, {'position': parts[1], 'predictions': predictions.tolist()})
+
+        def log_message(self, format, *args):
+            pass
+
+    return PredictionHandler
+
+
+def serve(services: Dict[str, PredictionService], host: str = DEFAULT_HOST, port: int = DEFAULT_PORT,
+          block: bool = True) -> ThreadingHTTPServer:
+    """
+    Serve predictions over HTTP on a local port
+
+    Args:
+        services: Dictionary of position -> PredictionService
+        host: Interface to bind (default: localhost only)
+        port: Port (0: any free port)
+        block: Serve until interrupted; otherwise serve from a daemon thread
+
+    Returns:
+        The server (server.server_address holds the bound port; call shutdown() to stop)
+    """
+    server = ThreadingHTTPServer((host, port), _handler(services))
+    print(f"✅ Prediction endpoint on http://{server.server_address[0]}:{server.server_address[1]} "
+          f"for {', '.join(sorted(services))}")
+    if block:
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+    else:
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def quick_serve(models: Sequence[str] = ('rf',), port: int = DEFAULT_PORT,
+                block: bool = True) -> ThreadingHTTPServer:
+    """
+    Quick function to train (or load cached) position models and serve them
+
+    Args:
+        models: Model names to train; the best one per position is served
+        port: HTTP port
+        block: Serve until interrupted
+
+    Returns:
+        The HTTP server
+    """
+    from feature_store import load_features
+    from model_training import TrainingOrchestrator, build_position_datasets
+
+    datasets = build_position_datasets(load_features().frame(with_meta=True))
+    orchestrator = TrainingOrchestrator()
+    results = orchestrator.run(datasets, list(models))
+    services = load_services(results, datasets, orchestrator)
+    for position, service in services.items():
+        benchmark_service(service, datasets[position]['X_test'].to_numpy())
+    return serve(services, port=port, block=block)
+
+
+if __name__ == "__main__":
+    print("Testing Prediction Service Module...")
+    quick_serve()
@@ -0,0 +1,361 @@
+"""
+Report Renderer Module for Real Madrid Soccer Analysis
+Contains a headless, parallel figure pipeline for the analysis reports
+
+Analysis steps describe each figure as data plus drawing options instead of
+drawing it inline. The renderer draws the queued figures on the Agg backend
+in a process pool and records a hash of every figure's input data next to
+the images, so unchanged figures are skipped on the next run. A serial run
+draws on standalone Agg figures and leaves the caller's pyplot backend as
+is. With show=True
+figures are drawn in-process and displayed, as in interactive sessions.
+"""
+
+import hashlib
+import json
+import os
+import pickle
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+from tracing import traced
+
+RENDERER_VERSION = 1
+MANIFEST_NAME = ".figure_hashes.json"
+DEFAULT_DPI = 300
+
+PathLike = Union[str, Path]
+
+
+def _new_figure(options: Dict, figsize):
+    """
+    Figure for a drawer: a pyplot figure when it is going to be shown, otherwise
+    a standalone Agg figure, so saving never touches the session's pyplot backend.
+    """
+    size = options.get('figsize', figsize)
+    if options.get('_show'):
+        import matplotlib.pyplot as plt
+        return plt.figure(figsize=size)
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+
+    fig = Figure(figsize=size)
+    FigureCanvasAgg(fig)
+    return fig
+
+
+def _setup_axes(ax, options: Dict) -> None:
+    from matplotlib.artist import setp
+
+    if 'title' in options:
+        ax.set_title(options['title'])
+    if 'xlabel' in options:
+        ax.set_xlabel(options['xlabel'])
+    if 'ylabel' in options:
+        ax.set_ylabel(options['ylabel'])
+    if 'rotation' in options:
+        setp(ax.get_xticklabels(), rotation=options['rotation'])
+    if options.get('grid'):
+        ax.grid(True, alpha=0.3)
+
+
+def draw_bar(data: pd.Series, options: Dict):
+    """Bar chart of a Series (index on the x axis)."""
+    fig = _new_figure(options, (10, 6))
+    ax = fig.add_subplot()
+    data.plot(kind='bar', color=options.get('color'), ax=ax)
+    _setup_axes(ax, options)
+    if options.get('tight', True):
+        fig.tight_layout()
+    return fig
+
+
+def draw_hist(data: pd.Series, options: Dict):
+    """Histogram of a Series."""
+    fig = _new_figure(options, (10, 6))
+    ax = fig.add_subplot()
+    ax.hist(data, bins=options.get('bins', 50), alpha=options.get('alpha', 0.7), color=options.get('color'))
+    _setup_axes(ax, options)
+    if options.get('tight', False):
+        fig.tight_layout()
+    return fig
+
+
+def draw_boxplot(data: pd.DataFrame, options: Dict):
+    """Box plot of options['column'] grouped by options['by']."""
+    fig = _new_figure(options, (12, 6))
+    ax = fig.add_subplot()
+    data.boxplot(column=options['column'], by=options['by'], ax=ax)
+    fig.suptitle('')  # Remove default suptitle
+    _setup_axes(ax, options)
+    if options.get('tight', True):
+        fig.tight_layout()
+    return fig
+
+
+def draw_heatmap(data: pd.DataFrame, options: Dict):
+    """Annotated correlation heatmap."""
+    import seaborn as sns
+
+    fig = _new_figure(options, (10, 8))
+    ax = fig.add_subplot()
+    sns.heatmap(data, annot=options.get('annot', True), cmap=options.get('cmap', 'coolwarm'),
+                center=options.get('center', 0), square=True, linewidths=0.5, ax=ax)
+    _setup_axes(ax, options)
+    if options.get('tight', True):
+        fig.tight_layout()
+    return fig
+
+
+def draw_shap_summary(data: Dict, options: Dict):
+    """SHAP summary plot of {'values', 'data', 'feature_names'} (plot_type 'dot' or 'bar')."""
+    import matplotlib.pyplot as plt
+    import shap
+
+    # shap draws on pyplot's current figure; off interactive mode so no window opens while saving
+    with plt.ioff():
+        fig = plt.figure(figsize=options.get('figsize', (12, 8)))
+        shap.summary_plot(data['values'], data['data'], feature_names=data['feature_names'],
+                          plot_type=options.get('plot_type', 'dot'), show=False)
+    if 'title' in options:
+        fig.axes[0].set_title(options['title'])
+    if options.get('tight', True):
+        fig.tight_layout()
+    return fig
+
+
+# Figure kinds available to ReportRenderer.add()
+FIGURE_KINDS: Dict[str, Callable] = {
+    'bar': draw_bar,
+    'hist': draw_hist,
+    'boxplot': draw_boxplot,
+    'heatmap': draw_heatmap,
+    'shap_summary': draw_shap_summary,
+}
+
+
+def data_hash(data: Any) -> str:
+    """
+    Stable SHA-1 of a figure's input data
+
+    pandas objects are hashed by values, index and labels; anything else is
+    hashed through pickle.
+    """
+    digest = hashlib.sha1()
+    if isinstance(data, (pd.Series, pd.DataFrame)):
+        digest.update(pd.util.hash_pandas_object(data, index=True).values.tobytes())
+        labels = list(data.columns) if isinstance(data, pd.DataFrame) else [data.name]
+        digest.update(repr((type(data).__name__, labels, list(data.index.names))).encode())
+    elif isinstance(data, np.ndarray):
+        digest.update(repr((data.dtype.str, data.shape)).encode())
+        digest.update(np.ascontiguousarray(data).tobytes())
+    else:
+        digest.update(pickle.dumps(data, protocol=4))
+    return digest.hexdigest()
+
+
+def _init_worker() -> None:
+    """Pool initializer: workers draw off-screen with Agg."""
+    import matplotlib
+    matplotlib.use('Agg', force=True)
+
+
+def _draw_and_save(job: Dict) -> Dict:
+    import matplotlib.pyplot as plt
+
+    start = time.perf_counter()
+    try:
+        options = dict(job['options'], _show=True) if job.get('show') else job['options']
+        fig = FIGURE_KINDS[job['kind']](job['data'], options)
+        fig.savefig(job['path'], dpi=job['dpi'], bbox_inches='tight')
+        if not job.get('show'):
+            plt.close(fig)  # only pyplot-managed figures (SHAP) are registered there
+    except Exception as e:
+        return {'name': job['name'], 'error': f"{type(e).__name__}: {e}", 'seconds': time.perf_counter() - start}
+    return {'name': job['name'], 'error': None, 'seconds': time.perf_counter() - start}
+
+
+class ReportRenderer:
+    """Class for rendering report figures in parallel, skipping unchanged ones"""
+
+    def __init__(self, output_dir: PathLike,
+                 workers: Optional[int] = None,
+                 show: bool = False,
+                 dpi: int = DEFAULT_DPI,
+                 verbose: bool = True):
+        """
+        Args:
+            output_dir: Folder for the PNG files and the hash manifest
+            workers: Worker processes (default: available cores)
+            show: Draw in-process and display each figure (interactive runs)
+            dpi: Resolution of the saved images
+            verbose: Print a line per figure and a summary
+        """
+        self.output_dir = Path(output_dir)
+        self.workers = workers
+        self.show = show
+        self.dpi = dpi
+        self.verbose = verbose
+        self.figures: Dict[str, Dict] = {}
+
+    @property
+    def manifest_path(self) -> Path:
+        return self.output_dir / MANIFEST_NAME
+
+    def add(self, name: str, kind: str, data: Any, **options) -> None:
+        """
+        Queue a figure
+
+        Args:
+            name: File name without extension (saved as <name>.png)
+            kind: One of FIGURE_KINDS
+            data: Figure input data (Series/DataFrame/array)
+            **options: Drawing options (title, xlabel, ylabel, figsize, color, ...)
+        """
+        if kind not in FIGURE_KINDS:
+            raise ValueError(f"Unknown figure kind '{kind}' (expected one of {sorted(FIGURE_KINDS)})")
+        self.figures[name] = {'kind': kind, 'data': data, 'options': options}
+
+    def figure_hash(self, name: str) -> str:
+        """Hash of a queued figure's data, options and output settings."""
+        figure = self.figures[name]
+        spec = json.dumps([RENDERER_VERSION, figure['kind'], repr(sorted(figure['options'].items())), self.dpi])
+        return hashlib.sha1((spec + data_hash(figure['data'])).encode()).hexdigest()
+
+    def _read_manifest(self) -> Dict[str, str]:
+        try:
+            with open(self.manifest_path, 'r', encoding='utf-8') as handle:
+                return json.load(handle)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def _write_manifest(self, manifest: Dict[str, str]) -> None:
+        tmp_path = self.manifest_path.with_suffix('.json.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as handle:
+            json.dump(manifest, handle, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.manifest_path)
+
+    def stale(self, force: bool = False, hashes: Optional[Dict[str, str]] = None) -> List[str]:
+        """Names of queued figures whose image is missing or whose data changed."""
+        manifest = {} if force else self._read_manifest()
+        hashes = hashes or {name: self.figure_hash(name) for name in self.figures}
+        return [
+            name for name in self.figures
+            if manifest.get(name) != hashes[name]
+            or not (self.output_dir / f"{name}.png").exists()
+        ]
+
+    def _default_workers(self, n_jobs: int) -> int:
+        workers = self.workers
+        if workers is None:
+            try:
+                workers = len(os.sched_getaffinity(0))
+            except AttributeError:
+                workers = os.cpu_count() or 1
+        return max(1, min(workers, n_jobs))
+
+    @traced(name='ReportRenderer.render', rows=lambda summary: len(summary['rendered']))
+    def render(self, force: bool = False) -> Dict:
+        """
+        Draw and save the queued figures
+
+        Args:
+            force: Redraw every figure, even if its data is unchanged
+
+        Returns:
+            Dictionary with rendered/skipped/failed names, worker count and timings
+        """
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        start = time.perf_counter()
+        manifest = self._read_manifest()
+        hashes = {name: self.figure_hash(name) for name in self.figures}
+        todo = self.stale(force, hashes)
+        skipped = [name for name in self.figures if name not in todo]
+
+        jobs = [{
+            'name': name, 'kind': self.figures[name]['kind'], 'data': self.figures[name]['data'],
+            'options': self.figures[name]['options'], 'path': str(self.output_dir / f"{name}.png"),
+            'dpi': self.dpi,
+        } for name in todo]
+
+        if self.show:
+            workers = 1
+            results = [self._draw_show(job) for job in jobs]
+            for name in skipped:
+                self._draw_show(None, name)
+        else:
+            workers = self._default_workers(len(jobs))
+            if workers == 1 or len(jobs) <= 1:
+                # Standalone Agg figures: the caller's backend (GUI, notebook inline) is left as is
+                results = [_draw_and_save(job) for job in jobs]
+            else:
+                with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+                    results = list(pool.map(_draw_and_save, jobs))
+
+        rendered, failed, seconds = [], {}, {}
+        for result in results:
+            seconds[result['name']] = result['seconds']
+            if result['error'] is None:
+                rendered.append(result['name'])
+                manifest[result['name']] = hashes[result['name']]
+            else:
+                failed[result['name']] = result['error']
+                manifest.pop(result['name'], None)
+        self._write_manifest(manifest)
+
+        summary = {
+            'rendered': rendered,
+            'skipped': skipped,
+            'failed': failed,
+            'workers': workers,
+            'elapsed': time.perf_counter() - start,
+            'figure_seconds': seconds,
+        }
+        if self.verbose:
+            for name in rendered:
+                print(f"✅ {name}.png ({seconds[name]:.2f}s)")
+            for name, error in failed.items():
+                print(f"❌ {name}.png: {error}")
+            print(f"Figures: {len(rendered)} rendered, {len(skipped)} unchanged, {len(failed)} failed "
+                  f"in {summary['elapsed']:.2f}s ({workers} worker(s)) -> {self.output_dir}")
+        return summary
+
+    def _draw_show(self, job: Optional[Dict], name: Optional[str] = None) -> Optional[Dict]:
+        import matplotlib.pyplot as plt
+
+        if job is not None:
+            result = _draw_and_save(dict(job, show=True))
+            if result['error'] is None:
+                plt.show()
+            return result
+        # Unchanged figure: display it without saving again
+        figure = self.figures[name]
+        FIGURE_KINDS[figure['kind']](figure['data'], dict(figure['options'], _show=True))
+        plt.show()
+        return None
+
+
+def render_figure(output_dir: PathLike, name: str, kind: str, data: Any,
+                  show: bool = True, **options) -> Dict:
+    """
+    Quick function to draw and save a single figure immediately
+
+    Args:
+        output_dir: Folder for the PNG file
+        name: File name without extension
+        kind: One of FIGURE_KINDS
+        data: Figure input data
+        show: Display the figure after saving it
+        **options: Drawing options
+
+    Returns:
+        Render summary
+    """
+    renderer = ReportRenderer(output_dir, workers=1, show=show, verbose=False)
+    renderer.add(name, kind, data, **options)
+    return renderer.render(force=True)
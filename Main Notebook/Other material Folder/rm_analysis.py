@@ -0,0 +1,356 @@
+"""
+Command Line Module for Real Madrid Soccer Analysis
+Contains the rm-analysis entry point with lazily imported pipeline stages
+
+    rm-analysis status                      cache, feature store, model and state files
+    rm-analysis summary                     data summary from cached aggregates
+    rm-analysis eda [EDA options]           01_EDA_Analysis.py in batch mode
+    rm-analysis score [--output CSV]        rebalanced scores of the combined match data
+    rm-analysis train [--models rf xgb]     position models (cached orchestrator)
+    rm-analysis forecast [--weeks 16]       rolling form dashboard per position
+    rm-analysis serve [--port 8765]         local prediction endpoint
+    rm-analysis benchmark [--scales 1 10]   stage benchmarks with JSON output
+    rm-analysis align IMAGES...             scripts/align_faces.py
+
+Only the standard library is imported at startup. status and summary read
+the cache metadata and EDA state JSON files directly, so they (and --help)
+start without loading pandas, NumPy or matplotlib; every other subcommand
+imports its libraries inside its handler. Figures are always drawn on the
+Agg backend and nothing prompts, so the CLI runs unattended from cron or the
+container. --trace FILE records stage timings for any subcommand.
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+# Same locations as data_cache (not imported here: it loads pandas)
+LIBRARY_FOLDER = Path(__file__).resolve().parent
+DATA_FOLDER = LIBRARY_FOLDER.parent / "Data Folder"
+CACHE_FOLDER = DATA_FOLDER / "DataCombined" / ".cache"
+EDA_SCRIPT = LIBRARY_FOLDER.parent / "Code Library Folder" / "01_EDA" / "notebooks" / "01_EDA_Analysis.py"
+ALIGN_SCRIPT = LIBRARY_FOLDER.parent.parent / "scripts" / "align_faces.py"
+PASSTHROUGH_COMMANDS = ('eda', 'align')
+
+
+def _load_script(path: Path, name: str):
+    import importlib.util
+
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def _read_json(path: Path) -> Optional[Dict]:
+    try:
+        with open(path, 'r', encoding='utf-8') as handle:
+            return json.load(handle)
+    except (OSError, ValueError):
+        return None
+
+
+def _size_mb(paths: Sequence[Path]) -> float:
+    return sum(path.stat().st_size for path in paths if path.is_file()) / 1024**2
+
+
+# ----------------------------------------------------------------------
+# Lightweight commands (standard library only)
+# ----------------------------------------------------------------------
+def cache_status(cache_folder: Path = CACHE_FOLDER) -> Dict:
+    """
+    State of the cache folder from its metadata files
+
+    Returns:
+        Dictionary with datasets (shape, build time, fresh flag), feature
+        matrices, fitted models, benchmark reports and the EDA state
+    """
+    status = {'cache_folder': str(cache_folder), 'datasets': [], 'features': [], 'models': 0,
+              'benchmarks': 0, 'eda_state': None}
+    if not cache_folder.exists():
+        return status
+
+    for meta_path in sorted(cache_folder.glob('*.json')):
+        meta = _read_json(meta_path)
+        if not meta or 'source' not in meta:
+            continue
+        source = Path(meta.get('source_path', ''))
+        if not source.is_absolute():
+            # Recorded relative to the loading script's folder; datasets live in DataCombined
+            source = DATA_FOLDER / "DataCombined" / source.name
+        try:
+            stat = source.stat()
+            fresh = stat.st_size == meta['source']['size'] and stat.st_mtime_ns == meta['source']['mtime_ns']
+        except OSError:
+            fresh = None
+        status['datasets'].append({'name': source.name, 'shape': meta.get('shape'),
+                                   'built_at': meta.get('built_at'), 'fresh': fresh})
+
+    for meta_path in sorted((cache_folder / 'features').glob('features.*.json')):
+        meta = _read_json(meta_path) or {}
+        status['features'].append({'key': meta_path.stem.split('.', 1)[1], 'shape': meta.get('shape'),
+                                   'built_at': meta.get('built_at')})
+
+    status['models'] = len(list((cache_folder / 'models').glob('*/*.pkl')))
+    status['benchmarks'] = len(list((cache_folder / 'benchmarks').glob('*.json')))
+    state = _read_json(cache_folder / 'eda_state.json')
+    if state:
+        status['eda_state'] = {'seasons': len(state.get('seasons', {})), 'updated_at': state.get('updated_at')}
+    status['size_mb'] = round(_size_mb(list(cache_folder.rglob('*'))), 1)
+    return status
+
+
+def cmd_status(args) -> int:
+    status = cache_status(Path(args.cache_folder))
+    if args.json:
+        print(json.dumps(status, indent=2))
+        return 0
+    print(f"Cache folder: {status['cache_folder']} ({status.get('size_mb', 0)} MB)")
+    if not status['datasets']:
+        print("⚠️ No cached datasets (they are built on first load)")
+    for dataset in status['datasets']:
+        icon = '✅' if dataset['fresh'] else '⚠️'
+        note = '' if dataset['fresh'] else (' (source changed)' if dataset['fresh'] is False else ' (source missing)')
+        print(f"{icon} {dataset['name']}: {dataset['shape']} built {dataset['built_at']}{note}")
+    for features in status['features']:
+        print(f"✅ Feature matrix {features['key']}: {features['shape']} built {features['built_at']}")
+    print(f"Models cached: {status['models']}, benchmark reports: {status['benchmarks']}")
+    state = status['eda_state']
+    print(f"EDA state: {state['seasons']} season(s), updated {state['updated_at']}" if state
+          else "EDA state: none (run `rm-analysis eda --incremental`)")
+    return 0
+
+
+def cached_summary(cache_folder: Path = CACHE_FOLDER) -> Optional[Dict]:
+    """
+    Data summary merged from the incremental EDA state (no data loading)
+
+    Returns:
+        Dictionary with total rows, rows per season, position and year counts,
+        or None when there is no state file
+    """
+    state = _read_json(cache_folder / 'eda_state.json')
+    if not state:
+        return None
+    rows, positions, years = {}, {}, {}
+    for season, info in sorted(state.get('seasons', {}).items()):
+        rows[season] = info.get('rows', 0)
+        for key, count in info.get('position_counts', {}).items():
+            positions[key] = positions.get(key, 0) + count
+        for key, count in info.get('year_counts', {}).items():
+            years[key] = years.get(key, 0) + count
+    return {'rows': sum(rows.values()), 'seasons': rows,
+            'positions': dict(sorted(positions.items(), key=lambda item: -item[1])),
+            'years': dict(sorted(years.items())), 'updated_at': state.get('updated_at')}
+
+
+def cmd_summary(args) -> int:
+    summary = cached_summary(Path(args.cache_folder))
+    if summary is None:
+        print("⚠️ No cached aggregates yet; run `rm-analysis eda --incremental` first")
+        return 1
+    if args.json:
+        print(json.dumps(summary, indent=2))
+        return 0
+    print(f"Rows: {summary['rows']:,} (aggregates updated {summary['updated_at']})")
+    print("Rows per season:")
+    for season, count in summary['seasons'].items():
+        print(f"  {season}: {count:,}")
+    print(f"Top positions ({args.top}):")
+    for position, count in list(summary['positions'].items())[:args.top]:
+        print(f"  {position}: {count:,}")
+    return 0
+
+
+# ----------------------------------------------------------------------
+# Pipeline commands (heavy imports inside each handler)
+# ----------------------------------------------------------------------
+def cmd_eda(args) -> int:
+    module = _load_script(EDA_SCRIPT, 'eda_analysis')
+    eda_args = list(args.passthrough)
+    if '--no-show' not in eda_args and not args.show:
+        eda_args.insert(0, '--no-show')
+    # The EDA script resolves its data and output paths from its own folder
+    cwd = os.getcwd()
+    os.chdir(EDA_SCRIPT.parent)
+    try:
+        module.main(eda_args)
+    finally:
+        os.chdir(cwd)
+    return 0
+
+
+def cmd_score(args) -> int:
+    from data_cache import load_match_data
+    from scoring import calculate_rebalanced_scores
+
+    scored = calculate_rebalanced_scores(load_match_data(verbose=False))
+    summary = scored.groupby('Position_Group', observed=True)['Rebalanced_Score'].agg(['count', 'mean', 'max'])
+    print(summary.round(2).to_string())
+    top = (scored.groupby('Player', observed=True)['Rebalanced_Score'].mean()
+           .sort_values(ascending=False).head(args.top))
+    print(f"\nTop {args.top} players by mean Rebalanced_Score:")
+    print(top.round(2).to_string())
+    if args.output:
+        scored.to_csv(args.output, index=False)
+        print(f"✅ Scores written to {args.output}")
+    return 0
+
+
+def cmd_train(args) -> int:
+    from model_training import quick_train
+
+    best = quick_train(models=args.models, cpu_budget=args.cpus)
+    print(best[['position', 'model', 'cv_r2', 'test_r2', 'test_mae']].round(3).to_string(index=False))
+    return 0 if len(best) else 1
+
+
+def cmd_forecast(args) -> int:
+    from data_cache import load_rebalanced_scores
+    from form_engine import FormEngine
+
+    engine = FormEngine(load_rebalanced_scores(verbose=False))
+    dashboard = engine.dashboard(weeks=args.weeks, top=args.top)
+    for position, weekly in dashboard.items():
+        latest = weekly.groupby(engine.player_keys, observed=True, sort=False)['CumulativeScore'].last()
+        print(f"\n{position} (last {args.weeks} weeks)")
+        print(latest.sort_values(ascending=False).round(2).to_string() if len(latest) else "  no eligible players")
+    if args.output:
+        import pandas as pd
+        frames = [weekly.assign(Position_Group=position) for position, weekly in dashboard.items()]
+        pd.concat(frames, ignore_index=True).to_csv(args.output, index=False)
+        print(f"✅ Dashboard written to {args.output}")
+    return 0
+
+
+def cmd_serve(args) -> int:
+    from prediction_service import quick_serve
+
+    quick_serve(models=args.models, port=args.port)
+    return 0
+
+
+def cmd_benchmark(args) -> int:
+    from benchmarks import compare_benchmarks, latest_benchmarks, run_benchmarks
+
+    previous = latest_benchmarks(count=1)
+    report = run_benchmarks(args.scales, args.stages, repeats=args.repeats)
+    if previous:
+        comparison = compare_benchmarks(previous[0], report)
+        return 1 if args.fail_on_regression and (comparison['status'] == 'REGRESSION').any() else 0
+    return 0
+
+
+def cmd_align(args) -> int:
+    module = _load_script(ALIGN_SCRIPT, 'align_faces')
+    try:
+        module.main(['align_faces.py'] + list(args.passthrough))
+    except SystemExit as exit_:
+        return int(exit_.code or 0)
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """Argument parser of the rm-analysis command."""
+    parser = argparse.ArgumentParser(prog='rm-analysis', description="Real Madrid Soccer Analysis pipeline")
+    parser.add_argument('--trace', default=None,
+                        help="Record stage timings to this file (*.jsonl, or *.json for Chrome trace format)")
+    parser.add_argument('--profile', action='store_true', help="Dump a cProfile of the slowest stage")
+    commands = parser.add_subparsers(dest='command', metavar='COMMAND')
+    commands.required = True
+
+    status = commands.add_parser('status', help="Cache, feature store, model and state files")
+    status.add_argument('--cache-folder', default=str(CACHE_FOLDER))
+    status.add_argument('--json', action='store_true', help="Print JSON")
+    status.set_defaults(handler=cmd_status)
+
+    summary = commands.add_parser('summary', help="Data summary from the cached EDA aggregates")
+    summary.add_argument('--cache-folder', default=str(CACHE_FOLDER))
+    summary.add_argument('--top', type=int, default=10, help="Positions listed")
+    summary.add_argument('--json', action='store_true', help="Print JSON")
+    summary.set_defaults(handler=cmd_summary)
+
+    eda = commands.add_parser('eda', help="Exploratory analysis (01_EDA_Analysis.py, headless)")
+    eda.add_argument('--show', action='store_true', help="Display figures instead of batch mode")
+    eda.set_defaults(handler=cmd_eda)
+
+    score = commands.add_parser('score', help="Rebalanced scores of the combined match data")
+    score.add_argument('--output', default=None, help="Write the scored rows to this CSV")
+    score.add_argument('--top', type=int, default=10, help="Players listed")
+    score.set_defaults(handler=cmd_score)
+
+    train = commands.add_parser('train', help="Train the position models")
+    train.add_argument('--models', nargs='+', default=['rf', 'xgb', 'mlp', 'voting'])
+    train.add_argument('--cpus', type=int, default=None, help="CPU budget (default: available cores)")
+    train.set_defaults(handler=cmd_train)
+
+    forecast = commands.add_parser('forecast', help="Rolling form dashboard per position")
+    forecast.add_argument('--weeks', type=int, default=16)
+    forecast.add_argument('--top', type=int, default=8, help="Players per position")
+    forecast.add_argument('--output', default=None, help="Write the weekly dashboard to this CSV")
+    forecast.set_defaults(handler=cmd_forecast)
+
+    serve = commands.add_parser('serve', help="Local HTTP prediction endpoint")
+    serve.add_argument('--models', nargs='+', default=['rf'])
+    serve.add_argument('--port', type=int, default=8765)
+    serve.set_defaults(handler=cmd_serve)
+
+    benchmark = commands.add_parser('benchmark', help="Stage benchmarks on synthetic data")
+    benchmark.add_argument('--scales', nargs='+', type=float, default=[1])
+    benchmark.add_argument('--stages', nargs='+', default=None)
+    benchmark.add_argument('--repeats', type=int, default=1)
+    benchmark.add_argument('--fail-on-regression', action='store_true',
+                           help="Exit with 1 when a stage is slower than the previous report")
+    benchmark.set_defaults(handler=cmd_benchmark)
+
+    align = commands.add_parser('align', help="Align headshots (scripts/align_faces.py)")
+    align.set_defaults(handler=cmd_align)
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """
+    Run one rm-analysis subcommand
+
+    Args:
+        argv: Command line arguments (default: sys.argv[1:])
+
+    Returns:
+        Exit code
+    """
+    parser = build_parser()
+    # eda and align forward their remaining options to the wrapped scripts
+    args, passthrough = parser.parse_known_args(argv)
+    args.passthrough = passthrough
+    if passthrough and args.command not in PASSTHROUGH_COMMANDS:
+        parser.error(f"unrecognized arguments: {' '.join(passthrough)}")
+    os.environ.setdefault('MPLBACKEND', 'Agg')
+    if str(LIBRARY_FOLDER) not in sys.path:
+        sys.path.insert(0, str(LIBRARY_FOLDER))
+
+    tracer = None
+    if args.trace or args.profile:
+        from tracing import enable_tracing
+        tracer = enable_tracing(args.trace, profile=args.profile)
+    start = time.perf_counter()
+    try:
+        if tracer is not None:
+            with tracer.stage(f"rm-analysis {args.command}"):
+                return args.handler(args)
+        return args.handler(args)
+    except KeyboardInterrupt:
+        return 130
+    finally:
+        if tracer is not None:
+            from tracing import disable_tracing
+            disable_tracing()
+        elif args.command not in ('status', 'summary'):
+            print(f"⏱️ rm-analysis {args.command}: {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
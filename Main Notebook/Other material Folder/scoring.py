@@ -0,0 +1,367 @@
+"""
+Scoring Module for Real Madrid Soccer Analysis
+Contains the config-driven engine behind `Rebalanced_Score`
+
+The per-position weights of `calculate_rebalanced_scores_fixed()` (02_Feature
+Engineering) are described declaratively in SCORING_CONFIG. The config is
+compiled against the columns of a dataset into dense weight tables, and all
+rows are scored in one vectorized pass per position group. `score_rows()`
+scores rows one at a time as they arrive (e.g. from the FBref ingestion).
+
+Each term contributes clip(value * weight + offset, lower, upper), where value
+is the raw column or its per-90 rate (column / max(Min, 10) * 90). Missing
+values propagate to the score unless the term has a `fill` value, exactly like
+the notebook's pandas arithmetic.
+"""
+
+import json
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, Mapping, Optional, Sequence, Union
+
+import numpy as np
+import pandas as pd
+
+MINUTES_CANDIDATES = ['Min', 'Minutes']
+MIN_ADJ_FLOOR = 10.0
+
+# Position_Group labels in the order they are tested by categorize_position
+POSITION_GROUP_RULES = [
+    ('Goalkeeper', ['GK']),
+    ('Forward', ['FW', 'CF', 'ST', 'LW', 'RW']),
+    ('Midfield', ['MF', 'CM', 'DM', 'AM', 'LM', 'RM']),
+    ('Defense', ['DF', 'CB', 'LB', 'RB', 'WB', 'SW']),
+]
+DEFAULT_GROUP = 'Midfield'
+
+
+def _minutes_bonus(upper: float) -> Dict:
+    return {'columns': MINUTES_CANDIDATES, 'rate': 'raw', 'weight': 0.1 / 90.0, 'upper': upper}
+
+
+# Declarative version of calculate_rebalanced_scores_fixed()
+SCORING_CONFIG = {
+    'Goalkeeper': {
+        'base': 15.0,
+        'floor': 5.0,
+        'terms': [
+            # Pass completion replaces the base: Total Cmp% / 100 * 20
+            {'columns': ['Total Cmp%'], 'rate': 'raw', 'weight': 0.2, 'fill': 80.0, 'replaces_base': True},
+            # Error penalty: -min(Err * 2.5, 5)
+            {'columns': ['Err'], 'rate': 'raw', 'weight': -2.5, 'fill': 0.0, 'lower': -5.0},
+        ]
+    },
+    'Forward': {
+        'terms': [
+            {'columns': [' Gls', 'Gls'], 'rate': 'per90', 'weight': 10.0, 'upper': 10.0},
+            {'columns': [' Ast', 'Ast'], 'rate': 'per90', 'weight': 8.0, 'upper': 8.0},
+            {'columns': [' Sh', 'Sh'], 'rate': 'per90', 'weight': 0.5, 'upper': 5.0},
+            {'columns': [' SoT', 'SoT'], 'rate': 'per90', 'weight': 1.0, 'upper': 6.0},
+            {'columns': ['Expected xG', 'xG'], 'rate': 'per90', 'weight': 5.0, 'upper': 5.0},
+            _minutes_bonus(3.0),
+        ]
+    },
+    'Midfield': {
+        'terms': [
+            {'columns': [' Ast', 'Ast'], 'rate': 'per90', 'weight': 6.0, 'upper': 6.0},
+            {'columns': ['KP'], 'rate': 'per90', 'weight': 1.5, 'upper': 5.0},
+            {'columns': ['Passes PrgP'], 'rate': 'per90', 'weight': 0.3, 'upper': 4.0},
+            {'columns': [' Tkl', 'Tkl'], 'rate': 'per90', 'weight': 1.0, 'upper': 3.0},
+            # Pass accuracy: (Cmp% - 80) / 20 * 4, clipped to [0, 4]
+            {'columns': ['Passes Cmp%'], 'rate': 'raw', 'weight': 0.2, 'offset': -16.0,
+             'fill': 85.0, 'lower': 0.0, 'upper': 4.0},
+            _minutes_bonus(4.0),
+        ]
+    },
+    'Defense': {
+        'terms': [
+            {'columns': ['Tackles TklW'], 'rate': 'per90', 'weight': 2.0, 'upper': 6.0,
+             'fallback': {'columns': [' Tkl', 'Tkl'], 'rate': 'per90', 'weight': 1.5, 'upper': 6.0}},
+            {'columns': ['Int', ' Int'], 'rate': 'per90', 'weight': 2.0, 'upper': 6.0},
+            {'columns': ['Blocks', ' Blocks'], 'rate': 'per90', 'weight': 3.0, 'upper': 6.0},
+            {'columns': ['Clr'], 'rate': 'per90', 'weight': 0.5, 'upper': 4.0},
+            _minutes_bonus(4.0),
+        ]
+    }
+}
+
+PathLike = Union[str, Path]
+
+
+def load_scoring_config(path: PathLike) -> Dict:
+    """
+    Load a scoring config from a JSON file
+
+    Args:
+        path: JSON file with the same structure as SCORING_CONFIG
+
+    Returns:
+        Config dictionary
+    """
+    with open(path, 'r', encoding='utf-8') as handle:
+        return json.load(handle)
+
+
+@lru_cache(maxsize=1024)
+def position_group(pos: str) -> str:
+    """Position_Group label of one `Pos` string (rules of categorize_position())."""
+    s = str(pos).upper()
+    for group, tokens in POSITION_GROUP_RULES:
+        if any(token in s for token in tokens):
+            return group
+    return DEFAULT_GROUP
+
+
+def categorize_positions(pos: pd.Series) -> pd.Series:
+    """
+    Map `Pos` strings to Position_Group labels
+
+    Same rules as categorize_position() in the feature engineering notebook,
+    evaluated once per distinct string.
+
+    Args:
+        pos: Series of position strings
+
+    Returns:
+        Series of Position_Group labels (None where Pos is missing)
+    """
+    codes, uniques = pd.factorize(pos)
+    lookup = np.array([position_group(value) for value in uniques] + [None], dtype=object)
+    return pd.Series(lookup[codes], index=pos.index, name='Position_Group')
+
+
+def _pick_col(columns, candidates: Sequence[str]) -> Optional[str]:
+    for candidate in candidates:
+        if candidate in columns:
+            return candidate
+    return None
+
+
+class RebalancedScorer:
+    """Class for scoring player-match rows from a declarative weight config"""
+
+    def __init__(self, config: Optional[Dict] = None):
+        """
+        Args:
+            config: Scoring config (default: SCORING_CONFIG)
+        """
+        self.config = SCORING_CONFIG if config is None else config
+        self.groups = list(self.config)
+        self._compiled: Dict[tuple, Dict] = {}
+
+    def compile(self, columns: Iterable[str]) -> Dict:
+        """
+        Compile the config against a set of available columns
+
+        Every term is resolved to its first available column; the result is a
+        set of (groups + 1) x terms arrays, the extra row scoring rows without
+        a position group as 0. Unused term slots have column index -1.
+
+        Args:
+            columns: Column names of the dataset to score
+
+        Returns:
+            Dictionary with the column list and weight tables
+        """
+        columns = tuple(columns)
+        if columns in self._compiled:
+            return self._compiled[columns]
+
+        available = set(columns)
+        minutes_col = _pick_col(available, MINUTES_CANDIDATES)
+        if minutes_col is None:
+            raise KeyError("No minutes column found (expected 'Min' or 'Minutes').")
+
+        resolved = []
+        for group in self.groups:
+            terms = []
+            for term in self.config[group].get('terms', []):
+                col = _pick_col(available, term['columns'])
+                if col is None and 'fallback' in term:
+                    term = term['fallback']
+                    col = _pick_col(available, term['columns'])
+                if col is not None:
+                    terms.append((col, term))
+            resolved.append(terms)
+
+        value_cols = [minutes_col]
+        for terms in resolved:
+            for col, _ in terms:
+                if col not in value_cols:
+                    value_cols.append(col)
+
+        n_groups = len(self.groups) + 1
+        n_terms = max([len(terms) for terms in resolved] + [1])
+        tables = {
+            'col': np.zeros((n_groups, n_terms), dtype=np.intp),
+            'per90': np.zeros((n_groups, n_terms), dtype=bool),
+            'weight': np.zeros((n_groups, n_terms)),
+            'offset': np.zeros((n_groups, n_terms)),
+            'lower': np.full((n_groups, n_terms), -np.inf),
+            'upper': np.full((n_groups, n_terms), np.inf),
+            'fill': np.full((n_groups, n_terms), np.nan),
+            'base': np.zeros(n_groups),
+            'floor': np.full(n_groups, -np.inf),
+        }
+        tables['col'][:] = -1
+
+        for g, (group, terms) in enumerate(zip(self.groups, resolved)):
+            spec = self.config[group]
+            base = float(spec.get('base', 0.0))
+            for t, (col, term) in enumerate(terms):
+                tables['col'][g, t] = value_cols.index(col)
+                tables['per90'][g, t] = term.get('rate', 'raw') == 'per90'
+                tables['weight'][g, t] = term.get('weight', 1.0)
+                tables['offset'][g, t] = term.get('offset', 0.0)
+                tables['lower'][g, t] = term.get('lower', -np.inf)
+                tables['upper'][g, t] = term.get('upper', np.inf)
+                if term.get('fill') is not None:
+                    tables['fill'][g, t] = term['fill']
+                if term.get('replaces_base'):
+                    base = 0.0
+            tables['base'][g] = base
+            tables['floor'][g] = spec.get('floor', -np.inf)
+
+        compiled = {'value_cols': value_cols, 'minutes_col': minutes_col, **tables}
+        self._compiled[columns] = compiled
+        return compiled
+
+    def _group_index(self, group) -> int:
+        return self.groups.index(group) if group in self.groups else len(self.groups)
+
+    def group_codes(self, pos: Optional[pd.Series] = None, groups: Optional[pd.Series] = None) -> np.ndarray:
+        """
+        Group index of every row, from `Pos` strings or Position_Group labels
+
+        Both are factorized first, so the rules run once per distinct value.
+
+        Args:
+            pos: Series of position strings
+            groups: Series of Position_Group labels (used when pos is None)
+
+        Returns:
+            Integer array (len(groups) for rows without a group)
+        """
+        source = pos if pos is not None else groups
+        codes, uniques = pd.factorize(source)
+        if pos is not None:
+            lookup = [self._group_index(position_group(value)) for value in uniques]
+        else:
+            lookup = [self._group_index(value) for value in uniques]
+        lookup = np.array(lookup + [len(self.groups)], dtype=np.intp)
+        return lookup[codes]
+
+    def score_array(self, values: np.ndarray, group_codes: np.ndarray, compiled: Dict) -> np.ndarray:
+        """
+        Score rows given their compiled value matrix and group codes
+
+        Args:
+            values: Float array (rows x compiled value columns); column 0 is minutes
+            group_codes: Group index per row (len(groups) for rows without a group)
+            compiled: Output of compile()
+
+        Returns:
+            Float array of scores
+        """
+        scores = np.zeros(len(values))
+        for g in np.unique(group_codes):
+            rows = np.flatnonzero(group_codes == g)
+            total = np.full(len(rows), compiled['base'][g])
+            scale = None
+            for t, col in enumerate(compiled['col'][g]):
+                if col < 0:
+                    continue
+                x = values[rows, col]
+                if not np.isnan(compiled['fill'][g, t]):
+                    x[np.isnan(x)] = compiled['fill'][g, t]
+                if compiled['per90'][g, t]:
+                    if scale is None:
+                        scale = 90.0 / np.maximum(values[rows, 0], MIN_ADJ_FLOOR)
+                    x *= scale
+                x *= compiled['weight'][g, t]
+                x += compiled['offset'][g, t]
+                np.clip(x, compiled['lower'][g, t], compiled['upper'][g, t], out=x)
+                total += x
+            scores[rows] = np.maximum(total, compiled['floor'][g])
+        return scores
+
+    def score(self, df: pd.DataFrame) -> np.ndarray:
+        """
+        Score every row of a DataFrame in one vectorized pass
+
+        Args:
+            df: Player-match DataFrame with `Pos` or `Position_Group`
+
+        Returns:
+            Float array of Rebalanced_Score values aligned with df
+        """
+        compiled = self.compile(df.columns)
+        if 'Pos' in df.columns:
+            codes = self.group_codes(pos=df['Pos'])
+        else:
+            codes = self.group_codes(groups=df['Position_Group'])
+        values = df[compiled['value_cols']].to_numpy(dtype=np.float64)
+        return self.score_array(values, codes, compiled)
+
+    def score_frame(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Drop-in replacement for calculate_rebalanced_scores_fixed()
+
+        Args:
+            df: Player-match DataFrame
+
+        Returns:
+            Copy of df with Position_Group and Rebalanced_Score columns
+        """
+        out = df.copy()
+        if 'Pos' in out.columns:
+            out['Position_Group'] = categorize_positions(out['Pos'])
+        elif 'Position_Group' not in out.columns:
+            out['Position_Group'] = np.nan
+        out['Rebalanced_Score'] = self.score(out)
+        return out
+
+    def score_rows(self, rows: Iterable[Mapping], columns: Optional[Sequence[str]] = None) -> Iterator[float]:
+        """
+        Score rows one at a time as they arrive
+
+        Args:
+            rows: Iterable of mappings (e.g. dicts or DataFrame.itertuples()._asdict())
+            columns: Column names to compile against (default: keys of the first row)
+
+        Yields:
+            Rebalanced_Score of each row
+        """
+        compiled = None
+        for row in rows:
+            if compiled is None:
+                compiled = self.compile(columns if columns is not None else list(row.keys()))
+            pos = row.get('Pos')
+            if isinstance(pos, str):
+                group = position_group(pos)
+            else:
+                group = row.get('Position_Group')
+            g = self._group_index(group)
+            values = np.array([[_as_float(row.get(col)) for col in compiled['value_cols']]])
+            yield float(self.score_array(values, np.array([g]), compiled)[0])
+
+
+def _as_float(value) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+def calculate_rebalanced_scores(df: pd.DataFrame, config: Optional[Dict] = None) -> pd.DataFrame:
+    """
+    Quick function to add Position_Group and Rebalanced_Score to a DataFrame
+
+    Args:
+        df: Player-match DataFrame
+        config: Optional scoring config (default: SCORING_CONFIG)
+
+    Returns:
+        Scored copy of df
+    """
+    return RebalancedScorer(config).score_frame(df)
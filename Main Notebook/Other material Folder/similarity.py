@@ -0,0 +1,594 @@
+"""
+Similarity Module for Real Madrid Soccer Analysis
+Contains a nearest-neighbour index over per-90 player-season profiles
+
+SoccerModeler's clustering (clustering_results) refits KMeans over the
+whole scaled feature matrix on every call and only answers "which cluster".
+SimilarityIndex answers "the 10 player-seasons most like X" directly:
+
+- one profile per (player, season, position group) from PlayerIndex's
+  per-90 aggregates, z-scored with the mean/std of its position group and
+  scaled to unit length, so cosine similarity is a dot product;
+- profiles live in one contiguous float32 array, searched exactly in row
+  blocks (a matrix product and argpartition per block, no full sort);
+- an optional approximate mode partitions the profiles with KMeans and
+  scores only the rows of the centroids closest to the query;
+- the array is saved as .npy and loaded memory-mapped; new or updated
+  player-seasons are inserted without rebuilding the index.
+"""
+
+import json
+import os
+import time
+import warnings
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from data_cache import CACHE_DIR_NAME, DATA_FOLDER
+from player_index import PlayerIndex, normalize_name
+from position_stats import POSITION_NAMES
+from tracing import traced
+
+SIMILARITY_VERSION = 1
+DEFAULT_SIMILARITY_DIR = DATA_FOLDER / "DataCombined" / CACHE_DIR_NAME / "similarity"
+# Player-seasons below this many minutes (five full matches) get no profile
+MIN_PROFILE_MINUTES = 450.0
+DEFAULT_K = 10
+BLOCK_ROWS = 16384
+DEFAULT_NPROBE = 8
+# KMeans is fitted on at most this many profiles, then every profile is assigned
+KMEANS_SAMPLE = 20000
+
+PathLike = Union[str, Path]
+
+
+def player_season_profiles(index: PlayerIndex, metrics: Optional[Sequence[str]] = None,
+                           min_minutes: float = MIN_PROFILE_MINUTES) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Raw per-90 profiles of every player-season and position group
+
+    A player-season gets one profile per position group it played at least
+    min_minutes in (a multi-valued `Pos` such as 'AM,FW' counts for every
+    group it names), so a midfielder's occasional match up front does not
+    put him among the forwards.
+
+    Args:
+        index: PlayerIndex over the match rows
+        metrics: Profile metrics (default: all indexed metrics)
+        min_minutes: Minutes a player-season needs in a position group
+
+    Returns:
+        (keys, profiles): keys has the player key columns, Season, Position
+        and Minutes (in that group); profiles has one column per metric
+    """
+    metrics = index.metrics if metrics is None else [m for m in metrics if m in index._metric_index]
+    columns = [index._metric_index[m] for m in metrics]
+
+    # Minutes of every player-season in every group (aggregate codes are sorted)
+    width = len(index.seasons) + 2
+    agg_codes = index._agg_player * width + index._agg_season
+    seasonal = index.season_codes >= 0
+    rows = np.searchsorted(agg_codes, index.player_codes[seasonal] * width + index.season_codes[seasonal])
+    group_minutes = np.stack([
+        np.bincount(rows, weights=index.minutes[seasonal] * index.membership[seasonal, g], minlength=len(agg_codes))
+        for g in range(len(index.positions))], axis=1)
+
+    agg_rows, groups = np.nonzero(group_minutes >= min_minutes)
+    keys = index.players.iloc[index._agg_player[agg_rows]].reset_index(drop=True)
+    keys['Season'] = index.seasons[index._agg_season[agg_rows]]
+    keys['Position'] = np.asarray(index.positions, dtype=object)[groups]
+    keys['Minutes'] = group_minutes[agg_rows, groups]
+    return keys, pd.DataFrame(index.agg_per90[np.ix_(agg_rows, columns)], columns=metrics)
+
+
+def _unit_rows(values: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(values, axis=1, keepdims=True)
+    return np.divide(values, norms, out=np.zeros_like(values), where=norms > 0)
+
+
+class SimilarityIndex:
+    """Class for nearest-neighbour search over position-normalised player-season profiles"""
+
+    def __init__(self, keys: pd.DataFrame, vectors: np.ndarray, metrics: List[str],
+                 group_mean: Dict[str, np.ndarray], group_scale: Dict[str, np.ndarray],
+                 player_keys: Optional[Sequence[str]] = None):
+        """
+        Args:
+            keys: One row per profile with the player keys, Season, Position and Minutes
+            vectors: Normalised profiles (float32, unit rows), aligned with keys
+            metrics: Metric of each vector column
+            group_mean: Position group -> per-metric mean used for z-scoring
+            group_scale: Position group -> per-metric std used for z-scoring
+            player_keys: Columns identifying a player (default: keys columns before Season)
+        """
+        self.metrics = list(metrics)
+        self.group_mean = {g: np.asarray(v, dtype=np.float64) for g, v in group_mean.items()}
+        self.group_scale = {g: np.asarray(v, dtype=np.float64) for g, v in group_scale.items()}
+        self.positions = list(self.group_mean)
+        self._position_lookup = {position: code for code, position in enumerate(self.positions)}
+        if player_keys is None:
+            player_keys = list(keys.columns[:list(keys.columns).index('Season')])
+        self.player_keys = list(player_keys)
+
+        self._vectors = vectors
+        self.size = len(vectors)
+        self.keys = keys.reset_index(drop=True)
+        self._row_lookup = {}
+        self._player_lookup = {}
+        self._name_lookup = {}
+        self._player_rows = []
+        self._player_codes = np.empty(self.size, dtype=np.int32)
+        self._position_codes = np.empty(self.size, dtype=np.int8)
+        self._register(0, self.size)
+
+        self.centroids = None
+        self._cluster_order = None
+        self._cluster_offsets = None
+        self._partitioned = 0
+
+    # ------------------------------------------------------------------
+    # Construction
+    # ------------------------------------------------------------------
+    @classmethod
+    @traced(name='SimilarityIndex.build')
+    def from_player_index(cls, index: PlayerIndex, metrics: Optional[Sequence[str]] = None,
+                          min_minutes: float = MIN_PROFILE_MINUTES) -> 'SimilarityIndex':
+        """
+        Index every player-season profile of a PlayerIndex
+
+        Args:
+            index: PlayerIndex over the match rows
+            metrics: Profile metrics (default: all indexed metrics)
+            min_minutes: Minutes a player-season needs
+
+        Returns:
+            SimilarityIndex
+        """
+        keys, profiles = player_season_profiles(index, metrics, min_minutes)
+        raw = profiles.to_numpy(dtype=np.float64)
+        group_mean, group_scale = {}, {}
+        for position in index.positions:
+            block = raw[(keys['Position'] == position).to_numpy()]
+            if len(block) == 0:
+                mean, scale = np.zeros(raw.shape[1]), np.ones(raw.shape[1])
+            else:
+                with warnings.catch_warnings():
+                    warnings.simplefilter('ignore', RuntimeWarning)
+                    mean, scale = np.nanmean(block, axis=0), np.nanstd(block, axis=0)
+            group_mean[position] = np.nan_to_num(mean)
+            group_scale[position] = np.where(np.isfinite(scale) & (scale > 1e-12), scale, 1.0)
+        new = cls(keys.iloc[:0], np.empty((0, raw.shape[1]), dtype=np.float32), list(profiles.columns),
+                  group_mean, group_scale, index.player_keys)
+        new.add(keys, profiles)
+        return new
+
+    def normalize(self, profiles: np.ndarray, positions: Sequence[str]) -> np.ndarray:
+        """Z-score raw per-90 profiles with their group statistics and scale them to unit length."""
+        profiles = np.asarray(profiles, dtype=np.float64)
+        codes = np.array([self._position_code(p) for p in positions], dtype=np.int64)
+        means = np.stack([self.group_mean[p] for p in self.positions])[codes]
+        scales = np.stack([self.group_scale[p] for p in self.positions])[codes]
+        z = np.nan_to_num((profiles - means) / scales, nan=0.0, posinf=0.0, neginf=0.0)
+        return _unit_rows(z).astype(np.float32)
+
+    def _register(self, start: int, stop: int) -> None:
+        for row, player, season, position in zip(range(start, stop),
+                                                 self.keys[self.player_keys].iloc[start:stop].itertuples(index=False, name=None),
+                                                 self.keys['Season'].iloc[start:stop],
+                                                 self.keys['Position'].iloc[start:stop]):
+            player = player if len(player) > 1 else player[0]
+            code = self._player_lookup.get(player)
+            if code is None:
+                code = len(self._player_rows)
+                self._player_lookup[player] = code
+                self._player_rows.append([])
+                name = player[-1] if isinstance(player, tuple) else player
+                self._name_lookup.setdefault(normalize_name(name), []).append(code)
+            self._player_rows[code].append(row)
+            self._row_lookup[(code, season, position)] = row
+            self._player_codes[row] = code
+            self._position_codes[row] = self._position_code(position)
+
+    def _reserve(self, n: int) -> None:
+        """Grow the vector buffer (copying a memory-mapped array into memory) to hold n rows."""
+        if n <= len(self._vectors) and self._vectors.flags.writeable:
+            return
+        capacity = max(n, 2 * self.size, 1024)
+        grown = np.empty((capacity, len(self.metrics)), dtype=np.float32)
+        grown[:self.size] = self._vectors[:self.size]
+        self._vectors = grown
+        for name in ('_player_codes', '_position_codes'):
+            old = getattr(self, name)
+            new = np.empty(capacity, dtype=old.dtype)
+            new[:self.size] = old[:self.size]
+            setattr(self, name, new)
+
+    @traced(name='SimilarityIndex.add')
+    def add(self, keys: pd.DataFrame, profiles: Union[pd.DataFrame, np.ndarray]) -> int:
+        """
+        Insert or update player-season profiles
+
+        Profiles whose (player, season, position) is already indexed are
+        overwritten in place; the rest are appended (the last of repeated
+        keys wins). Appended rows are
+        searched exactly until the next partition() call.
+
+        Args:
+            keys: Player key columns, Season, Position and Minutes per profile
+            profiles: Raw per-90 values (DataFrame with the index metrics, or array in metric order)
+
+        Returns:
+            Number of appended profiles
+        """
+        if isinstance(profiles, pd.DataFrame):
+            profiles = profiles.reindex(columns=self.metrics).to_numpy(dtype=np.float64)
+        keys = keys.reset_index(drop=True)
+        last = ~keys.duplicated(subset=self.player_keys + ['Season', 'Position'], keep='last').to_numpy()
+        keys, profiles = keys[last].reset_index(drop=True), np.asarray(profiles)[last]
+        vectors = self.normalize(profiles, keys['Position'])
+
+        existing = np.full(len(keys), -1, dtype=np.int64)
+        for i, (player, season, position) in enumerate(zip(keys[self.player_keys].itertuples(index=False, name=None),
+                                                          keys['Season'], keys['Position'])):
+            code = self._player_lookup.get(player if len(player) > 1 else player[0])
+            if code is not None:
+                existing[i] = self._row_lookup.get((code, season, position), -1)
+        updated = existing >= 0
+        if updated.any():
+            if not self._vectors.flags.writeable:
+                self._reserve(self.size)
+            self._vectors[existing[updated]] = vectors[updated]
+            columns = [col for col in self.keys.columns if col in keys.columns]
+            self.keys.loc[existing[updated], columns] = keys.loc[updated, columns].to_numpy()
+
+        new = ~updated
+        n_new = int(new.sum())
+        if n_new:
+            start = self.size
+            self._reserve(start + n_new)
+            self._vectors[start:start + n_new] = vectors[new]
+            self.keys = pd.concat([self.keys, keys[new]], ignore_index=True)
+            self.size = start + n_new
+            self._register(start, self.size)
+        return n_new
+
+    @property
+    def vectors(self) -> np.ndarray:
+        """Normalised profiles (view of the first `size` buffer rows)."""
+        return self._vectors[:self.size]
+
+    def __len__(self) -> int:
+        return self.size
+
+    # ------------------------------------------------------------------
+    # Approximate search partitions
+    # ------------------------------------------------------------------
+    @traced(name='SimilarityIndex.partition')
+    def partition(self, n_clusters: Optional[int] = None, sample: int = KMEANS_SAMPLE,
+                  random_state: int = 42) -> None:
+        """
+        Partition the profiles with KMeans for approximate search
+
+        Args:
+            n_clusters: Number of partitions (default: sqrt of the profile count)
+            sample: Profiles the centroids are fitted on (all profiles are assigned)
+            random_state: Seed of the sample and of KMeans
+        """
+        from sklearn.cluster import KMeans
+
+        vectors = self.vectors
+        n_clusters = n_clusters or max(1, int(np.sqrt(self.size)))
+        n_clusters = min(n_clusters, self.size)
+        rng = np.random.RandomState(random_state)
+        fit_rows = rng.choice(self.size, sample, replace=False) if self.size > sample else slice(None)
+        kmeans = KMeans(n_clusters=n_clusters, n_init=1, random_state=random_state)
+        kmeans.fit(vectors[fit_rows])
+
+        self.centroids = _unit_rows(kmeans.cluster_centers_.astype(np.float32))
+        labels = np.empty(self.size, dtype=np.int64)
+        for start in range(0, self.size, BLOCK_ROWS):
+            block = vectors[start:start + BLOCK_ROWS]
+            labels[start:start + len(block)] = np.argmax(block @ self.centroids.T, axis=1)
+        self._cluster_order = np.argsort(labels, kind='stable')
+        self._cluster_offsets = np.searchsorted(labels[self._cluster_order], np.arange(n_clusters + 1))
+        self._partitioned = self.size
+
+    # ------------------------------------------------------------------
+    # Search
+    # ------------------------------------------------------------------
+    def _position_code(self, position: str) -> int:
+        if position in self._position_lookup:
+            return self._position_lookup[position]
+        for key, name in POSITION_NAMES.items():
+            if name == position and key in self._position_lookup:
+                return self._position_lookup[key]
+        raise KeyError(f"Position '{position}' not in {self.positions}")
+
+    def _mask(self, rows, positions: np.ndarray, exclude: np.ndarray) -> Optional[np.ndarray]:
+        """Rows a query may not return: other positions and excluded players (-1: no filter)."""
+        mask = None
+        if (positions >= 0).any():
+            mask = (positions[:, None] >= 0) & (self._position_codes[rows][None, :] != positions[:, None])
+        if (exclude >= 0).any():
+            same = self._player_codes[rows][None, :] == exclude[:, None]
+            mask = same if mask is None else mask | same
+        return mask
+
+    def _exact(self, queries: np.ndarray, k: int, positions: np.ndarray,
+               exclude: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        ids, scores = [], []
+        for start in range(0, self.size, BLOCK_ROWS):
+            stop = min(start + BLOCK_ROWS, self.size)
+            sims = queries @ self._vectors[start:stop].T
+            mask = self._mask(slice(start, stop), positions, exclude)
+            if mask is not None:
+                sims[mask] = -np.inf
+            if stop - start > k:
+                top = np.argpartition(-sims, k - 1, axis=1)[:, :k]
+                sims = np.take_along_axis(sims, top, axis=1)
+            else:
+                top = np.broadcast_to(np.arange(stop - start), sims.shape)
+            ids.append(top + start)
+            scores.append(sims)
+        return np.hstack(ids), np.hstack(scores)
+
+    def _approximate(self, queries: np.ndarray, k: int, positions: np.ndarray,
+                     exclude: np.ndarray, nprobe: int) -> Tuple[np.ndarray, np.ndarray]:
+        nprobe = min(nprobe, len(self.centroids))
+        probes = np.argpartition(-(queries @ self.centroids.T), nprobe - 1, axis=1)[:, :nprobe]
+        pending = np.arange(self._partitioned, self.size)
+        width = k
+        ids = np.full((len(queries), k), -1, dtype=np.int64)
+        scores = np.full((len(queries), k), -np.inf, dtype=np.float32)
+        for q, probe in enumerate(probes):
+            rows = np.concatenate([self._cluster_order[self._cluster_offsets[c]:self._cluster_offsets[c + 1]]
+                                   for c in probe] + [pending])
+            sims = self._vectors[rows] @ queries[q]
+            mask = self._mask(rows, positions[q:q + 1], exclude[q:q + 1])
+            if mask is not None:
+                sims[mask[0]] = -np.inf
+            top = np.argpartition(-sims, width - 1)[:width] if len(sims) > width else np.arange(len(sims))
+            ids[q, :len(top)] = rows[top]
+            scores[q, :len(top)] = sims[top]
+        return ids, scores
+
+    def search(self, queries: np.ndarray, k: int = DEFAULT_K, positions: Optional[Sequence] = None,
+               exclude_players: Optional[Sequence[int]] = None, approximate: bool = False,
+               nprobe: int = DEFAULT_NPROBE) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        k most similar profiles of normalised query vectors
+
+        Args:
+            queries: Unit vectors, shape (n_queries, n_metrics) or (n_metrics,)
+            k: Neighbours per query
+            positions: Position group per query to restrict results to (None: any)
+            exclude_players: Player code per query to leave out (-1: none)
+            approximate: Search only the KMeans partitions closest to each query
+            nprobe: Partitions scored per query in approximate mode
+
+        Returns:
+            (rows, similarities), each shape (n_queries, k), best first;
+            missing neighbours have row -1 and similarity -inf
+        """
+        queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+        m = len(queries)
+        positions = np.full(m, -1, dtype=np.int64) if positions is None else np.array(
+            [-1 if p is None else self._position_code(p) for p in positions], dtype=np.int64)
+        exclude = np.full(m, -1, dtype=np.int64) if exclude_players is None else np.asarray(exclude_players,
+                                                                                            dtype=np.int64)
+        if self.size == 0 or k <= 0:
+            return np.full((m, max(k, 0)), -1, dtype=np.int64), np.full((m, max(k, 0)), -np.inf, dtype=np.float32)
+        if approximate:
+            if self.centroids is None:
+                raise RuntimeError("Call partition() before approximate search")
+            ids, scores = self._approximate(queries, k, positions, exclude, nprobe)
+        else:
+            ids, scores = self._exact(queries, k, positions, exclude)
+
+        order = np.argsort(-scores, axis=1, kind='stable')[:, :k]
+        ids, scores = np.take_along_axis(ids, order, axis=1), np.take_along_axis(scores, order, axis=1)
+        if ids.shape[1] < k:
+            pad = k - ids.shape[1]
+            ids = np.hstack([ids, np.full((m, pad), -1, dtype=ids.dtype)])
+            scores = np.hstack([scores, np.full((m, pad), -np.inf, dtype=scores.dtype)])
+        ids[~np.isfinite(scores)] = -1
+        return ids, scores
+
+    def resolve(self, player) -> int:
+        """
+        Player code of a key value, tuple of key values or (partial) name
+
+        Raises:
+            KeyError: No player or several players match
+        """
+        if player in self._player_lookup:
+            return self._player_lookup[player]
+        query = normalize_name(player[-1] if isinstance(player, tuple) else player)
+        codes = self._name_lookup.get(query)
+        if codes is None:
+            codes = [code for name, found in self._name_lookup.items() if query in name for code in found]
+        if not codes:
+            raise KeyError(f"Player '{player}' not in the similarity index")
+        if len(codes) > 1:
+            names = sorted({self.keys[self.player_keys[-1]].iloc[self._player_rows[c][0]] for c in codes})
+            raise KeyError(f"Player '{player}' is ambiguous: {names}")
+        return codes[0]
+
+    def profile_row(self, player, season=None, position: Optional[str] = None) -> int:
+        """
+        Row of a player-season profile
+
+        Without a season the latest one is used; without a position the
+        group with the most minutes in that season.
+        """
+        code = self.resolve(player)
+        rows = self._player_rows[code]
+        if position is not None:
+            target = self.positions[self._position_code(position)]
+            rows = [row for row in rows if self.keys.at[row, 'Position'] == target]
+        if season is None and rows:
+            season = max(self.keys.at[row, 'Season'] for row in rows)
+        rows = [row for row in rows if self.keys.at[row, 'Season'] == season]
+        if not rows:
+            raise KeyError(f"No profile for player '{player}' (season {season}, position {position})")
+        return max(rows, key=lambda row: self.keys.at[row, 'Minutes'])
+
+    @traced(name='SimilarityIndex.similar')
+    def similar(self, player, season=None, position: Optional[str] = None, k: int = DEFAULT_K,
+                same_position: bool = True, exclude_player: bool = True,
+                approximate: bool = False, nprobe: int = DEFAULT_NPROBE) -> pd.DataFrame:
+        """
+        Player-seasons most similar to a player's profile
+
+        Args:
+            player: Player key or (partial) name
+            season: Season of the query profile (default: latest)
+            position: Position group of the query profile (default: most minutes)
+            k: Number of results
+            same_position: Only return profiles of the query's position group
+            exclude_player: Leave out the player's own seasons (otherwise only the query profile)
+            approximate: Use the KMeans partitions (see partition())
+            nprobe: Partitions scored in approximate mode
+
+        Returns:
+            DataFrame ranked 1..k with the profile keys and Similarity (cosine)
+        """
+        row = self.profile_row(player, season, position)
+        code = int(self._player_codes[row])
+        rows, sims = self.search(self._vectors[row], k if exclude_player else k + 1,
+                                 positions=[self.keys.at[row, 'Position']] if same_position else None,
+                                 exclude_players=[code] if exclude_player else None,
+                                 approximate=approximate, nprobe=nprobe)
+        keep = (rows[0] >= 0) & (rows[0] != row)
+        rows, sims = rows[0][keep][:k], sims[0][keep][:k]
+        result = self.keys.iloc[rows].reset_index(drop=True)
+        result['Similarity'] = sims.astype(np.float64)
+        result.index = pd.RangeIndex(1, len(result) + 1, name='Rank')
+        return result
+
+    # ------------------------------------------------------------------
+    # Persistence
+    # ------------------------------------------------------------------
+    @staticmethod
+    def paths(directory: PathLike, name: str):
+        directory = Path(directory)
+        return (directory / f"similarity.{name}.npy",
+                directory / f"similarity.{name}.json",
+                directory / f"similarity.{name}.meta.pkl",
+                directory / f"similarity.{name}.partitions.npz")
+
+    def save(self, directory: Optional[PathLike] = None, name: str = 'profiles') -> None:
+        """Write the index atomically (.npy vectors, .json spec, pickled keys, .npz partitions)."""
+        npy_path, json_path, meta_path, part_path = self.paths(directory or DEFAULT_SIMILARITY_DIR, name)
+        npy_path.parent.mkdir(parents=True, exist_ok=True)
+
+        tmp_npy = npy_path.with_name(npy_path.name + '.tmp.npy')
+        np.save(tmp_npy, np.ascontiguousarray(self.vectors))
+        os.replace(tmp_npy, npy_path)
+
+        tmp_meta = meta_path.with_name(meta_path.name + '.tmp')
+        self.keys.to_pickle(tmp_meta)
+        os.replace(tmp_meta, meta_path)
+
+        if self.centroids is not None:
+            tmp_part = part_path.with_name(part_path.name + '.tmp.npz')
+            np.savez(tmp_part, centroids=self.centroids, order=self._cluster_order,
+                     offsets=self._cluster_offsets, partitioned=self._partitioned)
+            os.replace(tmp_part, part_path)
+        elif part_path.exists():
+            part_path.unlink()
+
+        tmp_json = json_path.with_name(json_path.name + '.tmp')
+        with open(tmp_json, 'w', encoding='utf-8') as handle:
+            json.dump({
+                'version': SIMILARITY_VERSION,
+                'metrics': self.metrics,
+                'player_keys': self.player_keys,
+                'group_mean': {g: v.tolist() for g, v in self.group_mean.items()},
+                'group_scale': {g: v.tolist() for g, v in self.group_scale.items()},
+                'shape': list(self.vectors.shape),
+                'built_at': time.strftime('%Y-%m-%d %H:%M:%S'),
+            }, handle, indent=2)
+        os.replace(tmp_json, json_path)
+
+    @classmethod
+    def load(cls, directory: Optional[PathLike] = None, name: str = 'profiles',
+             mmap: bool = True) -> Optional['SimilarityIndex']:
+        """Saved index with memory-mapped vectors (None if missing or from another version)."""
+        npy_path, json_path, meta_path, part_path = cls.paths(directory or DEFAULT_SIMILARITY_DIR, name)
+        try:
+            with open(json_path, 'r', encoding='utf-8') as handle:
+                spec = json.load(handle)
+            vectors = np.load(npy_path, mmap_mode='r' if mmap else None)
+            keys = pd.read_pickle(meta_path)
+        except (OSError, ValueError):
+            return None
+        if spec.get('version') != SIMILARITY_VERSION or list(vectors.shape) != spec['shape']:
+            return None
+        index = cls(keys, vectors, spec['metrics'], spec['group_mean'], spec['group_scale'], spec['player_keys'])
+        if part_path.exists():
+            with np.load(part_path) as parts:
+                index.centroids = parts['centroids']
+                index._cluster_order = parts['order']
+                index._cluster_offsets = parts['offsets']
+                index._partitioned = int(parts['partitioned'])
+        return index
+
+
+def quick_similarity_index(df: Optional[pd.DataFrame] = None, partition: bool = False) -> SimilarityIndex:
+    """
+    Quick function to build the similarity index of the combined match data
+
+    Args:
+        df: Match rows (default: the combined match data through the cache)
+        partition: Also fit the KMeans partitions for approximate search
+
+    Returns:
+        SimilarityIndex
+    """
+    from player_index import quick_player_index
+    index = SimilarityIndex.from_player_index(quick_player_index(df))
+    if partition:
+        index.partition()
+    return index
+
+
+def example_similarity_timing(index: SimilarityIndex, n_profiles: int = 100_000, queries: int = 200,
+                              k: int = DEFAULT_K, nprobe: int = DEFAULT_NPROBE) -> Dict[str, float]:
+    """Example: exact and approximate queries over a pool grown to n_profiles with jittered copies"""
+    rng = np.random.RandomState(0)
+    base = index.vectors.astype(np.float64)
+    picks = rng.randint(0, len(base), n_profiles)
+    pool = _unit_rows(base[picks] + rng.normal(0, 0.05, (n_profiles, base.shape[1]))).astype(np.float32)
+    keys = index.keys.iloc[picks].reset_index(drop=True)
+    keys['Season'] = [f"syn_{i}" for i in range(n_profiles)]
+    large = SimilarityIndex(keys, pool, index.metrics, index.group_mean, index.group_scale, index.player_keys)
+
+    start = time.perf_counter()
+    large.partition()
+    build = time.perf_counter() - start
+
+    rows = rng.randint(0, n_profiles, queries)
+    positions = large.keys['Position'].to_numpy()[rows]
+    start = time.perf_counter()
+    exact = [large.search(large.vectors[r], k, positions=[p])[0] for r, p in zip(rows, positions)]
+    exact_ms = (time.perf_counter() - start) / queries * 1000
+    start = time.perf_counter()
+    approx = [large.search(large.vectors[r], k, positions=[p], approximate=True, nprobe=nprobe)[0]
+              for r, p in zip(rows, positions)]
+    approx_ms = (time.perf_counter() - start) / queries * 1000
+    recall = np.mean([len(np.intersect1d(a, e)) / k for a, e in zip(approx, exact)])
+
+    print(f"Partitions ({len(large.centroids)} centroids): {build:.1f} s")
+    print(f"Exact query:        {exact_ms:.2f} ms")
+    print(f"Approximate query:  {approx_ms:.2f} ms (recall@{k} {recall:.2f})")
+    return {'partition': build, 'exact_ms': exact_ms, 'approx_ms': approx_ms, 'recall': recall}
+
+
+if __name__ == "__main__":
+    print("Testing Similarity Module...")
+    similarity = quick_similarity_index()
+    print(similarity.similar('Modrić'))
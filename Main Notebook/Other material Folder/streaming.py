@@ -0,0 +1,566 @@
+"""
+Streaming Module for Real Madrid Soccer Analysis
+Contains a chunked, out-of-core path through cleaning, per-90 metrics and scoring
+
+Instead of reading every season file and concatenating them, the pipeline
+iterates the files in chunks of `chunk_rows` rows:
+
+1. A first pass accumulates total minutes per player (the only whole-dataset
+   quantity the cleaning needs).
+2. A second pass cleans each chunk (zero-minute rows and players below the
+   minutes threshold, as in load_and_clean_data()), adds per-90 features (as
+   in create_per90_features()) and the rebalanced score, then folds the chunk
+   into running group sums.
+
+Peak memory is bounded by the chunk size and the number of groups/players,
+not by the number of rows. File names follow `<club>_<XX>_<YY>.csv`, so the
+same code handles one club or a whole league.
+"""
+
+import re
+import shutil
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from data_cache import DATA_FOLDER
+from scoring import RebalancedScorer, categorize_positions
+from tracing import traced
+
+SEASON_FILES_FOLDER = DATA_FOLDER / "DataExtracted"
+SEASON_FILE_PATTERN = re.compile(r'^(?P<club>.+?)_(?P<season>\d{2}_\d{2})(?: \(\d+\))?\.csv$')
+EXCLUDE_FILE_KEYWORDS = ['schedule']
+
+MINUTES_THRESHOLD = 200
+PLAYER_KEYS = ['Club', 'Player']
+GROUP_KEYS = ['Club', 'Season', 'Position_Group']
+
+# Volume stats turned into per-90 rates (create_per90_features() in Forecasting)
+PER90_STATS = [
+    ' Gls', ' Ast', ' SoT', ' KP', ' Tkl', ' Int', ' Blocks', ' Clr',
+    'Expected xG', 'Expected xAG', 'Take-Ons Succ', 'Carries PrgC',
+    'Passes PrgP', 'Touches', 'Tackles TklW', 'Tackles Def 3rd',
+    'Tackles Mid 3rd', 'Total Cmp', 'Total PrgDist'
+]
+
+PathLike = Union[str, Path]
+
+
+def per90_name(stat: str) -> str:
+    """Per-90 column name used by the notebooks (e.g. 'Take-Ons Succ' -> 'TakeOnsSucc_Per90')."""
+    return f"{stat.strip().replace(' ', '').replace('-', '')}_Per90"
+
+
+def match_columns(names: Sequence[str], columns) -> Dict[str, str]:
+    """
+    Map configured column names to the data's columns, ignoring surrounding whitespace
+
+    The FBref exports are inconsistent about leading spaces (' KP' in one
+    table, 'KP' in another), so an exact match is preferred and a stripped
+    match is used otherwise.
+
+    Args:
+        names: Configured column names
+        columns: Columns of the data
+
+    Returns:
+        Dict of configured name -> data column, for the names that were found
+    """
+    stripped = {}
+    for col in columns:
+        stripped.setdefault(str(col).strip(), col)
+    found = {}
+    for name in names:
+        if name in columns:
+            found[name] = name
+        elif name.strip() in stripped:
+            found[name] = stripped[name.strip()]
+    return found
+
+
+def discover_season_files(source: Union[PathLike, Sequence[PathLike]] = SEASON_FILES_FOLDER) -> List[Dict]:
+    """
+    Find season files and parse club/season from their names
+
+    Args:
+        source: Folder with `<club>_<XX>_<YY>.csv` files, or an explicit list of files
+
+    Returns:
+        List of dicts with path, club and season, sorted by club then season
+    """
+    if isinstance(source, (str, Path)) and Path(source).is_dir():
+        paths = sorted(Path(source).glob('*.csv'))
+    else:
+        paths = [Path(p) for p in ([source] if isinstance(source, (str, Path)) else source)]
+
+    files = []
+    for path in paths:
+        match = SEASON_FILE_PATTERN.match(path.name)
+        if match is None or any(keyword in path.name for keyword in EXCLUDE_FILE_KEYWORDS):
+            continue
+        files.append({'path': path, 'club': match.group('club'), 'season': match.group('season')})
+    return sorted(files, key=lambda f: (f['club'], f['season']))
+
+
+def union_columns(files: List[Dict]) -> List[str]:
+    """Union of the files' columns in first-seen order (what pd.concat produces)."""
+    columns: List[str] = []
+    seen = set()
+    for file in files:
+        for col in pd.read_csv(file['path'], nrows=0).columns:
+            if col not in seen:
+                seen.add(col)
+                columns.append(col)
+    for col in ['Club', 'Season']:
+        if col not in seen:
+            columns.append(col)
+    return columns
+
+
+def iter_chunks(files: List[Dict], chunk_rows: int = 50000,
+                columns: Optional[List[str]] = None,
+                usecols: Optional[Iterable[str]] = None) -> Iterator[pd.DataFrame]:
+    """
+    Iterate season files in chunks with Club and Season columns
+
+    Small files are coalesced, so a chunk holds between chunk_rows and
+    2 * chunk_rows rows (except the last one).
+
+    Args:
+        files: Output of discover_season_files()
+        chunk_rows: Rows per chunk
+        columns: Column layout every chunk is aligned to (default: file columns)
+        usecols: Only read these columns (faster passes that need few columns)
+
+    Yields:
+        DataFrame chunks
+    """
+    read_cols = None
+    if usecols is not None:
+        wanted = set(usecols)
+        read_cols = lambda col: col in wanted  # noqa: E731
+
+    pending: List[pd.DataFrame] = []
+    pending_rows = 0
+    for file in files:
+        for chunk in pd.read_csv(file['path'], chunksize=chunk_rows, usecols=read_cols):
+            chunk['Club'] = file['club']
+            chunk['Season'] = file['season']
+            if columns is not None:
+                chunk = chunk.reindex(columns=columns)
+            pending.append(chunk)
+            pending_rows += len(chunk)
+            if pending_rows >= chunk_rows:
+                yield _combine(pending)
+                pending, pending_rows = [], 0
+    if pending:
+        yield _combine(pending)
+
+
+def _combine(frames: List[pd.DataFrame]) -> pd.DataFrame:
+    return frames[0] if len(frames) == 1 else pd.concat(frames, ignore_index=True)
+
+
+def _minutes_col(columns) -> Optional[str]:
+    for col in ['Minutes', 'Min']:
+        if col in columns:
+            return col
+    return None
+
+
+def clean_chunk(chunk: pd.DataFrame, keep_players: Optional[pd.MultiIndex] = None,
+                player_keys: Sequence[str] = PLAYER_KEYS) -> pd.DataFrame:
+    """
+    Row-local part of load_and_clean_data()
+
+    Args:
+        chunk: Raw rows
+        keep_players: Player keys that reached the minutes threshold (None: keep all)
+        player_keys: Columns identifying a player
+
+    Returns:
+        Rows with minutes > 0 from kept players
+    """
+    minute_col = _minutes_col(chunk.columns)
+    if minute_col is None:
+        return chunk
+    minutes = pd.to_numeric(chunk[minute_col], errors='coerce')
+    mask = (minutes > 0).to_numpy()
+    if keep_players is not None:
+        keys = pd.MultiIndex.from_frame(chunk[list(player_keys)])
+        mask = mask & keys.isin(keep_players)
+    return chunk[mask]
+
+
+def clean_frame(df: pd.DataFrame, minutes_threshold: int = MINUTES_THRESHOLD,
+                player_keys: Sequence[str] = PLAYER_KEYS) -> pd.DataFrame:
+    """
+    load_and_clean_data() on a whole frame
+
+    Args:
+        df: Raw rows
+        minutes_threshold: Minimum total minutes of a kept player
+        player_keys: Columns identifying a player
+
+    Returns:
+        Rows with minutes > 0 from players reaching the threshold
+    """
+    minute_col = _minutes_col(df.columns)
+    if minute_col is None:
+        return df
+    df = df[(pd.to_numeric(df[minute_col], errors='coerce') > 0).to_numpy()]
+    player_minutes = pd.to_numeric(df[minute_col], errors='coerce').groupby(
+        [df[key] for key in player_keys], observed=True).sum()
+    kept = player_minutes[player_minutes >= minutes_threshold].index
+    return clean_chunk(df, kept if isinstance(kept, pd.MultiIndex) else pd.MultiIndex.from_arrays([kept]),
+                       player_keys)
+
+
+def add_per90_features(chunk: pd.DataFrame, stats: Sequence[str] = PER90_STATS) -> pd.DataFrame:
+    """
+    Per-90 rates of volume stats (create_per90_features(), without copying twice)
+
+    Args:
+        chunk: Cleaned rows
+        stats: Volume stat columns
+
+    Returns:
+        DataFrame with Min_Safe and <stat>_Per90 columns added
+    """
+    out = chunk.copy()
+    minute_col = _minutes_col(out.columns) or 'Min'
+    min_safe = pd.to_numeric(out[minute_col], errors='coerce').replace(0, 1)
+    new_cols = {'Min_Safe': min_safe}
+    for stat in stats:
+        if stat in out.columns:
+            new_cols[per90_name(stat)] = (pd.to_numeric(out[stat], errors='coerce') / min_safe * 90).fillna(0)
+    return out.assign(**new_cols)
+
+
+def score_chunk(chunk: pd.DataFrame, scorer: Optional[RebalancedScorer] = None) -> pd.DataFrame:
+    """Add Position_Group and Rebalanced_Score to a chunk in place and return it."""
+    scorer = scorer or RebalancedScorer()
+    if 'Pos' in chunk.columns:
+        chunk['Position_Group'] = categorize_positions(chunk['Pos'])
+    chunk['Rebalanced_Score'] = scorer.score(chunk)
+    return chunk
+
+
+class StreamingAggregator:
+    """Class for out-of-core group sums (count, sum, sum of squares per column)"""
+
+    def __init__(self, keys: Sequence[str], columns: Sequence[str], flush_every: int = 16):
+        """
+        Args:
+            keys: Group-by columns
+            columns: Numeric columns to summarise
+            flush_every: Pending chunk results merged together after this many chunks
+        """
+        self.keys = list(keys)
+        self.columns = list(columns)
+        self.flush_every = flush_every
+        self._parts: List[pd.DataFrame] = []
+
+    def update(self, chunk: pd.DataFrame) -> None:
+        """Fold one chunk into the running sums."""
+        columns = [col for col in self.columns if col in chunk.columns]
+        if chunk.empty:
+            return
+        values = chunk[columns].apply(pd.to_numeric, errors='coerce')
+        keys = [chunk[key].astype(object).fillna('Unknown') for key in self.keys]
+        grouped = values.groupby(keys, sort=False)
+        part = pd.concat({
+            'rows': grouped.size().to_frame('rows'),
+            'count': grouped.count(),
+            'sum': grouped.sum(),
+            'sumsq': (values * values).groupby(keys, sort=False).sum(),
+        }, axis=1)
+        self._parts.append(part)
+        if len(self._parts) >= self.flush_every:
+            self._flush()
+
+    def _flush(self) -> None:
+        if len(self._parts) > 1:
+            merged = pd.concat(self._parts).fillna(0)
+            self._parts = [merged.groupby(level=list(range(len(self.keys))), sort=False).sum()]
+
+    def totals(self) -> pd.DataFrame:
+        """Raw accumulated rows/count/sum/sumsq columns."""
+        self._flush()
+        if not self._parts:
+            return pd.DataFrame()
+        totals = self._parts[0].sort_index()
+        totals.index.names = self.keys
+        return totals
+
+    def result(self) -> pd.DataFrame:
+        """Per-group row counts, means and sample standard deviations."""
+        totals = self.totals()
+        if totals.empty:
+            return totals
+        out = {'rows': totals[('rows', 'rows')].astype(np.int64)}
+        for col in totals['sum'].columns:
+            n = totals[('count', col)]
+            s = totals[('sum', col)]
+            ss = totals[('sumsq', col)]
+            with np.errstate(invalid='ignore', divide='ignore'):
+                mean = s / n
+                var = ((ss - s * s / n) / (n - 1)).clip(lower=0)
+            out[f"{col}_mean"] = mean.where(n > 0)
+            out[f"{col}_std"] = np.sqrt(var).where(n > 1)
+        return pd.DataFrame(out)
+
+
+class StreamingPipeline:
+    """Class for running cleaning, per-90 features and scoring chunk by chunk"""
+
+    def __init__(self, source: Union[PathLike, Sequence[PathLike]] = SEASON_FILES_FOLDER,
+                 chunk_rows: int = 50000,
+                 minutes_threshold: int = MINUTES_THRESHOLD,
+                 player_keys: Sequence[str] = PLAYER_KEYS,
+                 group_keys: Sequence[str] = GROUP_KEYS,
+                 scorer: Optional[RebalancedScorer] = None,
+                 verbose: bool = True):
+        """
+        Args:
+            source: Folder of season files or explicit list of files
+            chunk_rows: Rows per chunk (bounds peak memory)
+            minutes_threshold: Minimum total minutes for a player to be kept
+            player_keys: Columns identifying a player for the minutes threshold
+            group_keys: Columns of the aggregated summary
+            scorer: Rebalanced scorer (default: SCORING_CONFIG)
+            verbose: Print progress
+        """
+        self.files = discover_season_files(source)
+        self.chunk_rows = chunk_rows
+        self.minutes_threshold = minutes_threshold
+        self.player_keys = list(player_keys)
+        self.group_keys = list(group_keys)
+        self.scorer = scorer or RebalancedScorer()
+        self.verbose = verbose
+        self.columns = union_columns(self.files) if self.files else []
+
+    def player_minutes(self) -> pd.Series:
+        """Pass 1: total minutes of every player over all files (minutes > 0 rows)."""
+        minute_col = _minutes_col(self.columns)
+        totals = None
+        for chunk in iter_chunks(self.files, self.chunk_rows, usecols=self.player_keys + [minute_col]):
+            minutes = pd.to_numeric(chunk[minute_col], errors='coerce')
+            chunk = chunk[minutes > 0]
+            part = pd.to_numeric(chunk[minute_col]).groupby([chunk[key] for key in self.player_keys]).sum()
+            totals = part if totals is None else totals.add(part, fill_value=0)
+        return totals if totals is not None else pd.Series(dtype=float)
+
+    def kept_players(self) -> pd.MultiIndex:
+        minutes = self.player_minutes()
+        kept = minutes[minutes >= self.minutes_threshold].index
+        if not isinstance(kept, pd.MultiIndex):
+            kept = pd.MultiIndex.from_arrays([kept], names=self.player_keys)
+        return kept
+
+    def process_chunk(self, chunk: pd.DataFrame, keep_players: Optional[pd.MultiIndex]) -> pd.DataFrame:
+        """Clean, add per-90 features and score one chunk."""
+        chunk = clean_chunk(chunk, keep_players, self.player_keys)
+        chunk = add_per90_features(chunk)
+        return score_chunk(chunk, self.scorer)
+
+    def iter_processed(self, keep_players: Optional[pd.MultiIndex] = None) -> Iterator[pd.DataFrame]:
+        """
+        Pass 2: yield processed chunks (aligned to the union of file columns)
+
+        Args:
+            keep_players: Output of kept_players() (computed when omitted)
+        """
+        if keep_players is None:
+            keep_players = self.kept_players()
+        for chunk in iter_chunks(self.files, self.chunk_rows, columns=self.columns):
+            yield self.process_chunk(chunk, keep_players)
+
+    def summary_columns(self) -> List[str]:
+        minute_col = _minutes_col(self.columns) or 'Min'
+        per90 = [per90_name(stat) for stat in PER90_STATS if stat in self.columns]
+        return [minute_col, 'Rebalanced_Score'] + per90
+
+    @traced(name='StreamingPipeline.run', rows=lambda result: result['rows_out'])
+    def run(self, sink: Optional[PathLike] = None,
+            on_chunk: Optional[Callable[[pd.DataFrame], None]] = None) -> Dict:
+        """
+        Run both passes and aggregate out-of-core
+
+        Args:
+            sink: Optional CSV path receiving every processed row (appended per chunk)
+            on_chunk: Optional callback receiving each processed chunk
+
+        Returns:
+            Dictionary with 'groups' (per group_keys) and 'players' summaries,
+            row counts and timing
+        """
+        start = time.perf_counter()
+        keep_players = self.kept_players()
+        columns = self.summary_columns()
+        groups = StreamingAggregator(self.group_keys, columns)
+        players = StreamingAggregator(self.player_keys, columns[:2])
+
+        rows_in = rows_out = n_chunks = 0
+        header = True
+        for chunk in iter_chunks(self.files, self.chunk_rows, columns=self.columns):
+            rows_in += len(chunk)
+            processed = self.process_chunk(chunk, keep_players)
+            rows_out += len(processed)
+            n_chunks += 1
+            groups.update(processed)
+            players.update(processed)
+            if sink is not None:
+                processed.to_csv(sink, mode='w' if header else 'a', header=header, index=False)
+                header = False
+            if on_chunk is not None:
+                on_chunk(processed)
+
+        result = {
+            'groups': groups.result(),
+            'players': players.result(),
+            'rows_in': rows_in,
+            'rows_out': rows_out,
+            'chunks': n_chunks,
+            'players_kept': len(keep_players),
+            'seconds': time.perf_counter() - start,
+        }
+        if self.verbose:
+            print(f"✅ Streamed {len(self.files)} files in {n_chunks} chunks: {rows_in:,} rows in, "
+                  f"{rows_out:,} kept, {len(result['groups'])} groups ({result['seconds']:.2f}s)")
+        return result
+
+
+def process_in_memory(source: Union[PathLike, Sequence[PathLike]] = SEASON_FILES_FOLDER,
+                      minutes_threshold: int = MINUTES_THRESHOLD,
+                      player_keys: Sequence[str] = PLAYER_KEYS,
+                      group_keys: Sequence[str] = GROUP_KEYS) -> Dict:
+    """
+    Reference path: concatenate every file, then clean, add features, score and aggregate
+
+    Returns the same summaries as StreamingPipeline.run().
+    """
+    files = discover_season_files(source)
+    frames = []
+    for file in files:
+        frame = pd.read_csv(file['path'])
+        frame['Club'] = file['club']
+        frame['Season'] = file['season']
+        frames.append(frame)
+    df = pd.concat(frames, ignore_index=True)
+
+    minute_col = _minutes_col(df.columns)
+    df = score_chunk(add_per90_features(clean_frame(df, minutes_threshold, player_keys)))
+
+    columns = [minute_col, 'Rebalanced_Score'] + [per90_name(s) for s in PER90_STATS if s in df.columns]
+    groups = StreamingAggregator(group_keys, columns)
+    groups.update(df)
+    players = StreamingAggregator(player_keys, columns[:2])
+    players.update(df)
+    return {'groups': groups.result(), 'players': players.result(), 'rows_out': len(df)}
+
+
+def make_synthetic_league(workdir: PathLike, n_clubs: int = 20,
+                          source: PathLike = SEASON_FILES_FOLDER, seed: int = 0) -> List[Path]:
+    """
+    Write a synthetic league by cloning the Real Madrid season files per club
+
+    Player names get a club prefix and minutes/stat columns small random
+    perturbations, so clubs differ but keep the real schemas.
+
+    Returns:
+        Paths of the written files
+    """
+    rng = np.random.default_rng(seed)
+    workdir = Path(workdir)
+    workdir.mkdir(parents=True, exist_ok=True)
+    written = []
+    for file in discover_season_files(source):
+        base = pd.read_csv(file['path'])
+        numeric = base.select_dtypes(include=[np.number]).columns.drop(['#'], errors='ignore')
+        for c in range(n_clubs):
+            df = base.copy()
+            df['Player'] = f"C{c:02d} " + df['Player'].astype(str)
+            if len(numeric) > 0:
+                noise = rng.integers(0, 2, size=(len(df), len(numeric)))
+                df[numeric] = df[numeric] + noise * (df[numeric] > 0)
+            path = workdir / f"club{c:02d}_{file['season']}.csv"
+            df.to_csv(path, index=False)
+            written.append(path)
+    return written
+
+
+def _peak_memory(func: Callable) -> Tuple[float, float, object]:
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = func()
+    seconds = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak / 1024**2, seconds, result
+
+
+def benchmark_streaming(club_counts: Sequence[int] = (1, 5, 20), chunk_rows: int = 20000,
+                        workdir: Optional[PathLike] = None) -> pd.DataFrame:
+    """
+    Compare peak memory of the streaming and concatenate-everything paths
+
+    Builds synthetic leagues of increasing size and measures the Python heap
+    peak (tracemalloc) of each path; the streaming peak should stay flat while
+    the in-memory peak grows with the number of clubs. Also checks that both
+    paths produce the same group summary.
+
+    Returns:
+        DataFrame with one row per league size
+    """
+    cleanup = workdir is None
+    workdir = Path(tempfile.mkdtemp(prefix='league_')) if workdir is None else Path(workdir)
+    rows = []
+    try:
+        for n_clubs in club_counts:
+            league = workdir / f"{n_clubs}_clubs"
+            files = make_synthetic_league(league, n_clubs)
+            n_rows = sum(1 for path in files for _ in open(path, encoding='utf-8')) - len(files)
+
+            stream_mb, stream_s, streamed = _peak_memory(
+                lambda: StreamingPipeline(league, chunk_rows=chunk_rows, verbose=False).run())
+            memory_mb, memory_s, reference = _peak_memory(lambda: process_in_memory(league))
+
+            a, b = streamed['groups'], reference['groups'].reindex(streamed['groups'].index)
+            rows.append({
+                'clubs': n_clubs,
+                'rows': n_rows,
+                'stream_peak_mb': round(stream_mb, 1),
+                'in_memory_peak_mb': round(memory_mb, 1),
+                'stream_s': round(stream_s, 2),
+                'in_memory_s': round(memory_s, 2),
+                'same_result': bool(np.allclose(a.to_numpy(float), b.to_numpy(float), equal_nan=True)),
+            })
+            shutil.rmtree(league, ignore_errors=True)
+    finally:
+        if cleanup:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    results = pd.DataFrame(rows)
+    print(results.to_string(index=False))
+    return results
+
+
+def quick_stream(source: Union[PathLike, Sequence[PathLike]] = SEASON_FILES_FOLDER,
+                 chunk_rows: int = 50000) -> Dict:
+    """
+    Quick function to stream the season files through the pipeline
+
+    Args:
+        source: Folder of season files or explicit list of files
+        chunk_rows: Rows per chunk
+
+    Returns:
+        StreamingPipeline.run() result
+    """
+    return StreamingPipeline(source, chunk_rows=chunk_rows).run()
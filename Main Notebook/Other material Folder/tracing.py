@@ -0,0 +1,318 @@
+"""
+Tracing Module for Real Madrid Soccer Analysis
+Contains stage-level timing instrumentation for the analysis pipeline
+
+Pipeline steps are wrapped with @traced (functions and methods) or
+`with stage(name):` (inline blocks). While tracing is disabled, the
+decorator's wrapper only checks a module global before calling the function
+and stage() returns a shared no-op context, so instrumented code costs
+nothing measurable. enable_tracing() (or the `tracing(...)` context manager)
+records, per stage:
+
+- wall and CPU time (time.perf_counter / time.process_time)
+- peak RSS increase during the stage (getrusage ru_maxrss, where available)
+- row count (len of the returned DataFrame/array, or set explicitly)
+- nesting depth and parent stage
+
+Records are appended to a JSON lines file (*.jsonl) as stages finish, or
+written as a Chrome trace (*.json, viewable in chrome://tracing or Perfetto)
+when tracing stops. With profile=True every top-level stage runs under
+cProfile and the profile of the slowest one is dumped next to the trace.
+"""
+
+import functools
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Union
+
+PathLike = Union[str, Path]
+
+PROFILE_TOP_FUNCTIONS = 30
+
+# Active tracer (None: tracing disabled)
+_TRACER = None
+
+
+def _peak_rss_mb() -> Optional[float]:
+    """Peak resident set size of the process in MB (None where getrusage is unavailable)."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KB, macOS bytes
+    return peak / 1024**2 if sys.platform == 'darwin' else peak / 1024
+
+
+def count_rows(result) -> Optional[int]:
+    """Rows of a stage result: first dimension of a frame/array, or of the first such item of a tuple."""
+    if isinstance(result, (tuple, list)) and result and not hasattr(result, 'shape'):
+        for item in result:
+            rows = count_rows(item)
+            if rows is not None:
+                return rows
+        return None
+    shape = getattr(result, 'shape', None)
+    if isinstance(shape, tuple) and shape:
+        return int(shape[0])
+    return None
+
+
+class _NullStage:
+    """No-op stage used while tracing is disabled"""
+
+    def __enter__(self):
+        return {}
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_STAGE = _NullStage()
+
+
+class Tracer:
+    """Class for recording stage timings into a structured trace"""
+
+    def __init__(self, path: Optional[PathLike] = None, profile: bool = False,
+                 profile_dir: Optional[PathLike] = None, verbose: bool = True):
+        """
+        Args:
+            path: Trace file: *.jsonl for JSON lines, *.json for Chrome trace format
+                (None: keep records in memory only)
+            profile: Profile top-level stages with cProfile and dump the slowest
+            profile_dir: Folder for the profile dump (default: next to the trace)
+            verbose: Print a line per finished top-level stage
+        """
+        self.path = Path(path) if path is not None else None
+        self.chrome = self.path is not None and self.path.suffix == '.json'
+        self.profile = profile
+        self.profile_dir = Path(profile_dir) if profile_dir is not None else (
+            self.path.parent if self.path is not None else Path('.'))
+        self.verbose = verbose
+        self.records: List[Dict] = []
+        self.origin = time.perf_counter()
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._slowest = None
+        self._handle = None
+        if self.path is not None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            if not self.chrome:
+                self._handle = open(self.path, 'a', encoding='utf-8')
+
+    def _stack(self) -> List[str]:
+        if not hasattr(self._local, 'stack'):
+            self._local.stack = []
+        return self._local.stack
+
+    @contextmanager
+    def stage(self, name: str, rows: Optional[int] = None, **fields):
+        """
+        Record one stage
+
+        Yields a dictionary; set record['rows'] (or other fields) inside the block.
+        """
+        stack = self._stack()
+        record = {'name': name, 'rows': rows, **fields}
+        profiler = None
+        if self.profile and not stack:
+            import cProfile
+            profiler = cProfile.Profile()
+
+        stack.append(name)
+        rss_before = _peak_rss_mb()
+        cpu_start = time.process_time()
+        start = time.perf_counter()
+        if profiler is not None:
+            profiler.enable()
+        try:
+            yield record
+        except BaseException as e:
+            record['error'] = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            if profiler is not None:
+                profiler.disable()
+            wall = time.perf_counter() - start
+            cpu = time.process_time() - cpu_start
+            rss_after = _peak_rss_mb()
+            stack.pop()
+            record.update({
+                'start_s': round(start - self.origin, 6),
+                'wall_s': round(wall, 6),
+                'cpu_s': round(cpu, 6),
+                'peak_rss_delta_mb': round(rss_after - rss_before, 3) if rss_after is not None else None,
+                'peak_rss_mb': round(rss_after, 3) if rss_after is not None else None,
+                'depth': len(stack),
+                'parent': stack[-1] if stack else None,
+                'pid': os.getpid(),
+                'thread': threading.get_ident(),
+                'profiled': profiler is not None,
+            })
+            self._add(record, profiler)
+
+    def _add(self, record: Dict, profiler) -> None:
+        with self._lock:
+            self.records.append(record)
+            if self._handle is not None:
+                self._handle.write(json.dumps(record, default=str) + '\n')
+                self._handle.flush()
+            if profiler is not None and (self._slowest is None or record['wall_s'] > self._slowest[0]['wall_s']):
+                self._slowest = (record, profiler)
+        if self.verbose and record['depth'] == 0:
+            rows = f", {record['rows']:,} rows" if record.get('rows') is not None else ''
+            print(f"⏱️ {record['name']}: {record['wall_s']:.3f}s wall, {record['cpu_s']:.3f}s CPU{rows}")
+
+    def chrome_trace(self) -> Dict:
+        """Records as a Chrome trace event dictionary."""
+        events = []
+        for record in self.records:
+            args = {k: v for k, v in record.items()
+                    if k not in ('name', 'start_s', 'wall_s', 'pid', 'thread')}
+            events.append({
+                'name': record['name'], 'ph': 'X', 'cat': 'stage',
+                'ts': record['start_s'] * 1e6, 'dur': record['wall_s'] * 1e6,
+                'pid': record['pid'], 'tid': record['thread'], 'args': args,
+            })
+        return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+
+    def dump_profile(self) -> Optional[Path]:
+        """Write the slowest profiled stage as <name>.prof plus a text summary."""
+        if self._slowest is None:
+            return None
+        import pstats
+
+        record, profiler = self._slowest
+        safe_name = ''.join(c if c.isalnum() or c in '._-' else '_' for c in record['name'])
+        self.profile_dir.mkdir(parents=True, exist_ok=True)
+        path = self.profile_dir / f"profile_{safe_name}.prof"
+        profiler.dump_stats(str(path))
+        with open(path.with_suffix('.txt'), 'w', encoding='utf-8') as handle:
+            pstats.Stats(profiler, stream=handle).sort_stats('cumulative').print_stats(PROFILE_TOP_FUNCTIONS)
+        return path
+
+    def close(self) -> Dict:
+        """
+        Finish the trace: write the Chrome trace / profile dump and close files
+
+        Returns:
+            Dictionary with the trace path, profile path and record count
+        """
+        if self.chrome:
+            tmp_path = self.path.with_name(self.path.name + '.tmp')
+            with open(tmp_path, 'w', encoding='utf-8') as handle:
+                json.dump(self.chrome_trace(), handle, default=str)
+            os.replace(tmp_path, self.path)
+        if self._handle is not None:
+            self._handle.close()
+            self._handle = None
+        profile_path = self.dump_profile() if self.profile else None
+        if self.verbose:
+            if self.path is not None:
+                print(f"✅ Trace: {len(self.records)} stage(s) -> {self.path}")
+            if profile_path is not None:
+                print(f"✅ Profile of slowest stage '{self._slowest[0]['name']}' -> {profile_path}")
+        return {'path': self.path, 'profile': profile_path, 'records': len(self.records)}
+
+    def summary(self):
+        """DataFrame of the recorded stages, slowest first."""
+        import pandas as pd
+
+        columns = ['name', 'depth', 'parent', 'wall_s', 'cpu_s', 'peak_rss_delta_mb', 'rows']
+        frame = pd.DataFrame(self.records)
+        if frame.empty:
+            return pd.DataFrame(columns=columns)
+        return frame.reindex(columns=columns).sort_values('wall_s', ascending=False).reset_index(drop=True)
+
+
+def enable_tracing(path: Optional[PathLike] = None, profile: bool = False, **kwargs) -> Tracer:
+    """
+    Start recording instrumented stages (replaces an active tracer)
+
+    Args:
+        path: Trace file (*.jsonl or *.json for Chrome format; None: in memory)
+        profile: Dump a cProfile of the slowest top-level stage
+
+    Returns:
+        The active Tracer
+    """
+    global _TRACER
+    if _TRACER is not None:
+        _TRACER.close()
+    _TRACER = Tracer(path, profile, **kwargs)
+    return _TRACER
+
+
+def disable_tracing() -> Optional[Dict]:
+    """Stop recording and finish the active trace (returns Tracer.close() or None)."""
+    global _TRACER
+    tracer, _TRACER = _TRACER, None
+    return tracer.close() if tracer is not None else None
+
+
+def active_tracer() -> Optional[Tracer]:
+    return _TRACER
+
+
+@contextmanager
+def tracing(path: Optional[PathLike] = None, profile: bool = False, **kwargs):
+    """Context manager enabling tracing for a block and yielding the Tracer."""
+    tracer = enable_tracing(path, profile, **kwargs)
+    try:
+        yield tracer
+    finally:
+        if _TRACER is tracer:
+            disable_tracing()
+
+
+def stage(name: str, rows: Optional[int] = None, **fields):
+    """Context manager timing a block as a stage (no-op while tracing is disabled)."""
+    tracer = _TRACER
+    if tracer is None:
+        return _NULL_STAGE
+    return tracer.stage(name, rows, **fields)
+
+
+def traced(func: Optional[Callable] = None, *, name: Optional[str] = None,
+           rows: Optional[Callable] = None):
+    """
+    Decorator recording each call of a function as a stage
+
+    Args:
+        func: Decorated function (when used as @traced)
+        name: Stage name (default: the function's qualified name)
+        rows: Function of the return value giving its row count (default: count_rows)
+
+    Usage:
+        @traced
+        def load_data(): ...
+
+        @traced(name='render', rows=lambda summary: len(summary['rendered']))
+        def render(self): ...
+    """
+    def decorate(function):
+        stage_name = name or function.__qualname__
+        count = rows or count_rows
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            tracer = _TRACER
+            if tracer is None:
+                return function(*args, **kwargs)
+            with tracer.stage(stage_name) as record:
+                result = function(*args, **kwargs)
+                if record.get('rows') is None:
+                    try:
+                        record['rows'] = count(result)
+                    except Exception:
+                        record['rows'] = None
+                return result
+        return wrapper
+
+    return decorate(func) if func is not None else decorate
@@ -170,6 +170,1427 @@ def test_quick_functions():
         print(f"❌ Quick functions error: {e}")
         return False
 
+def test_data_cache():
+    """Test the cached dataset loader"""
+    print("\n🧪 Testing data cache...")
+    
+    try:
+        import tempfile
+        from pathlib import Path
+        import pandas as pd
+        from data_cache import DataCache
+        
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            csv_path = Path(tmp_dir) / "matches.csv"
+            pd.DataFrame({
+                'Date': ['8/23/15', '8/29/15', '9/12/15'],
+                'Player': ['Isco', 'Casemiro', 'Isco'],
+                'Pos': ['AM', 'DM', 'AM'],
+                'Min': [90.0, 75.5, 12.0]
+            }).to_csv(csv_path, index=False)
+            
+            cache = DataCache(verbose=False)
+            cold = cache.load(csv_path)
+            assert cache.is_fresh(csv_path)
+            warm = cache.load(csv_path)
+            pd.testing.assert_frame_equal(cold, warm)
+            assert str(warm['Pos'].dtype) == 'category'
+            assert str(warm['Min'].dtype) == 'float32'
+            assert pd.api.types.is_datetime64_any_dtype(warm['Date'])
+            print("✅ Warm load matches cold load with typed columns")
+            
+            # Editing the source must invalidate the cache
+            pd.DataFrame({'Date': ['8/23/15'], 'Player': ['Modric'], 'Pos': ['CM'], 'Min': [90.0]}).to_csv(csv_path, index=False)
+            assert not cache.is_fresh(csv_path)
+            assert len(cache.load(csv_path)) == 1
+            print("✅ Cache rebuilt after source change")
+        
+        return True
+        
+    except Exception as e:
+        print(f"❌ Data cache error: {e}")
+        return False
+
+def test_position_stats():
+    """Test the batched per-position statistics engine"""
+    print("\n🧪 Testing position statistics engine...")
+    
+    try:
+        import numpy as np
+        import pandas as pd
+        from position_stats import PositionStatsEngine, position_membership
+        
+        np.random.seed(42)
+        sample_data = pd.DataFrame({
+            'Pos': np.random.choice(['FW', 'FW,RM', 'CB', 'CM,DM', 'GK', None], 60),
+            'goals': np.random.poisson(1, 60).astype(float),
+            'shots': np.random.poisson(3, 60).astype(float),
+            'tackles': np.random.poisson(2, 60).astype(float)
+        })
+        sample_data.loc[::7, 'shots'] = np.nan
+        
+        membership = position_membership(sample_data['Pos'])
+        assert membership.loc[sample_data['Pos'] == 'FW,RM', ['FW', 'MF']].all().all()
+        print("✅ Multi-valued positions mapped to every group")
+        
+        engine = PositionStatsEngine(sample_data)
+        for position in ['FW', 'MF', 'DF']:
+            pos_data = sample_data.loc[membership[position], engine.metrics]
+            assert np.allclose(engine.describe(position).values, pos_data.describe().values, equal_nan=True)
+            assert np.allclose(engine.correlation(position).values, pos_data.corr().values, equal_nan=True)
+        print("✅ Batched describe() and corr() match pandas per position")
+        
+        return True
+        
+    except Exception as e:
+        print(f"❌ Position statistics error: {e}")
+        return False
+
+def test_scoring():
+    """Test the config-driven rebalanced scoring engine"""
+    print("\n🧪 Testing rebalanced scoring engine...")
+    
+    try:
+        import numpy as np
+        import pandas as pd
+        from scoring import RebalancedScorer, categorize_positions
+        
+        sample_data = pd.DataFrame({
+            'Pos': ['GK', 'FW', 'CM', 'CB', None],
+            'Min': [90, 45, 5, 90, 90],
+            'Total Cmp%': [90, np.nan, np.nan, np.nan, np.nan],
+            'Err': [3, 0, 0, 0, 0],
+            ' Gls': [0, 1, 0, 0, 0],
+            ' Ast': [0, 0, 1, 0, 0],
+            'KP': [0, 0, 0, 0, 0],
+            'Passes Cmp%': [np.nan, 80, np.nan, 90, 90],
+            'Clr': [0, 0, 0, 9, 0]
+        })
+        
+        groups = categorize_positions(sample_data['Pos'])
+        assert groups.tolist()[:4] == ['Goalkeeper', 'Forward', 'Midfield', 'Defense']
+        
+        scorer = RebalancedScorer()
+        scores = scorer.score(sample_data)
+        # GK: 90 * 0.2 - min(3 * 2.5, 5); FW: min(1 / 45 * 90 * 10, 10) + 45 * 0.1 / 90
+        # MF: min(1 / 10 * 90 * 6, 6) + 1 (pass accuracy fill 85) + 5 * 0.1 / 90
+        # DF: min(9 / 90 * 90 * 0.5, 4) + 0.1; no position: 0
+        assert np.allclose(scores, [13.0, 10.05, 7.0 + 0.5 / 90, 4.1, 0.0])
+        print("✅ Scores follow the per-position weights")
+        
+        streamed = list(scorer.score_rows(sample_data.to_dict('records')))
+        assert np.allclose(streamed, scores)
+        print("✅ Streaming scores match the batch scores")
+        
+        return True
+        
+    except Exception as e:
+        print(f"❌ Scoring error: {e}")
+        return False
+
+def test_report_renderer():
+    """Test the headless parallel report renderer"""
+    print("\n🧪 Testing report renderer...")
+    
+    try:
+        import tempfile
+        import pandas as pd
+        from report_renderer import ReportRenderer
+        
+        counts = pd.Series([12, 7, 3], index=['FW', 'MF', 'DF'])
+        corr = pd.DataFrame([[1.0, 0.7], [0.7, 1.0]], index=['a', 'b'], columns=['a', 'b'])
+        
+        with tempfile.TemporaryDirectory() as tmp:
+            renderer = ReportRenderer(tmp, workers=2, dpi=50, verbose=False)
+            renderer.add('counts', 'bar', counts, title='Counts')
+            renderer.add('corr', 'heatmap', corr)
+            summary = renderer.render()
+            assert sorted(summary['rendered']) == ['corr', 'counts'] and not summary['failed']
+            assert os.path.exists(os.path.join(tmp, 'counts.png'))
+            print("✅ Figures rendered in a process pool")
+            
+            renderer.add('counts', 'bar', counts + 1, title='Counts')
+            summary = renderer.render()
+            assert summary['rendered'] == ['counts'] and summary['skipped'] == ['corr']
+            print("✅ Only figures with changed data are redrawn")
+            
+            # Serial rendering keeps the session's backend and pyplot state
+            import matplotlib
+            import matplotlib.pyplot as plt
+            previous = matplotlib.get_backend()
+            plt.switch_backend('svg')
+            try:
+                serial = ReportRenderer(os.path.join(tmp, 'serial'), workers=1, dpi=50, verbose=False)
+                serial.add('counts', 'bar', counts, rotation=45)
+                serial.add('hist', 'hist', counts)
+                serial.add('box', 'boxplot', pd.DataFrame({'v': [1.0, 2.0, 3.0, 4.0], 'g': list('aabb')}),
+                           column='v', by='g')
+                serial.add('corr', 'heatmap', corr)
+                summary = serial.render()
+                assert len(summary['rendered']) == 4 and not summary['failed']
+                assert matplotlib.get_backend() == 'svg' and plt.get_fignums() == []
+            finally:
+                plt.switch_backend(previous)
+            print("✅ Serial rendering leaves the pyplot backend untouched")
+        
+        return True
+        
+    except Exception as e:
+        print(f"❌ Report renderer error: {e}")
+        return False
+
+def test_incremental_eda():
+    """Test the per-season incremental EDA aggregates"""
+    print("\n🧪 Testing incremental EDA state...")
+    
+    try:
+        import tempfile
+        import numpy as np
+        import pandas as pd
+        from incremental_eda import IncrementalEDA
+        from position_stats import PositionStatsEngine
+        from report_renderer import data_hash
+        
+        np.random.seed(7)
+        sample_data = pd.DataFrame({
+            'Season': np.repeat(['23_24', '24_25'], 30),
+            'Date': pd.date_range('2023-08-01', periods=60, freq='7D'),
+            'Pos': np.random.choice(['FW', 'CM', 'CB,DM', 'GK'], 60),
+            'goals': np.random.poisson(1, 60).astype(float),
+            'shots': np.random.poisson(3, 60).astype(float)
+        })
+        sample_data.loc[::9, 'shots'] = np.nan
+        
+        with tempfile.TemporaryDirectory() as tmp:
+            state_path = os.path.join(tmp, 'eda_state')
+            IncrementalEDA(state_path, verbose=False).update(sample_data)
+            
+            # New matchday in the current season only
+            new_rows = sample_data.tail(3).assign(goals=[2.0, 0.0, 1.0])
+            updated = pd.concat([sample_data, new_rows], ignore_index=True)
+            state = IncrementalEDA(state_path, verbose=False)
+            result = state.update(updated)
+            assert result['recomputed'] == ['24_25'] and result['unchanged'] == ['23_24']
+            print("✅ Only the changed season was re-aggregated")
+            
+            full = PositionStatsEngine(updated, ['goals', 'shots'])
+            merged = state.position_stats(updated)
+            assert np.allclose(merged.means().values, full.means().values, equal_nan=True)
+            assert np.allclose(merged.correlation_matrices(), full.correlation_matrices(), equal_nan=True)
+            assert (state.missing_counts() == updated.isnull().sum()).all()
+            assert state.position_counts().sum() == len(updated)
+            print("✅ Merged aggregates match a full recompute")
+            
+            # Season distribution identical to the full path (float years once a date is missing)
+            full_counts = updated['Date'].dt.year.value_counts().sort_index()
+            pd.testing.assert_series_equal(state.season_counts(), full_counts.rename_axis('Season'))
+            undated = updated.assign(Date=updated['Date'].where(updated.index != 5))
+            undated_state = IncrementalEDA(os.path.join(tmp, 'undated_state'), verbose=False)
+            undated_state.update(undated)
+            full_counts = undated['Date'].dt.year.value_counts().sort_index().rename_axis('Season')
+            pd.testing.assert_series_equal(undated_state.season_counts(), full_counts)
+            assert data_hash(undated_state.season_counts()) == data_hash(full_counts)
+            print("✅ Season counts match the full path, dtype included")
+        
+        return True
+        
+    except Exception as e:
+        print(f"❌ Incremental EDA error: {e}")
+        return False
+
+def test_streaming():
+    """Test the chunked streaming pipeline against the in-memory path"""
+    print("\n🧪 Testing streaming pipeline...")
+    
+    try:
+        import tempfile
+        import numpy as np
+        import pandas as pd
+        from streaming import StreamingPipeline, process_in_memory
+        
+        np.random.seed(11)
+        with tempfile.TemporaryDirectory() as tmp:
+            for club in ['alpha', 'beta']:
+                for season in ['23_24', '24_25']:
+                    n = 40
+                    pd.DataFrame({
+                        'Player': np.random.choice(['A', 'B', 'C', 'D'], n),
+                        'Pos': np.random.choice(['FW', 'CM', 'CB', 'GK'], n),
+                        'Min': np.random.choice([0, 30, 90], n),
+                        ' Gls': np.random.poisson(0.3, n),
+                        ' Tkl': np.random.poisson(1.5, n),
+                        'Touches': np.random.poisson(50, n)
+                    }).to_csv(os.path.join(tmp, f"{club}_{season}.csv"), index=False)
+            pd.DataFrame({'Date': ['2024-01-01']}).to_csv(os.path.join(tmp, 'alpha_schedule_24_25.csv'), index=False)
+            
+            reference = process_in_memory(tmp)
+            key = ['Club', 'Season', 'Position_Group']
+            expected = reference['groups'].sort_values(key).reset_index(drop=True)
+            for chunk_rows in [25, 1000]:
+                result = StreamingPipeline(tmp, chunk_rows=chunk_rows, verbose=False).run()
+                assert result['rows_out'] == reference['rows_out']
+                streamed = result['groups'].sort_values(key).reset_index(drop=True)
+                pd.testing.assert_frame_equal(streamed[expected.columns], expected, check_dtype=False)
+            print(f"✅ Streamed groups match the in-memory path ({len(expected)} groups)")
+        
+        return True
+        
+    except Exception as e:
+        print(f"❌ Streaming error: {type(e).__name__}: {e}")
+        return False
+
+def test_compact_data():
+    """Test the compact match table round trip"""
+    print("\n🧪 Testing compact match data...")
+    
+    try:
+        import numpy as np
+        import pandas as pd
+        from compact_data import CompactMatchTable
+        
+        wide = pd.DataFrame({
+            'Date': ['8/23/15', '8/23/15', '8/29/15', np.nan],
+            'Player': ['Jesé', 'Isco', 'Jesé', np.nan],
+            'Age': ['22-178', '23-120', '22-184', np.nan],
+            'Min': [90.0, 45.0, np.nan, np.nan],
+            ' Gls': [1.0, 0.0, 0.0, 2.0],
+            'Expected xG': [0.4, 0.1, 0.0, np.nan],
+            'Match URL': ['https://fbref.com/en/matches/b6736cc2/a', 'https://fbref.com/en/matches/b6736cc2/a',
+                          'https://fbref.com/en/matches/6c8707f0/b', np.nan]
+        })
+        schedule = pd.DataFrame({'Date': ['8/23/15', '8/29/15'], 'Result': ['D', 'W']})
+        
+        table = CompactMatchTable.from_frame(wide, schedule, float32=False)
+        assert str(table.players['Min'].dtype) == 'Int8' and str(table.players[' Gls'].dtype) == 'int8'
+        assert table.players['Age_Days'].iloc[0] == 8213  # born 1993-02-26
+        assert list(table.matches['match_code']) == ['b6736cc2', '6c8707f0']
+        assert list(table.match_columns(['Result'])['Result'].iloc[:3]) == ['D', 'D', 'W']
+        pd.testing.assert_frame_equal(table.to_wide(), wide)
+        print("✅ Compact table converts back to the wide frame")
+        
+        return True
+        
+    except Exception as e:
+        print(f"❌ Compact data error: {type(e).__name__}: {e}")
+        return False
+
+def test_model_training():
+    """Test the cached training orchestrator"""
+    print("\n🧪 Testing model training orchestrator...")
+    
+    try:
+        import tempfile
+        import numpy as np
+        import pandas as pd
+        from model_training import TrainingOrchestrator, build_position_datasets
+        
+        np.random.seed(3)
+        n = 160
+        sample_data = pd.DataFrame({
+            'Position_Group': np.repeat(['Forward', 'Defense'], n // 2),
+            'Week': np.tile(np.arange(1, 41), 4),
+            'a': np.random.rand(n), 'b': np.random.rand(n), 'c': np.random.rand(n)
+        })
+        sample_data['Rebalanced_Score'] = 3 * sample_data['a'] - sample_data['b'] + np.random.rand(n) * 0.1
+        features = {'Forward': ['a', 'b', 'c'], 'Defense': ['a', 'b', 'c']}
+        
+        with tempfile.TemporaryDirectory() as tmp:
+            orchestrator = TrainingOrchestrator(tmp, cpu_budget=1, verbose=False)
+            datasets = build_position_datasets(sample_data, features, verbose=False)
+            thread_env = {var: os.environ.get(var) for var in ['OMP_NUM_THREADS', 'OPENBLAS_NUM_THREADS', 'MKL_NUM_THREADS']}
+            first = orchestrator.run(datasets, ['rf', 'mlp'])
+            assert len(first) == 4 and not first['cached'].any() and first['error'].isna().all()
+            assert {var: os.environ.get(var) for var in thread_env} == thread_env  # serial run leaves the session alone
+            
+            changed = sample_data.copy()
+            changed.loc[0, 'Rebalanced_Score'] += 1.0  # a Forward row
+            second = orchestrator.run(build_position_datasets(changed, features, verbose=False), ['rf', 'mlp'])
+            assert second.groupby('position')['cached'].all().to_dict() == {'Defense': True, 'Forward': False}
+            print("✅ Only the position with changed data was retrained")
+            
+            best = orchestrator.best(second)
+            model = orchestrator.load_model(best['key'].iloc[0])
+            assert hasattr(model['model'], 'predict')
+            print("✅ Cached models load back")
+        
+        return True
+        
+    except Exception as e:
+        print(f"❌ Model training error: {type(e).__name__}: {e}")
+        return False
+
+def test_feature_store():
+    """Test the versioned per-90 feature store"""
+    print("\n🧪 Testing feature store...")
+    
+    try:
+        import tempfile
+        import warnings
+        import numpy as np
+        import pandas as pd
+        from feature_store import FeatureStore
+        
+        sample_data = pd.DataFrame({
+            'Player': ['A', 'B', 'A', 'B', 'A', 'C'],
+            'Date': pd.to_datetime(['2024-01-01', '2024-01-01', '2024-01-08', '2024-01-08', '2024-01-15', '2024-01-15']),
+            'Position_Group': ['Forward', 'Defense', 'Forward', 'Defense', 'Forward', 'Forward'],
+            'Min': [90.0, 45.0, 0.0, 90.0, 30.0, 90.0],
+            ' Gls': [1.0, 0.0, 0.0, 0.0, 1.0, 2.0],
+            ' Int': [0.0, 2.0, 0.0, 1.0, 0.0, 0.0],
+            'Rebalanced_Score': [5.0, 3.0, 0.0, 4.0, 6.0, 8.0]
+        })
+        features = {'Forward': ['Gls_Per90'], 'Defense': ['Int_Per90']}
+        
+        with tempfile.TemporaryDirectory() as tmp:
+            store = FeatureStore(tmp, stats=[' Gls', ' Int'], position_features=features, windows=[2], verbose=False)
+            built = store.get(sample_data)
+            loaded = store.get(sample_data)
+            assert isinstance(loaded.values, np.memmap) and loaded.version == built.version
+            
+            forward = loaded.frame('Forward')
+            assert list(forward.index) == [0, 2, 4, 5]
+            assert np.allclose(forward['Gls_Per90'], [1.0, 0.0, 3.0, 2.0])
+            assert np.allclose(forward['Gls_Per90_Roll2'], [0.0, 1.0, 0.5, 0.0])
+            assert np.shares_memory(loaded.matrix('Forward', ['Gls_Per90']), loaded.values)
+            print("✅ Per-90 and rolling features served as views of the stored matrix")
+            
+            changed = sample_data.assign(Min=sample_data['Min'].replace(30.0, 45.0))
+            assert store.data_version(changed) != built.version
+            print("✅ Changed data gets a new feature version")
+            
+            # Configured names with stray spaces still find their columns; absent ones are reported
+            spaced = sample_data.rename(columns={' Gls': 'Gls'}).assign(**{'Take-Ons Succ': 1.0, 'Err': 2.0})
+            store = FeatureStore(tmp, stats=[' Gls', 'Take-Ons Succ', ' KP'], windows=[], verbose=False,
+                                 position_features={'Forward': ['Gls_Per90', 'TakeOnsSucc_Per90', 'KP_Per90'],
+                                                    'Goalkeeper': [' Err']})
+            with warnings.catch_warnings(record=True) as caught:
+                warnings.simplefilter('always')
+                matrix = store.compute(spaced)
+            assert matrix.columns[:3] == ['Gls_Per90', 'TakeOnsSucc_Per90', ' Err']
+            assert np.allclose(matrix.frame('Forward')['Gls_Per90'], [1.0, 0.0, 3.0, 2.0])
+            assert len(caught) == 1 and 'KP_Per90' in str(caught[0].message)
+            assert 'Gls' in store._input_columns(spaced)
+            print("✅ Stat columns matched ignoring whitespace, missing features warned about")
+        
+        return True
+        
+    except Exception as e:
+        print(f"❌ Feature store error: {type(e).__name__}: {e}")
+        return False
+
+def test_explanation_cache():
+    """Test the cached, incremental SHAP explanations"""
+    print("\n🧪 Testing explanation cache...")
+    
+    try:
+        import tempfile
+        import numpy as np
+        import pandas as pd
+        from sklearn.ensemble import RandomForestRegressor
+        from sklearn.linear_model import Ridge
+        from sklearn.preprocessing import StandardScaler
+        from explanation_cache import ExplanationCache, add_summary_figures
+        from report_renderer import ReportRenderer
+        
+        np.random.seed(5)
+        X = pd.DataFrame(np.random.rand(80, 3), columns=['a', 'b', 'c'])
+        y = 2 * X['a'] - X['b']
+        model = RandomForestRegressor(n_estimators=10, max_depth=4, random_state=0).fit(X, y)
+        
+        with tempfile.TemporaryDirectory() as tmp:
+            cache = ExplanationCache(os.path.join(tmp, 'shap'), verbose=False)
+            first = cache.explain(model, X.iloc[:50])
+            assert np.allclose(first.values.sum(axis=1) + first.base_values, model.predict(X.iloc[:50]))
+            
+            # Fresh cache object: values come from disk, only the 30 new rows are explained
+            cache = ExplanationCache(os.path.join(tmp, 'shap'), verbose=False)
+            calls = []
+            explainer = cache.explainer(model)
+            original = explainer.explain
+            explainer.explain = lambda rows, *args: calls.append(len(rows)) or original(rows, *args)
+            grown = cache.explain(model, X)
+            assert calls == [30] and np.allclose(grown.values[:50], first.values)
+            print("✅ Only new rows were explained")
+            
+            # Kernel models: the background is part of the key and rows are seeded by their hash
+            scaler = StandardScaler().fit(X.to_numpy())
+            ridge = Ridge().fit(scaler.transform(X), y)
+            background = X.iloc[:30]
+            cache = ExplanationCache(os.path.join(tmp, 'shap'), clusters=5, nsamples=40, verbose=False)
+            head = cache.explain(ridge, X.iloc[30:50], scaler, background=background)
+            calls = []
+            explainer = cache.explainer(ridge, scaler, background)
+            original = explainer.explain
+            explainer.explain = lambda rows, *args: calls.append(len(rows)) or original(rows, *args)
+            tail = cache.explain(ridge, X.iloc[30:], scaler, background=background)
+            fresh = ExplanationCache(os.path.join(tmp, 'shap_fresh'), clusters=5, nsamples=40,
+                                     verbose=False).explain(ridge, X.iloc[30:], scaler, background=background)
+            assert calls == [30] and np.allclose(tail.values[:20], head.values)
+            assert np.allclose(tail.values, fresh.values) and np.allclose(tail.base_values, fresh.base_values)
+            assert cache.explainer_key(ridge, scaler, X.iloc[:40]) != cache.explainer_key(ridge, scaler, background)
+            cache.explain(ridge, X.iloc[30:50], scaler)
+            default_grown = cache.explain(ridge, X.iloc[30:], scaler)
+            assert len(np.unique(default_grown.base_values)) == 1
+            print("✅ Kernel explanations keyed by background and deterministic per row")
+            
+            renderer = ReportRenderer(os.path.join(tmp, 'figures'), workers=1, verbose=False)
+            add_summary_figures(renderer, grown)
+            assert sorted(renderer.render()['rendered']) == ['shap_summary_bar', 'shap_summary_dot']
+            print("✅ Summary plots drawn from the cached values")
+        
+        return True
+        
+    except Exception as e:
+        print(f"❌ Explanation cache error: {type(e).__name__}: {e}")
+        return False
+
+def test_form_engine():
+    """Test the vectorized form series and incremental updates"""
+    print("\n🧪 Testing form engine...")
+    
+    try:
+        import numpy as np
+        import pandas as pd
+        from form_engine import FormEngine
+        
+        np.random.seed(6)
+        df = pd.DataFrame({
+            'Player': np.random.choice(['A', 'B', 'C', 'D'], 120),
+            'Date': pd.Timestamp('2024-08-01') + pd.to_timedelta(np.random.permutation(120) * 3, unit='D'),
+            'Position_Group': np.random.choice(['Forward', 'Midfield'], 120),
+            'Rebalanced_Score': np.random.rand(120) * 10,
+        })
+        engine = FormEngine(df)
+        rows = df.sort_values(['Player', 'Date'])
+        scores = rows.groupby('Player')['Rebalanced_Score']
+        series = engine.series().loc[rows.index]
+        assert np.allclose(series['Cumulative_Score'], scores.cumsum())
+        assert np.allclose(series['Rolling_3'], scores.transform(lambda s: s.rolling(3, min_periods=1).mean()))
+        assert np.allclose(series['EWM_Score'], scores.transform(lambda s: s.ewm(span=5).mean()))
+        print("✅ Series match pandas cumsum, rolling and ewm")
+        
+        ordered = df.sort_values('Date')
+        updated = FormEngine(ordered.iloc[:90])
+        updated.update(ordered.iloc[90:])
+        columns = ['Match_Number', 'Cumulative_Score', 'Rolling_3', 'Rolling_5', 'EWM_Score']
+        assert np.allclose(updated.series().sort_index()[columns], engine.series().sort_index()[columns])
+        print("✅ Incremental update matches a full build")
+        
+        # Back-dated rows with a fresh index overlapping the existing labels take the recompute path
+        recomputed = FormEngine(ordered.iloc[:90])
+        late = ordered.iloc[90:].copy()
+        late['Date'] = late['Date'] - pd.Timedelta(days=400)
+        appended = recomputed.update(late.reset_index(drop=True))
+        fast = FormEngine(ordered.iloc[:90]).update(ordered.iloc[90:])
+        assert len(appended) == len(late) and list(appended.columns) == list(fast.columns)
+        full = FormEngine(pd.concat([ordered.iloc[:90], late], ignore_index=True)).series()
+        keys = ['Player', 'Date', 'Rebalanced_Score']
+        expected = full.loc[full.index >= 90].sort_values(keys)
+        assert np.allclose(appended.sort_values(keys)[columns], expected[columns])
+        assert len(recomputed.series()) == len(df) and '_new' not in recomputed.series().columns
+        print("✅ Back-dated update returns only the new rows")
+        
+        dashboard = engine.dashboard(weeks=60, top=None, min_games=1)
+        assert set(dashboard['Forward']['Player']) == set(df.loc[df['Position_Group'] == 'Forward', 'Player'])
+        print("✅ Dashboard covers the full roster")
+        
+        return True
+        
+    except Exception as e:
+        print(f"❌ Form engine error: {type(e).__name__}: {e}")
+        return False
+
+def test_prediction_service():
+    """Test the buffered prediction service and its HTTP endpoint"""
+    print("\n🧪 Testing prediction service...")
+    
+    try:
+        import json
+        import tempfile
+        import pickle
+        import urllib.request
+        import numpy as np
+        from sklearn.ensemble import RandomForestRegressor, GradientBoostingRegressor, VotingRegressor
+        from sklearn.neural_network import MLPRegressor
+        from sklearn.preprocessing import StandardScaler
+        from prediction_service import PredictionService, serve
+        
+        np.random.seed(7)
+        X = np.random.rand(200, 4)
+        y = X @ np.array([3.0, -1.0, 2.0, 0.5])
+        features = ['a', 'b', 'c', 'd']
+        models = [
+            RandomForestRegressor(n_estimators=20, max_depth=5, random_state=0).fit(X, y),
+            VotingRegressor([('rf', RandomForestRegressor(n_estimators=10, random_state=0)),
+                             ('gb', GradientBoostingRegressor(n_estimators=20, random_state=0))]).fit(X, y),
+        ]
+        for model in models:
+            service = PredictionService(model, features, max_batch=64)
+            assert np.allclose(service.predict(X), model.predict(X))
+        scaler = StandardScaler().fit(X)
+        mlp = MLPRegressor(hidden_layer_sizes=(8,), max_iter=200, random_state=0).fit(scaler.transform(X), y)
+        service = PredictionService(mlp, features, scaler)
+        assert np.allclose(service.predict(X), mlp.predict(scaler.transform(X)))
+        print("✅ Batched predictions match model.predict")
+        
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'model.pkl')
+            with open(path, 'wb') as handle:
+                pickle.dump({'model': models[0], 'scaler': None, 'result': {'position': 'Forward'}}, handle)
+            service = PredictionService.from_file(path, features)
+        expected = models[0].predict(X[:1])[0]
+        assert np.isclose(service.predict_one(X[0]), expected)
+        assert np.isclose(service.predict_one(dict(zip(features, X[0]))), expected)
+        stats = service.stats()
+        assert stats['calls'] == 2 and stats['p99_ms'] >= stats['p50_ms'] > 0
+        print(f"✅ Single-row scoring: p50 {stats['p50_row_ms']:.3f} ms/row")
+        
+        server = serve({'Forward': service}, port=0, block=False)
+        try:
+            url = f"http://127.0.0.1:{server.server_address[1]}/predict/Forward"
+            body = json.dumps({'rows': X[:3].tolist()}).encode()
+            reply = json.load(urllib.request.urlopen(urllib.request.Request(url, data=body, method='POST')))
+            assert np.allclose(reply['predictions'], models[0].predict(X[:3]))
+        finally:
+            server.shutdown()
+            server.server_close()
+        print("✅ HTTP endpoint returns the same predictions")
+        
+        return True
+        
+    except Exception as e:
+        print(f"❌ Prediction service error: {type(e).__name__}: {e}")
+        return False
+
+def test_benchmarks():
+    """Test the stage benchmark harness and report comparison"""
+    print("\n🧪 Testing benchmarks...")
+    
+    try:
+        import tempfile
+        import pandas as pd
+        from benchmarks import make_synthetic_matches, run_benchmarks, load_benchmark, compare_benchmarks
+        from data_cache import COMBINED_DATA_PATH
+        
+        if not COMBINED_DATA_PATH.exists():
+            print("⚠️ Combined match file not found, skipping")
+            return True
+        
+        base = pd.read_csv(COMBINED_DATA_PATH)
+        synthetic = make_synthetic_matches(2.5)
+        assert len(synthetic) == round(2.5 * len(base)) and list(synthetic.columns) == list(base.columns)
+        assert synthetic['Player'].str.startswith('C02 ').any()
+        print(f"✅ Synthetic league keeps the schema ({synthetic.shape[1]} columns)")
+        
+        with tempfile.TemporaryDirectory() as tmp:
+            stages = ['load', 'clean', 'per90', 'score', 'correlation_vif']
+            report = run_benchmarks((0.1,), stages=stages[1:], output_dir=tmp, verbose=False)
+            assert [row['stage'] for row in report['results']] == stages[1:]
+            assert all(row['seconds'] > 0 and row['error'] is None for row in report['results'])
+            saved = load_benchmark(report['path'])
+            assert saved['results'] == report['results']
+            print(f"✅ Stages timed and saved ({len(saved['results'])} results)")
+            
+            comparison = compare_benchmarks(saved, report, verbose=False)
+            assert len(comparison) == 4 and (comparison['ratio'] == 1).all()
+            print("✅ Reports compared stage by stage")
+        
+        return True
+        
+    except Exception as e:
+        print(f"❌ Benchmarks error: {type(e).__name__}: {e}")
+        return False
+
+def test_tracing():
+    """Test the stage tracing layer"""
+    print("\n🧪 Testing tracing...")
+    
+    try:
+        import json
+        import tempfile
+        import numpy as np
+        import pandas as pd
+        from tracing import active_tracer, stage, traced, tracing
+        
+        @traced
+        def build(n):
+            with stage('inner') as record:
+                record['rows'] = n
+            return pd.DataFrame({'x': np.arange(n)})
+        
+        # Disabled: plain calls, nothing recorded
+        assert active_tracer() is None and len(build(5)) == 5
+        
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'trace.jsonl')
+            with tracing(path, profile=True, verbose=False) as tracer:
+                build(100)
+                build(1000)
+            assert active_tracer() is None
+            with open(path) as handle:
+                records = [json.loads(line) for line in handle]
+            assert [r['name'] for r in records] == ['inner', 'test_tracing.<locals>.build'] * 2
+            outer = records[-1]
+            assert outer['rows'] == 1000 and outer['depth'] == 0 and records[-2]['parent'] == outer['name']
+            assert outer['wall_s'] >= 0 and outer['cpu_s'] >= 0 and 'peak_rss_delta_mb' in outer
+            assert os.path.exists(os.path.join(tmp, 'profile_test_tracing._locals_.build.prof'))
+            assert tracer.summary()['name'].iloc[0] in {r['name'] for r in records}
+            print(f"✅ JSON lines trace with {len(records)} stages and a profile dump")
+            
+            chrome_path = os.path.join(tmp, 'trace.json')
+            with tracing(chrome_path, verbose=False):
+                build(10)
+            with open(chrome_path) as handle:
+                events = json.load(handle)['traceEvents']
+            assert len(events) == 2 and all(e['ph'] == 'X' for e in events)
+            print("✅ Chrome trace written")
+        
+        return True
+        
+    except Exception as e:
+        print(f"❌ Tracing error: {type(e).__name__}: {e}")
+        return False
+
+def test_cli():
+    """Test the rm-analysis command line entry point"""
+    print("\n🧪 Testing rm-analysis CLI...")
+    
+    try:
+        import json
+        import subprocess
+        import tempfile
+        import time
+        
+        script = os.path.join('scripts', 'rm-analysis')
+        start = time.perf_counter()
+        result = subprocess.run([sys.executable, script, '--help'], capture_output=True, text=True, timeout=60)
+        elapsed = time.perf_counter() - start
+        assert result.returncode == 0 and 'forecast' in result.stdout
+        print(f"✅ --help in {elapsed * 1000:.0f} ms")
+        
+        # Lightweight commands must not load the data stack
+        with tempfile.TemporaryDirectory() as tmp:
+            with open(os.path.join(tmp, 'eda_state.json'), 'w') as handle:
+                json.dump({'seasons': {'23_24': {'rows': 3, 'position_counts': {'FW': 2, 'GK': 1}, 'year_counts': {}},
+                                       '24_25': {'rows': 2, 'position_counts': {'FW': 1, 'CB': 1}, 'year_counts': {}}},
+                           'updated_at': '2025-01-01T00:00:00'}, handle)
+            check = ("import sys, json; from rm_analysis import cached_summary, main; "
+                     f"main(['status', '--cache-folder', {tmp!r}]); "
+                     f"print(json.dumps({{'summary': cached_summary(__import__('pathlib').Path({tmp!r})), "
+                     "'heavy': [m for m in ('pandas', 'numpy', 'matplotlib') if m in sys.modules]}))")
+            result = subprocess.run([sys.executable, '-c', check], capture_output=True, text=True, timeout=60,
+                                    cwd='Main Notebook/Other material Folder')
+            output = json.loads(result.stdout.strip().splitlines()[-1])
+            summary = output['summary']
+            assert summary['rows'] == 5 and summary['positions'] == {'FW': 3, 'GK': 1, 'CB': 1}
+            assert result.returncode == 0 and output['heavy'] == []
+            print("✅ summary/status from cached aggregates without pandas/NumPy/matplotlib")
+        
+        result = subprocess.run([sys.executable, script, 'status', '--bogus'], capture_output=True, text=True, timeout=60)
+        assert result.returncode == 2
+        print("✅ Unknown options rejected")
+        
+        return True
+        
+    except Exception as e:
+        print(f"❌ CLI error: {type(e).__name__}: {e}")
+        return False
+
+def test_multicollinearity():
+    """Test the vectorized VIF routines against statsmodels"""
+    print("\n🧪 Testing multicollinearity analysis...")
+    
+    try:
+        import tempfile
+        import numpy as np
+        import pandas as pd
+        from statsmodels.stats.outliers_influence import variance_inflation_factor
+        from multicollinearity import drop_high_vif, multicollinearity_by_position, variance_inflation_factors
+        
+        np.random.seed(42)
+        values = np.random.normal(size=(200, 5)) + 3
+        values[:, 4] = 2 * values[:, 0] + values[:, 1] + np.random.normal(scale=0.1, size=200)
+        for standardize in (True, False):
+            expected = [variance_inflation_factor(values, i, standardize=standardize) for i in range(5)]
+            assert np.allclose(variance_inflation_factors(values, standardize), expected, rtol=1e-8)
+        print("✅ All VIFs from one inverse match statsmodels")
+        
+        # Exact dependency: pseudo-inverse for the others, clipped maximum inside it
+        singular = np.column_stack([values, values[:, 2] + values[:, 3]])
+        vif = variance_inflation_factors(singular)
+        assert np.allclose(vif[[0, 1, 4]], [variance_inflation_factor(values, i) for i in (0, 1, 4)])
+        assert np.allclose(vif[[2, 3, 5]], 1e15, rtol=1e-2)
+        assert np.isfinite(variance_inflation_factors(singular, ridge=0.1)).all()
+        
+        frame = pd.DataFrame(singular, columns=list('abcdef'))
+        result = drop_high_vif(frame, threshold=5)
+        assert list(result['dropped']['Metric']) == ['f', 'e']
+        kept = frame[result['selected']].to_numpy()
+        expected = [variance_inflation_factor(kept, i) for i in range(kept.shape[1])]
+        assert np.allclose(result['vif']['VIF'], expected) and (result['vif']['VIF'] <= 5).all()
+        print("✅ Singular sets and incremental drop-highest-VIF selection")
+        
+        df = frame.assign(Pos=np.random.choice(['FW', 'CB', 'FW,RM'], 200))
+        with tempfile.TemporaryDirectory() as tmp:
+            results = multicollinearity_by_position(df, positions=['Forward', 'Defender'],
+                                                    metrics_by_position={'Forward': list('abcde'),
+                                                                         'Defender': list('abc')},
+                                                    output_dir=tmp, verbose=False)
+            written = pd.read_csv(os.path.join(tmp, 'vif_forward.csv'))
+            assert list(written.columns) == ['Metric', 'VIF', 'Status']
+            assert 'Severe (>10)' in set(written['Status'])
+            assert os.path.exists(os.path.join(tmp, 'corr_pairs_forward.csv'))
+            assert results['Defender']['vif']['Status'].eq('OK').all()
+        print("✅ Per-position VIF and correlation-pair CSVs written")
+        
+        return True
+        
+    except Exception as e:
+        print(f"❌ Multicollinearity error: {type(e).__name__}: {e}")
+        return False
+
+def test_player_index():
+    """Test the indexed player/match lookup layer"""
+    print("\n🧪 Testing player index...")
+    
+    try:
+        import numpy as np
+        import pandas as pd
+        from player_index import PlayerIndex
+        
+        np.random.seed(42)
+        n = 400
+        sample_data = pd.DataFrame({
+            'Player': np.random.choice(['Luka Modrić', 'Jude Bellingham', 'Thibaut Courtois', 'Andriy Lunin'], n),
+            'Date': pd.Timestamp('2023-08-01') + pd.to_timedelta(np.random.randint(0, 600, n), unit='D'),
+            'Pos': np.random.choice(['CM', 'AM,FW', 'GK', 'DM'], n),
+            'Min': np.random.randint(1, 91, n),
+            'Match URL': [f"https://fbref.com/en/matches/{i % 60:08x}/x" for i in range(n)],
+            ' Gls': np.random.poisson(0.3, n).astype(float),
+            'Passes Cmp%': np.random.uniform(60, 95, n)
+        })
+        sample_data['Season'] = np.where(sample_data['Date'] < '2024-07-01', '23_24', '24_25')
+        sample_data.loc[::9, ' Gls'] = np.nan
+        
+        index = PlayerIndex(sample_data, min_minutes=0)
+        rows = index.player_rows('modric')
+        expected = sample_data[sample_data['Player'] == 'Luka Modrić'].sort_values('Date', kind='stable')
+        assert rows.index.equals(expected.index)
+        window = index.player_rows('Luka Modrić', start='2024-01-01', end='2024-03-31')
+        assert window['Date'].between('2024-01-01', '2024-03-31').all()
+        assert len(window) == expected['Date'].between('2024-01-01', '2024-03-31').sum()
+        url = sample_data['Match URL'].iloc[5]
+        assert len(index.match_rows(url)) == (sample_data['Match URL'] == url).sum()
+        gk = index.season_position_rows('23_24', 'Goalkeeper')
+        assert len(gk) == ((sample_data['Season'] == '23_24') & (sample_data['Pos'] == 'GK')).sum()
+        print("✅ Player ranges, date windows, match and season/position rows")
+        
+        season = expected[expected['Season'] == '24_25']
+        aggregates = index.season_aggregates('Luka Modrić', '24_25')
+        assert aggregates['Matches'] == len(season) and aggregates['Minutes'] == season['Min'].sum()
+        assert np.isclose(aggregates[' Gls'], season[' Gls'].mean())
+        played = season[' Gls'].notna()
+        per90 = index.per90_profile('Luka Modrić', '24_25')
+        assert np.isclose(per90[' Gls'], season[' Gls'].sum() / season.loc[played, 'Min'].sum() * 90)
+        assert np.isclose(per90['Passes Cmp%'], season['Passes Cmp%'].mean())
+        print("✅ Season aggregates and per-90 profiles match pandas")
+        
+        ranks = index.percentiles('Luka Modrić', 'MF', '24_25')
+        assert ranks.between(0, 100).all()
+        comparison = index.compare(['Courtois', 'Lunin'], 'GK')
+        assert list(comparison['Percentile'].columns) == ['Thibaut Courtois', 'Andriy Lunin']
+        assert comparison['Normalized'].stack().between(0, 100).all()
+        try:
+            index.resolve('Lu')
+            raise AssertionError("ambiguous name resolved")
+        except KeyError:
+            pass
+        print("✅ Percentile ranks and radar comparison")
+        
+        return True
+        
+    except Exception as e:
+        print(f"❌ Player index error: {type(e).__name__}: {e}")
+        return False
+
+def _fbref_fixture_pages(n_matches):
+    """Build a saved-page layout mimicking FBref for offline ingestion tests"""
+    links = ''.join(
+        f'<tr><td><a href="/en/matches/m{i}/Real-Madrid-Team{i}-August-{i + 1}-2024-La-Liga">Match Report</a></td></tr>'
+        for i in range(n_matches)
+    )
+    pages = {'/schedule': f'<html><body><table id="matchlogs_for">{links}</table></body></html>'}
+    for i in range(n_matches):
+        table = (
+            '<table id="stats_53a2f082_summary"><thead>'
+            '<tr><th></th><th></th><th colspan="2">Performance</th></tr>'
+            '<tr><th>Player</th><th>Min</th><th>Gls</th><th>Ast</th></tr></thead><tbody>'
+            f'<tr><td>Vinicius Junior</td><td>90</td><td>{i}</td><td>1</td></tr>'
+            '<tr><td>Jude Bellingham</td><td>85</td><td>0</td><td>0</td></tr>'
+            '</tbody></table>'
+        )
+        pages[f'/en/matches/m{i}/Real-Madrid-Team{i}-August-{i + 1}-2024-La-Liga'] = (
+            f'<html><body><h1>Real Madrid vs Team{i} Match Report</h1>{table}</body></html>'
+        )
+    return pages
+
+def test_fbref_ingest():
+    """Test incremental FBref ingestion against a local stand-in server"""
+    print("\n🧪 Testing incremental FBref ingestion...")
+    
+    try:
+        import tempfile
+        import threading
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+        from fbref_ingest import FBrefIngestor
+        
+        served = {'pages': _fbref_fixture_pages(2), 'requests': []}
+        
+        class FixtureHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                served['requests'].append(self.path)
+                body = served['pages'].get(self.path)
+                self.send_response(200 if body else 404)
+                self.end_headers()
+                if body:
+                    self.wfile.write(body.encode('utf-8'))
+            
+            def log_message(self, *args):
+                pass
+        
+        server = ThreadingHTTPServer(('127.0.0.1', 0), FixtureHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        base_url = f"http://127.0.0.1:{server.server_address[1]}"
+        
+        try:
+            with tempfile.TemporaryDirectory() as store_dir:
+                options = dict(base_url=base_url, min_interval=0, jitter=0, backoff=0, max_retries=2)
+                
+                first = FBrefIngestor(store_dir, **options).ingest_season(base_url + '/schedule')
+                assert first['Match URL'].nunique() == 2
+                assert 'Performance Gls' in first.columns
+                print("✅ Initial crawl ingested 2 matches")
+                
+                # A new matchday appears: only that match is downloaded
+                served['pages'] = _fbref_fixture_pages(3)
+                served['requests'].clear()
+                ingestor = FBrefIngestor(store_dir, **options)
+                new_rows = ingestor.ingest_season(base_url + '/schedule')
+                match_requests = [p for p in served['requests'] if p.startswith('/en/matches/')]
+                assert new_rows['Match URL'].nunique() == 1 and len(match_requests) == 1
+                assert ingestor.load_table()['Match URL'].nunique() == 3
+                print("✅ Refresh fetched only the new match")
+        finally:
+            server.shutdown()
+        
+        return True
+        
+    except Exception as e:
+        print(f"❌ FBref ingestion error: {e}")
+        return False
+
+def _fbref_match_page(home='Real Madrid', away='Mallorca', ids=('53a2f082', '2aa12281')):
+    """Build a saved-page layout mimicking an FBref match report with both teams' stats tables"""
+    specs = {
+        'summary': [('', ['Player', '#', 'Nation', 'Pos', 'Min']), ('Performance', ['Gls', 'Ast']),
+                    ('Expected', ['xG'])],
+        'passing': [('', ['Player', 'Min']), ('Total', ['Cmp', 'Att', 'Cmp%']), ('', ['KP'])],
+        'defense': [('', ['Player']), ('Tackles', ['Tkl', 'TklW']), ('Challenges', ['Tkl%']), ('', ['Int'])],
+        'possession': [('', ['Player']), ('Take-Ons', ['Att', 'Succ'])],
+    }
+    players = {ids[0]: ['Vinícius Júnior', 'Jude Bellingham', 'Thibaut Courtois'],
+               ids[1]: ['Vedat Muriqi', 'Dominik Greif']}
+    names = dict(zip(ids, (home, away)))
+    tables = []
+    for t, team_id in enumerate(ids):
+        for stat, groups in specs.items():
+            over = ''.join(f'<th colspan="{len(cols)}">{label}</th>' for label, cols in groups)
+            cols = [col for _, group in groups for col in group]
+            head = ''.join(f'<th>{col}</th>' for col in cols)
+            rows = []
+            for p, player in enumerate(players[team_id]):
+                cells = []
+                for col in cols:
+                    if col == 'Player':
+                        cells.append(f'<th data-stat="player"><a href="/p{p}">{player}</a></th>')
+                    elif col == 'Nation':
+                        cells.append('<td><a><span class="f-i">es</span> ESP</a></td>')
+                    elif col == 'Pos':
+                        cells.append('<td>FW,LW</td>' if p == 0 else '<td>GK</td>')
+                    elif col == 'Cmp%':
+                        cells.append(f'<td>{80 + p + t}.5</td>')
+                    elif col == 'Tkl%':
+                        cells.append('<td></td>' if p == 1 else f'<td>{50 + p}.0</td>')
+                    elif col == 'Att' and stat == 'passing':
+                        cells.append(f'<td>1,{p}0{t}</td>')
+                    else:
+                        cells.append(f'<td>{(p + t + len(col)) % 4}</td>')
+                rows.append('<tr>' + ''.join(cells) + '</tr>')
+                if p == 0:
+                    rows.append('<tr class="thead"><th>Player</th></tr>')
+            foot = f'<tfoot><tr><th>{len(players[team_id])} Players</th></tr></tfoot>'
+            table = (f'<table id="stats_{team_id}_{stat}"><caption>{names[team_id]} Player Stats Table</caption>'
+                     f'<thead><tr class="over_header">{over}</tr><tr>{head}</tr></thead>'
+                     f'<tbody>{"".join(rows)}</tbody>{foot}</table>')
+            # FBref ships some tables inside HTML comments
+            tables.append(f'<div><!--\n{table}\n--></div>' if stat == 'possession' else table)
+    return ('<html><body><h1>Real Madrid vs Mallorca Match Report</h1>'
+            '<div class="scorebox_meta"><div><span class="venuetime" data-venue-date="2024-08-18">'
+            '<time datetime="2024-08-18">Sunday August 18, 2024</time></span></div></div>'
+            f'{"".join(tables)}</body></html>')
+
+def test_fbref_extraction():
+    """Test single-parse multi-table extraction against a saved match page"""
+    print("\n🧪 Testing FBref match page extraction...")
+    
+    try:
+        from fbref_ingest import extract_match_tables, parse_match_page
+        
+        html = _fbref_match_page()
+        tables = ['summary', 'passing', 'defense', 'possession']
+        df = extract_match_tables(html, 'https://fbref.com/en/matches/c6b7a6e0', stat_tables=tables)
+        assert len(df) == 5 and set(df['Team']) == {'Real Madrid', 'Mallorca'}
+        assert not df['Player'].isin(['Player', '3 Players']).any()
+        for col in ['Performance Gls', 'Total Cmp%', 'Tackles TklW', 'Challenges Tkl%', 'Take-Ons Succ']:
+            assert col in df.columns
+        print("✅ Every table of both teams from one parse, headers flattened")
+        
+        vini = df.set_index('Player').loc['Vinícius Júnior']
+        assert vini['Nation'] == 'es ESP' and vini['Pos'] == 'FW,LW' and vini['Total Att'] == 1000
+        assert vini['Opponent'] == 'Mallorca' and vini['Date'] == '2024-08-18'
+        assert df['Challenges Tkl%'].isna().sum() == 2 and df['Performance Gls'].dtype.kind == 'i'
+        print("✅ Values, blanks, thousands separators and commented tables")
+        
+        madrid = parse_match_page(html, 'https://fbref.com/en/matches/c6b7a6e0')
+        assert len(madrid) == 3 and 'Team' not in madrid.columns and 'Tackles Tkl' in madrid.columns
+        print("✅ Single-team parse keeps the notebook layout")
+        
+        return True
+        
+    except Exception as e:
+        print(f"❌ FBref extraction error: {type(e).__name__}: {e}")
+        return False
+
+def test_backtesting():
+    """Test the walk-forward backtesting engine"""
+    print("\n🧪 Testing walk-forward backtesting...")
+    
+    try:
+        import tempfile
+        import numpy as np
+        import pandas as pd
+        from backtesting import WalkForwardBacktester, walk_forward_folds, prefix_moments, slice_scaler
+        
+        units = np.repeat(np.arange(10), 5)
+        folds = walk_forward_folds(units, min_train_units=4, test_units=2, min_train_rows=1)
+        assert folds == [(0, 20, 20, 30), (0, 30, 30, 40), (0, 40, 40, 50)]
+        sliding = walk_forward_folds(units, min_train_units=4, test_units=2, window='sliding', min_train_rows=1)
+        assert sliding[1] == (10, 30, 30, 40)
+        X = np.random.RandomState(0).normal(size=(50, 3))
+        mean, scale = slice_scaler(*prefix_moments(X), 10, 30)
+        assert np.allclose(mean, X[10:30].mean(axis=0)) and np.allclose(scale, X[10:30].std(axis=0))
+        print("✅ Expanding/sliding fold bounds and prefix-sum scaling")
+        
+        np.random.seed(42)
+        n = 300
+        sample_data = pd.DataFrame({
+            'Date': pd.Timestamp('2023-08-01') + pd.to_timedelta(np.sort(np.random.randint(0, 280, n)), unit='D'),
+            'Season': '23_24',
+            'Position_Group': 'Forward',
+            'Gls': np.random.poisson(0.4, n).astype(float),
+            'Sh': np.random.poisson(2.0, n).astype(float),
+            'xG': np.random.uniform(0, 1, n)
+        })
+        sample_data['Rebalanced_Score'] = 3 * sample_data['Gls'] + sample_data['xG'] + np.random.normal(0, 0.1, n)
+        sample_data = sample_data.sample(frac=1, random_state=0)
+        features = {'Forward': ['Gls', 'Sh', 'xG']}
+        
+        with tempfile.TemporaryDirectory() as cache_dir:
+            backtester = WalkForwardBacktester(min_train_units=20, test_units=5, trees_per_fold=5,
+                                               cache_dir=cache_dir, cpu_budget=1, verbose=False)
+            results = backtester.run(sample_data, models=('rf', 'mlp'), features=features)
+            assert set(results['model']) == {'rf', 'mlp'} and len(results) > 4
+            assert (results['train_end'] < results['test_start']).all()
+            rf = results[results['model'] == 'rf']
+            assert rf['warm_start'].all() and rf['trees'].is_monotonic_increasing
+            assert not results.loc[results['model'] == 'mlp', 'warm_start'].any()
+            oof = backtester.predictions[backtester.predictions['model'] == 'rf']
+            assert oof.index.isin(sample_data.index).all() and not oof.index.duplicated().any()
+            print("✅ Warm-started and refitted folds train only on past matches")
+            
+            again = backtester.run(sample_data, models=('rf', 'mlp'), features=features)
+            assert again['cached'].all()
+            assert np.allclose(again['r2'], results['r2'], equal_nan=True)
+            summary = backtester.summary()
+            assert summary.loc[summary['model'] == 'rf', 'oof_r2'].iloc[0] > 0.5
+            print("✅ Cached chains reload with identical metrics")
+        
+        return True
+        
+    except Exception as e:
+        print(f"❌ Backtesting error: {type(e).__name__}: {e}")
+        return False
+
+
+def test_similarity():
+    """Test the similar-player nearest-neighbour index"""
+    print("\n🧪 Testing similarity index...")
+    
+    try:
+        import tempfile
+        import numpy as np
+        import pandas as pd
+        from player_index import PlayerIndex
+        from similarity import SimilarityIndex, player_season_profiles
+        
+        np.random.seed(42)
+        players = [f"Player {i}" for i in range(40)]
+        n = 4000
+        sample_data = pd.DataFrame({
+            'Player': np.random.choice(players, n),
+            'Season': np.random.choice(['22_23', '23_24', '24_25'], n),
+            'Date': pd.Timestamp('2022-08-01') + pd.to_timedelta(np.random.randint(0, 900, n), unit='D'),
+            'Min': np.random.randint(45, 91, n),
+            'Gls': np.random.poisson(0.3, n).astype(float),
+            'Tkl': np.random.poisson(1.5, n).astype(float),
+            'KP': np.random.poisson(1.0, n).astype(float),
+            'Passes Cmp%': np.random.uniform(60, 95, n)
+        })
+        sample_data['Pos'] = sample_data['Player'].map(
+            dict(zip(players, np.random.choice(['FW', 'CM', 'CB', 'GK', 'AM,FW'], len(players)))))
+        index = PlayerIndex(sample_data, min_minutes=0)
+        keys, profiles = player_season_profiles(index, min_minutes=300)
+        assert (keys['Minutes'] >= 300).all() and len(keys) == len(profiles)
+        similarity = SimilarityIndex.from_player_index(index, min_minutes=300)
+        assert similarity.vectors.dtype == np.float32 and similarity.vectors.flags.c_contiguous
+        assert np.allclose(np.linalg.norm(similarity.vectors, axis=1), 1.0, atol=1e-5)
+        print("✅ Position-normalised float32 player-season profiles")
+        
+        result = similarity.similar('Player 3', k=5)
+        row = similarity.profile_row('Player 3')
+        position = similarity.keys.at[row, 'Position']
+        sims = similarity.vectors @ similarity.vectors[row]
+        allowed = (similarity.keys['Position'] == position) & (similarity.keys['Player'] != 'Player 3')
+        expected = np.sort(sims[allowed.to_numpy()])[::-1][:5]
+        assert np.allclose(result['Similarity'], expected, atol=1e-5)
+        assert (result['Position'] == position).all() and (result['Player'] != 'Player 3').all()
+        print("✅ Blocked exact search matches brute force")
+        
+        similarity.partition(n_clusters=4)
+        approximate = similarity.similar('Player 3', k=5, approximate=True, nprobe=4)
+        assert approximate['Similarity'].tolist() == result['Similarity'].tolist()
+        with tempfile.TemporaryDirectory() as store:
+            similarity.save(store)
+            loaded = SimilarityIndex.load(store)
+            assert isinstance(loaded.vectors, np.memmap) and len(loaded) == len(similarity)
+            assert loaded.similar('Player 3', k=5)['Similarity'].tolist() == result['Similarity'].tolist()
+            new_keys = keys.iloc[:2].assign(Season=['25_26', '26_27'])
+            assert loaded.add(new_keys, profiles.iloc[:2]) == 2 and len(loaded) == len(similarity) + 2
+            assert loaded.add(new_keys, profiles.iloc[:2] * 2) == 0
+            updated = loaded.vectors[-2:]
+            assert np.allclose(updated, loaded.normalize(profiles.iloc[:2].to_numpy() * 2, new_keys['Position']))
+            assert loaded.similar('Player 3', k=5, approximate=True)['Similarity'].notna().all()
+        print("✅ Approximate search, memory-mapped reload and incremental inserts")
+        
+        return True
+        
+    except Exception as e:
+        print(f"❌ Similarity error: {type(e).__name__}: {e}")
+        return False
+
+
+def test_bootstrap():
+    """Test the vectorized bootstrap confidence intervals"""
+    print("\n🧪 Testing bootstrap intervals...")
+    
+    try:
+        import numpy as np
+        import pandas as pd
+        from bootstrap import PlayerBootstrap
+        
+        np.random.seed(42)
+        appearances = {'Regular': 40, 'Rotation': 12, 'Cameo': 3, 'One-off': 1, 'Keeper A': 30, 'Keeper B': 5}
+        rows = []
+        for player, n in appearances.items():
+            group = 'Goalkeeper' if player.startswith('Keeper') else 'Forward'
+            for _ in range(n):
+                rows.append({'Player': player, 'Position_Group': group, 'Min': np.random.randint(30, 91),
+                             ' Gls': np.random.poisson(0.4), 'Rebalanced_Score': np.random.normal(5, 2)})
+        sample_data = pd.DataFrame(rows).sample(frac=1, random_state=0)
+        
+        bootstrap = PlayerBootstrap(sample_data, rate_stats=[' Gls']).run(2000, seed=7)
+        scores = bootstrap.score_intervals().set_index('Player')
+        expected = sample_data.groupby('Player')['Rebalanced_Score'].mean()
+        assert np.allclose(scores['Mean'].loc[expected.index], expected)
+        assert (scores['CI_Low'] <= scores['Mean'] + 1e-5).all() and (scores['Mean'] <= scores['CI_High'] + 1e-5).all()
+        width = scores['CI_High'] - scores['CI_Low']
+        assert width['Cameo'] > width['Regular'] and width['One-off'] < 1e-5
+        rates = bootstrap.rate_intervals().set_index(('Player', ''))
+        goals = sample_data.groupby('Player')[' Gls'].sum() / sample_data.groupby('Player')['Min'].sum() * 90
+        assert np.allclose(rates[(' Gls', 'Per90')].loc[goals.index], goals)
+        print("✅ Score and per-90 intervals around the observed values")
+        
+        ranks = bootstrap.rank_intervals(top_n=2).set_index('Player')
+        assert ranks.loc['Keeper A', 'Rank_High'] <= 2 and ranks['Rank_Low'].min() == 1
+        assert ranks['P_Top2'].between(0, 1).all()
+        assert np.isclose(ranks.loc[['Keeper A', 'Keeper B'], 'P_Top2'].sum(), 2.0)
+        table = bootstrap.ranking('Forward', top=3)
+        assert list(table['Rank']) == [1, 2, 3]
+        print("✅ Rank intervals and top-N probabilities")
+        
+        parallel = PlayerBootstrap(sample_data, rate_stats=[' Gls']).run(2000, seed=7, n_jobs=2)
+        assert np.array_equal(parallel.samples, bootstrap.samples)
+        print("✅ Process-pool replicates match the serial run")
+        
+        return True
+        
+    except Exception as e:
+        print(f"❌ Bootstrap error: {type(e).__name__}: {e}")
+        return False
+
+
+def test_lineup():
+    """Test the starting-XI optimizer"""
+    print("\n🧪 Testing lineup optimizer...")
+    
+    try:
+        from itertools import combinations
+        import numpy as np
+        import pandas as pd
+        from lineup import LineupOptimizer, build_squad, parse_formation
+        
+        np.random.seed(42)
+        positions = ['GK', 'GK', 'CB', 'CB,RB', 'LB', 'CB', 'CM,DM', 'AM,FW', 'CM', 'DM', 'FW,RM', 'FW', 'LW,FW']
+        squad = pd.DataFrame({'Player': [f"P{i:02d}" for i in range(len(positions))], 'Pos': positions,
+                              'Score': np.random.uniform(2, 12, len(positions)).round(3)})
+        optimizer = LineupOptimizer(squad, score_col='Score')
+        formation = {'GK': 1, 'DF': 3, 'MF': 2, 'FW': 2}
+        assert parse_formation('4-2-3-1') == {'GK': 1, 'DF': 4, 'MF': 5, 'FW': 1}
+        
+        values = optimizer.score_table()
+        slots = [parse_formation(formation)[group] for group in optimizer.groups]
+        totals = []
+        
+        def fill(g, used, total):
+            if g == len(slots):
+                totals.append(total)
+                return
+            pool = [p for p in range(len(values)) if p not in used and np.isfinite(values[p, g])]
+            for chosen in combinations(pool, slots[g]):
+                fill(g + 1, used | set(chosen), total + values[list(chosen), g].sum())
+        
+        fill(0, set(), 0.0)
+        lineups = optimizer.best(formation, k=4)
+        assert np.allclose([lineup['total'] for lineup in lineups], sorted(totals, reverse=True)[:4])
+        picks = {tuple(tuple(lineup[group]) for group in optimizer.groups) for lineup in lineups}
+        assert len(picks) == 4
+        eligible = dict(zip(squad['Player'], squad['Pos']))
+        assert all('GK' in eligible[p] for p in lineups[0]['GK'])
+        print("✅ Exact top-k lineups match enumeration with multi-position eligibility")
+        
+        star = max(lineups[0]['FW'] + lineups[0]['MF'], key=lambda p: squad.set_index('Player').at[p, 'Score'])
+        without = optimizer.best(formation, unavailable=[star])[0]
+        assert star not in sum((without[group] for group in optimizer.groups), [])
+        capped = optimizer.best(formation, minutes={star: 30})[0]
+        assert star not in sum((capped[group] for group in optimizer.groups), [])
+        assert optimizer.best({'GK': 3, 'DF': 1}) == []
+        print("✅ Availability, minute limits and infeasible formations")
+        
+        scenarios = [{'name': 'base'}, {'name': 'no star', 'unavailable': [star]},
+                     {'name': 'defensive', 'multipliers': {'DF': 1.5}, 'formations': ['3-5-2']}]
+        results = optimizer.evaluate(scenarios, formations=['4-3-3', '3-4-3'], k=2)
+        assert list(results['scenario'].unique()) == ['base', 'no star', 'defensive']
+        assert (results.groupby('scenario', sort=False)['total'].apply(lambda t: t.round(9).is_monotonic_decreasing)).all()
+        assert set(results.loc[results['scenario'] == 'defensive', 'formation']) == {'3-5-2'}
+        parallel = optimizer.evaluate(scenarios, formations=['4-3-3', '3-4-3'], k=2, n_jobs=2)
+        assert parallel.drop(columns='seconds').equals(results.drop(columns='seconds'))
+        assert results['seconds'].max() < 0.1
+        
+        matches = pd.DataFrame({'Player': ['A', 'A', 'A', 'B', 'B', 'B'], 'Season': '24_25',
+                                'Pos': ['FW', 'FW,RM', 'LW', 'GK', 'GK', 'GK'],
+                                'Rebalanced_Score': [6.0, 9.0, 3.0, 4.0, 5.0, 6.0]})
+        built = build_squad(matches).set_index('Player')
+        assert built.at['A', 'Score_FW'] == 6.0 and built.at['A', 'Score_MF'] == 9.0
+        assert np.isnan(built.at['A', 'Score_GK']) and built.at['B', 'Score_GK'] == 5.0
+        print("✅ Batched scenarios, parallel evaluation and squad building")
+        
+        return True
+        
+    except Exception as e:
+        print(f"❌ Lineup error: {type(e).__name__}: {e}")
+        return False
+
+
+def _stub_align_init():
+    """Worker initializer stand-in that does not need OpenCV"""
+
+
+def _stub_align_worker(args):
+    """_align_worker stand-in: fails on 'broken' inputs, otherwise reports fixed stage times"""
+    import align_faces
+    path, output_size, fast = args
+    if 'broken' in os.path.basename(path):
+        return path, None, {}, "ValueError: unreadable"
+    return path, align_faces.aligned_path(path), {stage: 0.001 for stage in align_faces.STAGES}, None
+
+
+def test_align_faces_batch():
+    """Test input expansion, up-to-date skipping and batch collection in align_faces.py"""
+    print("\n🧪 Testing align_faces batch mode...")
+    
+    try:
+        import tempfile
+        sys.path.append('scripts')
+        import align_faces
+        
+        with tempfile.TemporaryDirectory() as folder:
+            def touch(name, mtime=None):
+                path = os.path.join(folder, name)
+                open(path, 'wb').close()
+                if mtime is not None:
+                    os.utime(path, (mtime, mtime))
+                return path
+            
+            old, fresh, broken = touch('a.png', 1000), touch('b.JPG', 3000), touch('broken.jpeg', 1000)
+            touch('a_aligned.png', 2000)
+            touch('b_aligned.png', 2000)
+            touch('notes.txt')
+            os.mkdir(os.path.join(folder, 'sub.png'))
+            
+            assert align_faces.expand_inputs([folder]) == [old, fresh, broken]
+            pattern = os.path.join(folder, '*.png')
+            assert align_faces.expand_inputs([pattern, old, folder]) == [old, fresh, broken]
+            missing = os.path.join(folder, 'missing.png')
+            assert align_faces.expand_inputs([missing]) == [missing]
+            print("✅ Directories, globs and extension filtering without re-picking *_aligned.png")
+            
+            assert align_faces.is_up_to_date(old)
+            assert not align_faces.is_up_to_date(fresh)
+            assert not align_faces.is_up_to_date(broken)
+            print("✅ Up-to-date check compares output and source mtimes")
+            
+            real_init, real_worker = align_faces._init_worker, align_faces._align_worker
+            align_faces._init_worker, align_faces._align_worker = _stub_align_init, _stub_align_worker
+            try:
+                serial = align_faces.align_batch([folder], workers=1, verbose=False)
+                parallel = align_faces.align_batch([folder], workers=2, verbose=False)
+                forced = align_faces.align_batch([folder], workers=1, force=True, verbose=False)
+                done = align_faces.align_batch([old], workers=2, verbose=False)
+            finally:
+                align_faces._init_worker, align_faces._align_worker = real_init, real_worker
+            
+            assert serial['outputs'] == [align_faces.aligned_path(fresh)]
+            assert serial['skipped'] == [old]
+            assert serial['failed'] == {broken: "ValueError: unreadable"}
+            assert abs(serial['stage_seconds']['detect'] - 0.001) < 1e-12
+            for key in ('outputs', 'skipped', 'failed', 'stage_seconds'):
+                assert parallel[key] == serial[key]
+            assert serial['workers'] == 1 and parallel['workers'] == 2
+            assert forced['skipped'] == []
+            assert forced['outputs'] == [align_faces.aligned_path(old), align_faces.aligned_path(fresh)]
+            assert done['outputs'] == [] and done['skipped'] == [old] and done['workers'] == 1
+            print("✅ Batch collects outputs, skips and failures; --force and worker count handled")
+        
+        return True
+        
+    except Exception as e:
+        print(f"❌ Align faces batch error: {type(e).__name__}: {e}")
+        return False
+
+def test_align_faces_detection():
+    """Test the fast-detection helpers and options in align_faces.py"""
+    print("\n🧪 Testing align_faces fast detection helpers...")
+    
+    try:
+        import numpy as np
+        sys.path.append('scripts')
+        import align_faces
+        
+        box = (10, 20, 40, 40)
+        assert align_faces.box_iou(box, (100, 100, 30, 30)) == 0.0
+        assert align_faces.box_iou(box, (50, 20, 40, 40)) == 0.0
+        assert align_faces.box_iou(box, box) == 1.0
+        assert abs(align_faces.box_iou(box, (30, 20, 40, 40)) - 800 / 2400) < 1e-12
+        assert align_faces.box_iou(box, (20, 30, 20, 20)) == 0.25
+        assert align_faces.box_iou(None, None) == 1.0
+        assert align_faces.box_iou(box, None) == 0.0 and align_faces.box_iou(None, box) == 0.0
+        assert align_faces.box_iou((0, 0, 0, 0), (0, 0, 0, 0)) == 0.0
+        print("✅ Box IoU for disjoint, identical, partial and missing boxes")
+        
+        assert align_faces._face_size(0.08, 480) == (38, 38)
+        assert align_faces._face_size(None, 480) == (0, 0)
+        assert align_faces._face_size(0.0, 480) == (0, 0)
+        assert align_faces._face_size(1.5, 480) == (480, 480)
+        assert align_faces._face_size(-0.2, 480) == (0, 0)
+        print("✅ Face size bounds are clamped to the detection image")
+        
+        parser = align_faces.build_parser()
+        defaults = align_faces.fast_options(parser.parse_args(['a.png']))
+        assert defaults == {'max_side': align_faces.FAST_MAX_SIDE, 'min_face': align_faces.FAST_MIN_FACE,
+                            'max_face': None, 'refine': True}
+        argv = ['align_faces.py', 'a.png', '--fast', '--max-side', '320', '--min-face', '0.1',
+                '--max-face', '0.6', '--no-refine', '-q']
+        expected = {'max_side': 320, 'min_face': 0.1, 'max_face': 0.6, 'refine': False}
+        
+        batches, benchmarks, summaries = [], [], []
+        
+        def fake_batch(inputs, **kwargs):
+            batches.append(kwargs)
+            return {'failed': {}}
+        
+        def fake_benchmark(inputs, fast, **kwargs):
+            benchmarks.append(fast)
+            return {'images': []}
+        
+        real = (align_faces.ensure_opencv_available, align_faces.align_batch, align_faces.benchmark_detection,
+                align_faces.print_summary, align_faces.print_benchmark_summary)
+        align_faces.ensure_opencv_available = lambda: None
+        align_faces.align_batch = fake_batch
+        align_faces.benchmark_detection = fake_benchmark
+        align_faces.print_summary = lambda summary: None
+        align_faces.print_benchmark_summary = summaries.append
+        try:
+            align_faces.main(argv)
+            align_faces.main(argv[:2])
+            align_faces.main(argv + ['--benchmark'])
+        finally:
+            (align_faces.ensure_opencv_available, align_faces.align_batch, align_faces.benchmark_detection,
+             align_faces.print_summary, align_faces.print_benchmark_summary) = real
+        assert [kwargs['fast'] for kwargs in batches] == [expected, None]
+        assert batches[0]['verbose'] is False and benchmarks == [expected] and summaries == [{'images': []}]
+        print("✅ --fast, --max-side, --min-face, --max-face and --no-refine reach align_batch/benchmark")
+        
+        # benchmark_detection(verbose=False) prints nothing, the summary included
+        import contextlib
+        import io
+        import types
+        real = (sys.modules.get('cv2'), align_faces.load_face_cascade,
+                align_faces.detect_primary_face_bounds, align_faces.detect_primary_face_bounds_fast)
+        sys.modules['cv2'] = types.SimpleNamespace(imread=lambda path: np.zeros((40, 60, 3)))
+        align_faces.load_face_cascade = lambda: None
+        align_faces.detect_primary_face_bounds = lambda image, cascade: (10, 10, 20, 20)
+        align_faces.detect_primary_face_bounds_fast = lambda image, cascade, **fast: (12, 10, 20, 20)
+        output = io.StringIO()
+        try:
+            with contextlib.redirect_stdout(output):
+                quiet = align_faces.benchmark_detection(['a.png', 'b.png'], repeat=1, verbose=False)
+        finally:
+            if real[0] is None:
+                del sys.modules['cv2']
+            else:
+                sys.modules['cv2'] = real[0]
+            (align_faces.load_face_cascade, align_faces.detect_primary_face_bounds,
+             align_faces.detect_primary_face_bounds_fast) = real[1:]
+        assert output.getvalue() == '' and quiet['matched'] == 2
+        assert abs(quiet['iou_mean'] - 360 / 440) < 1e-12
+        print("✅ Quiet benchmark prints nothing and still returns the summary")
+        
+        return True
+        
+    except Exception as e:
+        print(f"❌ Align faces detection error: {type(e).__name__}: {e}")
+        return False
+
 def main():
     """Run all tests"""
     print("🚀 Starting Real Madrid Soccer Analysis Module Tests")
@@ -180,7 +1601,32 @@ def main():
         ("Data Processing", test_data_processing),
         ("Visualization", test_visualization),
         ("Modeling", test_modeling),
-        ("Quick Functions", test_quick_functions)
+        ("Quick Functions", test_quick_functions),
+        ("Data Cache", test_data_cache),
+        ("Position Stats", test_position_stats),
+        ("FBref Ingestion", test_fbref_ingest),
+        ("FBref Extraction", test_fbref_extraction),
+        ("Rebalanced Scoring", test_scoring),
+        ("Report Renderer", test_report_renderer),
+        ("Incremental EDA", test_incremental_eda),
+        ("Streaming Pipeline", test_streaming),
+        ("Compact Data", test_compact_data),
+        ("Model Training", test_model_training),
+        ("Feature Store", test_feature_store),
+        ("Explanation Cache", test_explanation_cache),
+        ("Form Engine", test_form_engine),
+        ("Prediction Service", test_prediction_service),
+        ("Benchmarks", test_benchmarks),
+        ("Tracing", test_tracing),
+        ("CLI", test_cli),
+        ("Multicollinearity", test_multicollinearity),
+        ("Player Index", test_player_index),
+        ("Backtesting", test_backtesting),
+        ("Similarity", test_similarity),
+        ("Bootstrap", test_bootstrap),
+        ("Lineup", test_lineup),
+        ("Align Faces Batch", test_align_faces_batch),
+        ("Align Faces Detection", test_align_faces_detection)
     ]
     
     passed = 0